@@ -269,21 +269,46 @@ def show_dashboard():
     else:
         st.error("❌ Rôle non reconnu")
 
+def show_sql_trace(budget):
+    """SQL tracing panel: this rerun's queries and the slowest statements"""
+    with st.sidebar.expander("🔍 Trace SQL"):
+        st.markdown(f"**Cette page:** {budget.queries} requête(s), {budget.total_ms} ms")
+        if budget.exceeded:
+            st.warning(
+                f"⚠️ Budget dépassé ({config.SQL_TRACE_RERUN_QUERIES} requêtes, "
+                f"{config.SQL_TRACE_RERUN_MS} ms)"
+            )
+        if budget.statements:
+            st.dataframe(budget.by_caller(), use_container_width=True, hide_index=True)
+
+        st.markdown("**Requêtes les plus lentes (processus)**")
+        slow = database.get_slow_queries(limit=10, order_by='p95_ms')
+        if slow:
+            st.dataframe(
+                [dict(row, callers=', '.join(row['callers'][:3])) for row in slow],
+                use_container_width=True, hide_index=True
+            )
+
 # Main app logic
 def main():
     """Main application entry point"""
     
-    # Test database connection
-    if not database.test_connection():
+    # Test database connection (cached for the whole process)
+    if not database.check_connection():
         st.error("❌ Impossible de se connecter à la base de données PostgreSQL")
         st.info("Vérifiez que PostgreSQL est en cours d'exécution et que les identifiants dans config.py sont corrects")
         st.stop()
     
     # Show login or dashboard based on authentication state
-    if auth.is_authenticated():
-        show_dashboard()
-    else:
-        show_login_page()
+    # (statements of the rerun are checked against the budget when tracing)
+    with database.query_budget(config.SQL_TRACE_RERUN_QUERIES, config.SQL_TRACE_RERUN_MS) as budget:
+        if auth.is_authenticated():
+            show_dashboard()
+        else:
+            show_login_page()
+
+    if config.SQL_TRACE:
+        show_sql_trace(budget)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,228 @@
+# =============================================
+# MATERIALIZED ANALYTICS VIEWS
+# =============================================
+
+# Dashboard aggregates only change when a schedule version changes, so
+# they are computed once per refresh for every completed version and the
+# query functions read them by meta_id. Each view has a unique index so it
+# can be refreshed CONCURRENTLY, without blocking dashboard reads.
+
+import threading
+from backend.database import get_db_cursor
+from backend.queries import invalidate_query_cache
+import config
+
+VERSIONS = """
+    versions AS (
+        SELECT id as meta_id FROM exam_schedule_metadata WHERE status = 'completed'
+    )
+"""
+
+ANALYTICS_VIEWS = {
+    # Each branch (exams, blocs, students, supervisors) is aggregated on its
+    # own before joining, so students are never multiplied by supervisors;
+    # DISTINCT subqueries hash instead of sorting like COUNT(DISTINCT)
+    'mv_department_statistics': ("""
+        WITH {versions},
+        exam_dept AS (
+            SELECT ex.id as examen_id, ex.meta_id, f.dept_id
+            FROM examens ex
+            JOIN versions v ON ex.meta_id = v.meta_id
+            JOIN modules m ON ex.module_id = m.id
+            JOIN formations f ON m.formation_id = f.id
+        ),
+        bloc_dept AS (
+            SELECT eb.id as bloc_id, ed.meta_id, ed.dept_id
+            FROM exam_bloc eb
+            JOIN exam_dept ed ON eb.examen_id = ed.examen_id
+        ),
+        exams AS (
+            SELECT meta_id, dept_id, COUNT(*) as total_exams
+            FROM exam_dept
+            GROUP BY meta_id, dept_id
+        ),
+        blocs AS (
+            SELECT meta_id, dept_id, COUNT(*) as total_blocs
+            FROM bloc_dept
+            GROUP BY meta_id, dept_id
+        ),
+        students AS (
+            SELECT meta_id, dept_id, COUNT(*) as total_students
+            FROM (
+                SELECT DISTINCT bd.meta_id, bd.dept_id, be.etudiant_id
+                FROM bloc_etudiant be
+                JOIN bloc_dept bd ON be.bloc_id = bd.bloc_id
+            ) dept_students
+            GROUP BY meta_id, dept_id
+        ),
+        supervisors AS (
+            SELECT meta_id, dept_id, COUNT(*) as professors_assigned
+            FROM (
+                SELECT DISTINCT bd.meta_id, bd.dept_id, s.prof_id
+                FROM surveillance s
+                JOIN bloc_dept bd ON s.bloc_id = bd.bloc_id
+            ) dept_supervisors
+            GROUP BY meta_id, dept_id
+        )
+        SELECT
+            v.meta_id,
+            d.id as dept_id,
+            d.nom as departement,
+            COALESCE(e.total_exams, 0) as total_exams,
+            COALESCE(b.total_blocs, 0) as total_blocs,
+            COALESCE(st.total_students, 0) as total_students,
+            COALESCE(sv.professors_assigned, 0) as professors_assigned
+        FROM versions v
+        CROSS JOIN departements d
+        LEFT JOIN exams e ON e.meta_id = v.meta_id AND e.dept_id = d.id
+        LEFT JOIN blocs b ON b.meta_id = v.meta_id AND b.dept_id = d.id
+        LEFT JOIN students st ON st.meta_id = v.meta_id AND st.dept_id = d.id
+        LEFT JOIN supervisors sv ON sv.meta_id = v.meta_id AND sv.dept_id = d.id
+        WHERE EXISTS (
+            SELECT 1 FROM formations f
+            JOIN modules m ON f.id = m.formation_id
+            WHERE f.dept_id = d.id
+        )
+    """, ('meta_id', 'dept_id')),
+
+    'mv_room_occupancy': ("""
+        WITH {versions}
+        SELECT
+            v.meta_id,
+            le.type,
+            COUNT(DISTINCT le.id) as total_rooms,
+            COUNT(DISTINCT eb.salle_id) as rooms_used,
+            ROUND(COUNT(DISTINCT eb.salle_id)::NUMERIC / COUNT(DISTINCT le.id) * 100, 2) as utilization_rate,
+            AVG(le.capacite) as avg_capacity,
+            MAX(le.capacite) as max_capacity,
+            MIN(le.capacite) as min_capacity
+        FROM versions v
+        CROSS JOIN lieu_examen le
+        LEFT JOIN exam_bloc eb ON le.id = eb.salle_id AND eb.meta_id = v.meta_id
+        GROUP BY v.meta_id, le.type
+    """, ('meta_id', 'type')),
+
+    'mv_supervision_fairness': ("""
+        WITH {versions}
+        SELECT
+            s.meta_id,
+            p.id,
+            p.nom,
+            p.prenom,
+            d.nom as departement,
+            COUNT(DISTINCT s.id) as total_supervisions,
+            COUNT(DISTINCT DATE(ex.date_heure)) as days_assigned,
+            ROUND(COUNT(DISTINCT s.id)::NUMERIC / NULLIF(COUNT(DISTINCT DATE(ex.date_heure)), 0), 2) as avg_per_day
+        FROM surveillance s
+        JOIN versions v ON s.meta_id = v.meta_id
+        JOIN professeurs p ON s.prof_id = p.id
+        JOIN departements d ON p.dept_id = d.id
+        JOIN exam_bloc eb ON s.bloc_id = eb.id
+        JOIN examens ex ON eb.examen_id = ex.id
+        GROUP BY s.meta_id, p.id, p.nom, p.prenom, d.nom
+    """, ('meta_id', 'id')),
+
+    'mv_professor_hours': ("""
+        WITH {versions}
+        SELECT
+            prof_stats.meta_id,
+            d.id as dept_id,
+            d.nom as departement,
+            AVG(supervision_mins/60.0) as avg_hours,
+            MAX(supervision_mins/60.0) as max_hours,
+            MIN(supervision_mins/60.0) as min_hours
+        FROM (
+            SELECT
+                v.meta_id,
+                p.id,
+                p.dept_id,
+                COALESCE(SUM(ex.duree_minutes), 0) as supervision_mins
+            FROM versions v
+            CROSS JOIN professeurs p
+            LEFT JOIN surveillance s ON p.id = s.prof_id AND s.meta_id = v.meta_id
+            LEFT JOIN exam_bloc eb ON s.bloc_id = eb.id
+            LEFT JOIN examens ex ON eb.examen_id = ex.id
+            GROUP BY v.meta_id, p.id, p.dept_id
+        ) prof_stats
+        JOIN departements d ON prof_stats.dept_id = d.id
+        GROUP BY prof_stats.meta_id, d.id, d.nom
+    """, ('meta_id', 'dept_id')),
+
+    'mv_conflicts_by_dept': ("""
+        WITH {versions},
+        student_conflicts AS (
+            SELECT be.meta_id, e.id, f.dept_id
+            FROM etudiants e
+            JOIN formations f ON e.formation_id = f.id
+            JOIN bloc_etudiant be ON e.id = be.etudiant_id
+            JOIN versions v ON be.meta_id = v.meta_id
+            JOIN exam_bloc eb ON be.bloc_id = eb.id
+            JOIN examens ex ON eb.examen_id = ex.id
+            GROUP BY be.meta_id, e.id, f.dept_id, DATE(ex.date_heure)
+            HAVING COUNT(*) > 1
+        )
+        SELECT
+            v.meta_id,
+            d.id as dept_id,
+            d.nom as departement,
+            COUNT(sc.id) as conflict_count
+        FROM versions v
+        CROSS JOIN departements d
+        LEFT JOIN student_conflicts sc ON sc.meta_id = v.meta_id AND sc.dept_id = d.id
+        GROUP BY v.meta_id, d.id, d.nom
+    """, ('meta_id', 'dept_id')),
+
+    # Single chain on purpose: exam -> bloc -> student rows are one per
+    # student sitting, so there is no fan-out to pre-aggregate away, and
+    # the per-day distinct count dominates either way
+    # (see benchmarks/fanout_queries.py)
+    'mv_exam_timeline': ("""
+        WITH {versions}
+        SELECT
+            ex.meta_id,
+            DATE(ex.date_heure) as exam_date,
+            COUNT(DISTINCT ex.id) as exam_count,
+            COUNT(DISTINCT eb.id) as bloc_count,
+            COUNT(DISTINCT be.etudiant_id) as student_count
+        FROM examens ex
+        JOIN versions v ON ex.meta_id = v.meta_id
+        LEFT JOIN exam_bloc eb ON ex.id = eb.examen_id
+        LEFT JOIN bloc_etudiant be ON eb.id = be.bloc_id
+        GROUP BY ex.meta_id, DATE(ex.date_heure)
+    """, ('meta_id', 'exam_date')),
+}
+
+def view_ddl(name):
+    """CREATE statements (view and unique index) of one analytics view"""
+    query, key = ANALYTICS_VIEWS[name]
+    return [
+        f"CREATE MATERIALIZED VIEW IF NOT EXISTS {name} AS {query.format(versions=VERSIONS)}",
+        f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{name}_key ON {name}({', '.join(key)})",
+    ]
+
+def refresh_analytics_views(wait=True):
+    """
+    Recompute every analytics view without blocking readers
+
+    Args:
+        wait: False runs the refresh in a background thread (used after
+              incremental changes, which must stay fast)
+    """
+    if not wait:
+        threading.Thread(target=_refresh_in_background, daemon=True).start()
+        return
+
+    with get_db_cursor(commit=True) as cursor:
+        # Large enough for the DISTINCT aggregates to stay in memory
+        cursor.execute("SET LOCAL work_mem = %s", (config.ANALYTICS_REFRESH_WORK_MEM,))
+        for name in ANALYTICS_VIEWS:
+            cursor.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {name}")
+
+    # Results read from the views before the refresh are outdated
+    invalidate_query_cache()
+
+def _refresh_in_background():
+    try:
+        refresh_analytics_views()
+    except Exception as e:
+        print(f"Analytics views refresh failed: {e}")
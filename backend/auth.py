@@ -3,7 +3,26 @@
 # =============================================
 
 import streamlit as st
-from backend.database import execute_query_dict
+from backend.database import register_statement, execute_prepared
+
+# Login lookups, prepared once per pooled connection
+USER_BY_USERNAME = register_statement('auth_user_by_username', """
+    SELECT id, user_id, username, password, role
+    FROM users
+    WHERE username = $1
+""")
+DEPT_NAME = register_statement('auth_dept_name', """
+    SELECT nom FROM departements WHERE id = $1
+""")
+PROFESSOR_INFO = register_statement('auth_professor_info', """
+    SELECT p.nom, p.prenom, p.dept_id, d.nom as dept_nom
+    FROM professeurs p
+    JOIN departements d ON p.dept_id = d.id
+    WHERE p.id = $1
+""")
+STUDENT_INFO = register_statement('auth_student_info', """
+    SELECT nom, prenom, groupe FROM etudiants WHERE id = $1
+""")
 
 # ===============================
 # Authentification
@@ -14,12 +33,7 @@ def authenticate_user(username, password):
     Authenticate a user against the 'users' table
     Password is stored in clear text (no hash)
     """
-    query = """
-        SELECT id, user_id, username, password, role
-        FROM users
-        WHERE username = %s
-    """
-    users = execute_query_dict(query, (username,))
+    users = execute_prepared(USER_BY_USERNAME, (username,))
     
     if not users:
         return None
@@ -35,8 +49,7 @@ def authenticate_user(username, password):
         # Pour un chef de département, user_id EST le dept_id
         user['dept_id'] = user['user_id']
         # Récupérer le nom du département
-        dept_query = "SELECT nom FROM departements WHERE id = %s"
-        dept_data = execute_query_dict(dept_query, (user['user_id'],))
+        dept_data = execute_prepared(DEPT_NAME, (user['user_id'],))
         user['dept_nom'] = dept_data[0]['nom'] if dept_data else 'Inconnu'
         
     elif user['role'] == 'professor':
@@ -44,13 +57,7 @@ def authenticate_user(username, password):
         user['professeur_id'] = user['user_id']
         
         # Récupérer les infos du prof et son département
-        prof_query = """
-            SELECT p.nom, p.prenom, p.dept_id, d.nom as dept_nom 
-            FROM professeurs p 
-            JOIN departements d ON p.dept_id = d.id 
-            WHERE p.id = %s
-        """
-        prof_data = execute_query_dict(prof_query, (user['user_id'],))
+        prof_data = execute_prepared(PROFESSOR_INFO, (user['user_id'],))
         if prof_data:
             user['professeur_nom'] = prof_data[0]['nom']
             user['professeur_prenom'] = prof_data[0]['prenom']
@@ -61,8 +68,7 @@ def authenticate_user(username, password):
         # Pour un étudiant, user_id est l'id de l'étudiant
         user['etudiant_id'] = user['user_id']
         # Récupérer les infos de l'étudiant
-        etu_query = "SELECT nom, prenom, groupe FROM etudiants WHERE id = %s"
-        etu_data = execute_query_dict(etu_query, (user['user_id'],))
+        etu_data = execute_prepared(STUDENT_INFO, (user['user_id'],))
         if etu_data:
             user['etudiant_nom'] = etu_data[0]['nom']
             user['etudiant_prenom'] = etu_data[0]['prenom']
@@ -0,0 +1,114 @@
+# =============================================
+# STUDENT-MODULE CONFLICT MATRIX (SPARSE)
+# =============================================
+
+import numpy as np
+from scipy import sparse
+from backend.database import execute_query
+
+class ConflictMatrix:
+    """
+    Sparse students x modules inscription matrix
+
+    The module co-enrolment matrix (modules x modules, number of shared
+    students, diagonal = module size) is computed once with a single sparse
+    product and answers "which modules share students" without SQL joins.
+    """
+
+    def __init__(self, student_ids, module_ids):
+        """
+        Args:
+            student_ids: Sequence of etudiant_id, one per inscription
+            module_ids: Sequence of module_id, same length as student_ids
+        """
+        students = np.asarray(student_ids, dtype=np.int64)
+        modules = np.asarray(module_ids, dtype=np.int64)
+
+        self.student_ids, student_idx = np.unique(students, return_inverse=True)
+        self.module_ids, module_idx = np.unique(modules, return_inverse=True)
+        self._module_pos = {int(m): i for i, m in enumerate(self.module_ids)}
+        self._student_pos = {int(s): i for i, s in enumerate(self.student_ids)}
+
+        incidence = sparse.csr_matrix(
+            (np.ones(len(students), dtype=np.int32), (student_idx, module_idx)),
+            shape=(len(self.student_ids), len(self.module_ids))
+        )
+        # Duplicate inscriptions (one per academic year) count once
+        incidence.sum_duplicates()
+        incidence.data[:] = 1
+        self.incidence = incidence
+
+        self.co_enrolment = (incidence.T @ incidence).tocsr()
+        self.co_enrolment.sort_indices()
+
+    @classmethod
+    def load(cls):
+        """Build the matrix from the inscriptions table in one query"""
+        rows = execute_query("SELECT etudiant_id, module_id FROM inscriptions")
+        if not rows:
+            return cls([], [])
+        students, modules = zip(*rows)
+        return cls(students, modules)
+
+    @classmethod
+    def from_enrolments(cls, enrolments):
+        """Build the matrix from a dict module_id -> list of etudiant_id"""
+        students = []
+        modules = []
+        for module_id, student_ids in enrolments.items():
+            students.extend(student_ids)
+            modules.extend([module_id] * len(student_ids))
+        return cls(students, modules)
+
+    def module_size(self, module_id):
+        """Number of students enrolled in a module"""
+        i = self._module_pos.get(module_id)
+        return 0 if i is None else int(self.co_enrolment[i, i])
+
+    def shared_students(self, module_a, module_b):
+        """Number of students enrolled in both modules"""
+        i = self._module_pos.get(module_a)
+        j = self._module_pos.get(module_b)
+        if i is None or j is None:
+            return 0
+        return int(self.co_enrolment[i, j])
+
+    def neighbours(self, module_id):
+        """
+        Modules sharing at least one student with module_id
+
+        Returns:
+            dict module_id -> number of shared students
+        """
+        i = self._module_pos.get(module_id)
+        if i is None:
+            return {}
+        start, end = self.co_enrolment.indptr[i], self.co_enrolment.indptr[i + 1]
+        cols = self.co_enrolment.indices[start:end]
+        counts = self.co_enrolment.data[start:end]
+        return {
+            int(self.module_ids[c]): int(n)
+            for c, n in zip(cols, counts) if c != i
+        }
+
+    def conflict_graph(self):
+        """Adjacency dict module_id -> list of conflicting module_ids"""
+        matrix = self.co_enrolment
+        graph = {}
+        for i, module_id in enumerate(self.module_ids.tolist()):
+            cols = matrix.indices[matrix.indptr[i]:matrix.indptr[i + 1]]
+            graph[module_id] = self.module_ids[cols[cols != i]].tolist()
+        return graph
+
+    def student_modules(self, student_id):
+        """Modules a student is enrolled in"""
+        i = self._student_pos.get(student_id)
+        if i is None:
+            return []
+        row = self.incidence.indices[self.incidence.indptr[i]:self.incidence.indptr[i + 1]]
+        return self.module_ids[row].tolist()
+
+    def conflict_pairs(self):
+        """Number of module pairs sharing at least one student"""
+        upper = sparse.triu(self.co_enrolment, k=1)
+        return int(upper.nnz)
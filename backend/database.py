@@ -3,27 +3,480 @@
 # =============================================
 import sys
 import os
+import io
+import re
+import contextlib
+import threading
+import time
+import weakref
+from datetime import date, datetime
 import psycopg2
-from psycopg2 import pool
+import psycopg2.errors
+from psycopg2 import pool, sql, extensions
+from psycopg2.extras import execute_values
 from contextlib import contextmanager
 import config
 
+# =============================================
+# STATEMENT COUNTERS AND TRACING
+# =============================================
+
+# Per-thread totals of what pooled cursors sent to the server, so a
+# long-running task (schedule generation) can measure its own SQL work
+_counters = threading.local()
+
+_WRITE_COMMANDS = ('INSERT', 'UPDATE', 'DELETE', 'MERGE')
+
+def _count(round_trips, rows_written=0):
+    _counters.round_trips = getattr(_counters, 'round_trips', 0) + round_trips
+    _counters.rows_written = getattr(_counters, 'rows_written', 0) + rows_written
+
+def get_sql_counters():
+    """Round-trips and rows written by the current thread's statements so far"""
+    return {
+        'round_trips': getattr(_counters, 'round_trips', 0),
+        'rows_written': getattr(_counters, 'rows_written', 0),
+    }
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDERS = re.compile(r"%\(\w+\)s|%s|\$\d+")
+_SKIPPED_FILES = (__file__, contextlib.__file__, os.path.dirname(psycopg2.__file__))
+
+def normalize_statement(query):
+    """One line per statement shape: literals and placeholders become '?'"""
+    query = _PLACEHOLDERS.sub('?', query)
+    query = _LITERALS.sub('?', query)
+    return ' '.join(query.split())
+
+def _percentile(ordered, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+def _calling_function():
+    """First caller outside this module, psycopg2 and contextlib"""
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_code.co_filename.startswith(_SKIPPED_FILES):
+        frame = frame.f_back
+    if frame is None:
+        return '?'
+    return f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_name}"
+
+class SqlTracer:
+    """
+    Opt-in per-statement latency and row statistics (config.SQL_TRACE)
+
+    Every statement sent through a pooled cursor is recorded under its
+    normalized text with its latency, parameter count, rows returned and
+    calling function. The last LATENCY_SAMPLES latencies of each statement
+    are kept for the percentiles.
+    """
+
+    LATENCY_SAMPLES = 1000
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._statements = {}
+
+    def record(self, query, params_count, latency, rows, caller):
+        entry = {
+            'statement': query,
+            'params': params_count,
+            'latency_ms': latency * 1000,
+            'rows': rows,
+            'caller': caller,
+        }
+        with self._lock:
+            stats = self._statements.get(query)
+            if stats is None:
+                stats = self._statements[query] = {
+                    'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0,
+                    'params': params_count, 'samples': [], 'callers': {},
+                }
+            stats['calls'] += 1
+            stats['total_ms'] += entry['latency_ms']
+            stats['max_ms'] = max(stats['max_ms'], entry['latency_ms'])
+            stats['rows'] += rows
+            stats['callers'][caller] = stats['callers'].get(caller, 0) + 1
+            samples = stats['samples']
+            if len(samples) >= self.LATENCY_SAMPLES:
+                samples.pop(0)
+            samples.append(entry['latency_ms'])
+
+        rerun_log = getattr(_counters, 'rerun_log', None)
+        if rerun_log is not None:
+            rerun_log.append(entry)
+
+    def report(self, limit=10, order_by='total_ms'):
+        """
+        Top statements with their latency percentiles
+
+        Args:
+            limit: Number of statements returned
+            order_by: 'total_ms', 'p95_ms', 'p99_ms', 'max_ms' or 'calls'
+
+        Returns:
+            List of dicts, costliest first (times in milliseconds)
+        """
+        with self._lock:
+            snapshot = [
+                (query, dict(stats, samples=sorted(stats['samples']), callers=dict(stats['callers'])))
+                for query, stats in self._statements.items()
+            ]
+
+        rows = []
+        for query, stats in snapshot:
+            samples = stats['samples']
+            rows.append({
+                'statement': query,
+                'calls': stats['calls'],
+                'params': stats['params'],
+                'total_ms': round(stats['total_ms'], 2),
+                'p50_ms': round(_percentile(samples, 50), 2),
+                'p95_ms': round(_percentile(samples, 95), 2),
+                'p99_ms': round(_percentile(samples, 99), 2),
+                'max_ms': round(stats['max_ms'], 2),
+                'avg_rows': round(stats['rows'] / stats['calls'], 1),
+                'callers': sorted(stats['callers'], key=stats['callers'].get, reverse=True),
+            })
+        rows.sort(key=lambda r: r[order_by], reverse=True)
+        return rows[:limit]
+
+    def reset(self):
+        """Forget every recorded statement"""
+        with self._lock:
+            self._statements = {}
+
+sql_tracer = SqlTracer(config.SQL_TRACE)
+
+def get_slow_queries(limit=10, order_by='total_ms'):
+    """Top statements recorded by the SQL tracer (see SqlTracer.report)"""
+    return sql_tracer.report(limit, order_by)
+
+class QueryBudget:
+    """Statements run by one thread inside query_budget()"""
+
+    def __init__(self, max_queries, max_ms=None):
+        self.max_queries = max_queries
+        self.max_ms = max_ms
+        self.statements = []
+
+    @property
+    def queries(self):
+        return len(self.statements)
+
+    @property
+    def total_ms(self):
+        return round(sum(s['latency_ms'] for s in self.statements), 2)
+
+    @property
+    def exceeded(self):
+        return self.queries > self.max_queries or (
+            self.max_ms is not None and self.total_ms > self.max_ms
+        )
+
+    def by_caller(self):
+        """Queries and time per calling function, costliest first"""
+        callers = {}
+        for s in self.statements:
+            entry = callers.setdefault(s['caller'], {'caller': s['caller'], 'queries': 0, 'total_ms': 0.0})
+            entry['queries'] += 1
+            entry['total_ms'] = round(entry['total_ms'] + s['latency_ms'], 2)
+        return sorted(callers.values(), key=lambda c: c['total_ms'], reverse=True)
+
+@contextmanager
+def query_budget(max_queries, max_ms=None):
+    """
+    Collect the statements the current thread runs in the block (one
+    Streamlit rerun) and warn when they exceed the budget
+
+    Only statements recorded by the SQL tracer are counted, so the budget
+    is empty while tracing is disabled.
+    """
+    budget = QueryBudget(max_queries, max_ms)
+    _counters.rerun_log = budget.statements if sql_tracer.enabled else None
+    try:
+        yield budget
+    finally:
+        _counters.rerun_log = None
+        if budget.exceeded:
+            top = ', '.join(
+                f"{c['caller']} ({c['queries']}q, {c['total_ms']}ms)" for c in budget.by_caller()[:3]
+            )
+            print(f"Query budget exceeded: {budget.queries} queries, {budget.total_ms}ms - {top}")
+
+class InstrumentedCursor(extensions.cursor):
+    """
+    Cursor adding its round-trips and written rows to the thread's
+    counters, and recording its statements when SQL tracing is enabled
+    """
+
+    def _rows_written(self):
+        status = (self.statusmessage or '').split(' ', 1)[0]
+        return max(self.rowcount, 0) if status in _WRITE_COMMANDS else 0
+
+    def _trace(self, query, params_count, started):
+        latency = time.perf_counter() - started
+        try:
+            if not isinstance(query, str):
+                query = query.as_string(self)
+            rows = max(self.rowcount, 0) if self.description is not None else 0
+        except psycopg2.Error:
+            # Connection lost: tracing must not hide the statement's own error
+            return
+        sql_tracer.record(normalize_statement(query), params_count, latency, rows, _calling_function())
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _count(1, self._rows_written())
+            if sql_tracer.enabled:
+                self._trace(query, len(vars) if vars else 0, started)
+
+    def executemany(self, query, vars_list):
+        vars_list = list(vars_list)
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            # rowcount is the total of every execution
+            _count(len(vars_list), self._rows_written())
+            if sql_tracer.enabled:
+                self._trace(query, len(vars_list[0]) if vars_list else 0, started)
+
+    def copy_expert(self, sql, file, size=8192):
+        started = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            _count(1, max(self.rowcount, 0))
+            if sql_tracer.enabled:
+                self._trace(sql, 0, started)
+
+# =============================================
+# CONNECTION POOL
+# =============================================
+
+class PoolTimeoutError(pool.PoolError):
+    """No connection became free within the pool timeout"""
+
+class _ReusingConnectionPool(pool.ThreadedConnectionPool):
+    """
+    ThreadedConnectionPool keeping up to maxconn idle connections
+
+    psycopg2 closes every returned connection once `minconn` are idle, so
+    under concurrent sessions most checkouts would open a new connection
+    and lose its prepared statements; here `minconn` is only the number
+    opened at startup.
+    """
+
+    def _putconn(self, conn, key=None, close=False):
+        if self.closed:
+            raise pool.PoolError("connection pool is closed")
+
+        if key is None:
+            key = self._rused.get(id(conn))
+            if key is None:
+                raise pool.PoolError("trying to put unkeyed connection")
+
+        if close or conn.closed or len(self._pool) >= self.maxconn:
+            conn.close()
+        elif conn.info.transaction_status == extensions.TRANSACTION_STATUS_UNKNOWN:
+            # Server connection lost
+            conn.close()
+        else:
+            if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            self._pool.append(conn)
+
+        # Same bookkeeping as psycopg2 (a thread may return a connection
+        # after closeall())
+        if not self.closed or key in self._used:
+            del self._used[key]
+            del self._rused[id(conn)]
+
+class PoolManager:
+    """
+    Thread-safe connection pool shared by all sessions
+
+    Wraps a ThreadedConnectionPool with a bounded wait for a free
+    connection (instead of failing at once when all are in use), checks
+    connections before handing them out and keeps usage metrics.
+    """
+
+    def __init__(self, minconn, maxconn, timeout, ping_after, **db_config):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self._pool = _ReusingConnectionPool(
+            minconn, maxconn, cursor_factory=InstrumentedCursor, **db_config
+        )
+        # One slot per connection, so waiting threads queue here
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._last_used = weakref.WeakKeyDictionary()  # connection -> time.monotonic()
+        self._in_use = 0
+        self._stats = {
+            'checkouts': 0,
+            'timeouts': 0,
+            'stale_discarded': 0,
+            'peak_in_use': 0,
+            'wait_total': 0.0,
+            'wait_max': 0.0,
+            'latency_total': 0.0,
+            'latency_max': 0.0,
+        }
+
+    def getconn(self):
+        """
+        Check out a working connection
+
+        Raises:
+            PoolTimeoutError: all connections stayed in use for `timeout` seconds
+        """
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._stats['timeouts'] += 1
+            print(f"Connection pool exhausted: no connection free after {self.timeout}s")
+            raise PoolTimeoutError(
+                f"no database connection available after {self.timeout}s"
+            )
+        waited = time.perf_counter() - start
+
+        try:
+            conn = self._checkout()
+        except Exception:
+            self._slots.release()
+            raise
+
+        latency = time.perf_counter() - start
+        with self._lock:
+            self._in_use += 1
+            stats = self._stats
+            stats['checkouts'] += 1
+            stats['peak_in_use'] = max(stats['peak_in_use'], self._in_use)
+            stats['wait_total'] += waited
+            stats['wait_max'] = max(stats['wait_max'], waited)
+            stats['latency_total'] += latency
+            stats['latency_max'] = max(stats['latency_max'], latency)
+        return conn
+
+    def putconn(self, conn):
+        """Return a connection; broken ones are closed instead of pooled"""
+        broken = (
+            conn.closed
+            or conn.info.transaction_status == extensions.TRANSACTION_STATUS_UNKNOWN
+        )
+        try:
+            try:
+                self._pool.putconn(conn, close=broken)
+            except psycopg2.Error:
+                # Rolling back an unfinished transaction failed: connection lost
+                broken = True
+                self._pool.putconn(conn, close=True)
+        finally:
+            with self._lock:
+                self._in_use -= 1
+                if broken:
+                    self._last_used.pop(conn, None)
+                else:
+                    self._last_used[conn] = time.monotonic()
+            self._slots.release()
+
+    def _checkout(self):
+        # Every discarded connection is replaced by a new one, which cannot
+        # be stale; the bound only guards against a server refusing pings
+        for _ in range(self.maxconn + 1):
+            conn = self._pool.getconn()
+            if self._is_usable(conn):
+                return conn
+            with self._lock:
+                self._stats['stale_discarded'] += 1
+                self._last_used.pop(conn, None)
+            self._pool.putconn(conn, close=True)
+        raise psycopg2.OperationalError("could not obtain a working database connection")
+
+    def _is_usable(self, conn):
+        if conn.closed:
+            return False
+        with self._lock:
+            last_used = self._last_used.get(conn)
+        # New or recently used connections are not pinged
+        if last_used is None or time.monotonic() - last_used < self.ping_after:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def metrics(self):
+        """Snapshot of the pool usage (times in milliseconds)"""
+        with self._lock:
+            stats = dict(self._stats)
+            in_use = self._in_use
+        checkouts = stats['checkouts'] or 1
+        return {
+            'min_size': self.minconn,
+            'max_size': self.maxconn,
+            'in_use': in_use,
+            'peak_in_use': stats['peak_in_use'],
+            'checkouts': stats['checkouts'],
+            'timeouts': stats['timeouts'],
+            'stale_discarded': stats['stale_discarded'],
+            'avg_wait_ms': round(stats['wait_total'] / checkouts * 1000, 3),
+            'max_wait_ms': round(stats['wait_max'] * 1000, 3),
+            'avg_checkout_ms': round(stats['latency_total'] / checkouts * 1000, 3),
+            'max_checkout_ms': round(stats['latency_max'] * 1000, 3),
+        }
+
+    def closeall(self):
+        """Close every pooled connection"""
+        self._pool.closeall()
+        with self._lock:
+            self._last_used.clear()
+
 # Connection pool for better performance
 connection_pool = None
+_pool_init_lock = threading.Lock()
 
 def init_connection_pool():
-    """Initialize database connection pool"""
+    """
+    Initialize database connection pool
+
+    Raises:
+        Exception: the database is unreachable or DB_CONFIG is missing
+    """
     global connection_pool
-    try:
-        connection_pool = psycopg2.pool.SimpleConnectionPool(
-            1,  # minconn
-            10,  # maxconn
-            **config.DB_CONFIG
-        )
-        return True
-    except Exception as e:
-        print(f"Error creating connection pool: {e}")
-        return False
+    with _pool_init_lock:
+        if connection_pool is not None:
+            return True
+        try:
+            connection_pool = PoolManager(
+                config.DB_POOL_MIN,
+                config.DB_POOL_MAX,
+                config.DB_POOL_TIMEOUT,
+                config.DB_POOL_PING_AFTER,
+                **config.DB_CONFIG
+            )
+            return True
+        except Exception as e:
+            print(f"Error creating connection pool: {e}")
+            raise e
+
+def get_pool_metrics():
+    """Usage metrics of the connection pool (None before the first connection)"""
+    if connection_pool is None:
+        return None
+    return connection_pool.metrics()
 
 @contextmanager
 def get_db_connection():
@@ -37,20 +490,92 @@ def get_db_connection():
     finally:
         connection_pool.putconn(conn)
 
+# =============================================
+# TRANSACTIONS
+# =============================================
+
 @contextmanager
-def get_db_cursor(commit=False):
-    """Context manager for database cursors"""
+def savepoint(cursor, name):
+    """
+    Run a block inside a SAVEPOINT of the cursor's transaction
+
+    If the block fails, only its statements are rolled back and the
+    exception is re-raised; the enclosing transaction stays usable.
+    """
+    name = sql.Identifier(name)
+    cursor.execute(sql.SQL("SAVEPOINT {}").format(name))
+    try:
+        yield
+    except Exception:
+        cursor.execute(sql.SQL("ROLLBACK TO SAVEPOINT {}").format(name))
+        cursor.execute(sql.SQL("RELEASE SAVEPOINT {}").format(name))
+        raise
+    cursor.execute(sql.SQL("RELEASE SAVEPOINT {}").format(name))
+
+class UnitOfWork:
+    """Statements of one transaction on a pooled connection (see transaction())"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self._savepoints = 0
+
+    def execute(self, query, params=None):
+        """Run a statement; returns the cursor for fetchone/fetchall/rowcount"""
+        self.cursor.execute(query, params)
+        return self.cursor
+
+    def fetch_dict(self, query, params=None):
+        """Run a query and return its rows as dictionaries"""
+        self.cursor.execute(query, params)
+        columns = [desc[0] for desc in self.cursor.description]
+        return [dict(zip(columns, row)) for row in self.cursor.fetchall()]
+
+    def savepoint(self, name=None):
+        """Context manager undoing only its own statements on failure"""
+        if name is None:
+            self._savepoints += 1
+            name = f"uow_{self._savepoints}"
+        return savepoint(self.cursor, name)
+
+    def rollback(self):
+        """Discard every statement run so far; later statements start anew"""
+        self.conn.rollback()
+
+@contextmanager
+def transaction(commit=True):
+    """
+    Unit of work: every statement run in the block commits together
+
+    Usage:
+        with transaction() as uow:
+            uow.execute("UPDATE ...", params)
+            with uow.savepoint():
+                uow.execute("INSERT ...", params)
+
+    Args:
+        commit: False leaves the work uncommitted (read-only blocks);
+                the pool rolls it back when the connection is returned
+
+    The whole transaction is rolled back if the block raises.
+    """
     with get_db_connection() as conn:
-        cursor = conn.cursor()
+        uow = UnitOfWork(conn)
         try:
-            yield cursor
+            yield uow
             if commit:
                 conn.commit()
         except Exception as e:
             conn.rollback()
             raise e
         finally:
-            cursor.close()
+            uow.cursor.close()
+
+@contextmanager
+def get_db_cursor(commit=False):
+    """Context manager for database cursors"""
+    with transaction(commit=commit) as uow:
+        yield uow.cursor
 
 def execute_query(query, params=None, fetch=True):
     """
@@ -135,6 +660,207 @@ def execute_many(query, params_list):
         print(f"Batch insert error: {e}")
         raise e
 
+# =============================================
+# PREPARED STATEMENTS
+# =============================================
+
+# Hot lookups are parsed and planned once per pooled connection, then run
+# with EXECUTE. Statements are registered once at import time and
+# prepared lazily on each connection the first time it runs them.
+PREPARED_STATEMENTS = {}
+
+# Statement names prepared on each open connection (forgotten when closed)
+_prepared_on = weakref.WeakKeyDictionary()
+_prepared_lock = threading.Lock()
+
+def register_statement(name, query):
+    """
+    Register a named statement for execute_prepared
+
+    Args:
+        name: Statement name (unique for the process)
+        query: SQL with $1, $2... placeholders
+
+    Returns:
+        The name, to be kept as a module constant by the caller
+    """
+    if PREPARED_STATEMENTS.get(name, query) != query:
+        raise ValueError(f"Prepared statement '{name}' already registered")
+    PREPARED_STATEMENTS[name] = query
+    return name
+
+def _use_prepared_statements():
+    """
+    config.DB_PREPARED_STATEMENTS, or when None, whether the host is a
+    direct connection: a transaction-mode pooler (Neon '-pooler' host)
+    hands each transaction to any backend, so prepared names get lost
+    """
+    if config.DB_PREPARED_STATEMENTS is not None:
+        return config.DB_PREPARED_STATEMENTS
+    db_config = dict(config.DB_CONFIG or {})
+    if 'dsn' in db_config:
+        db_config.update(extensions.parse_dsn(db_config.pop('dsn')))
+    return '-pooler' not in str(db_config.get('host', ''))
+
+def _prepare(conn, cursor, name):
+    with _prepared_lock:
+        prepared = _prepared_on.setdefault(conn, set())
+    if name not in prepared:
+        cursor.execute(sql.SQL("PREPARE {} AS ").format(sql.Identifier(name))
+                       + sql.SQL(PREPARED_STATEMENTS[name]))
+        prepared.add(name)
+
+def _execute_prepared(conn, cursor, name, params):
+    _prepare(conn, cursor, name)
+    placeholders = sql.SQL('')
+    if params:
+        placeholders = sql.SQL(" ({})").format(
+            sql.SQL(', ').join(sql.Placeholder() * len(params))
+        )
+    cursor.execute(
+        sql.SQL("EXECUTE {}").format(sql.Identifier(name)) + placeholders, params
+    )
+
+def _execute_unprepared(cursor, name, params):
+    # Same statement with client-side parameters ($1 may appear twice)
+    query = PREPARED_STATEMENTS[name]
+    for i in range(len(params), 0, -1):
+        query = query.replace(f"${i}", f"%(p{i})s")
+    cursor.execute(query, {f"p{i}": v for i, v in enumerate(params, 1)})
+
+def execute_prepared(name, params=()):
+    """
+    Run a registered statement by name
+
+    Args:
+        name: Name given to register_statement
+        params: Values for $1, $2...
+
+    Returns:
+        List of dictionaries with column names as keys
+    """
+    params = tuple(params)
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                if not _use_prepared_statements():
+                    _execute_unprepared(cursor, name, params)
+                else:
+                    try:
+                        _execute_prepared(conn, cursor, name, params)
+                    except (psycopg2.errors.InvalidSqlStatementName,
+                            psycopg2.errors.DuplicatePreparedStatement) as e:
+                        # The server session does not match what was tracked
+                        # (e.g. a pooler switched backends): resync and run
+                        # this call unprepared
+                        conn.rollback()
+                        with _prepared_lock:
+                            prepared = _prepared_on.setdefault(conn, set())
+                        if isinstance(e, psycopg2.errors.DuplicatePreparedStatement):
+                            prepared.add(name)
+                        else:
+                            prepared.clear()
+                        _execute_unprepared(cursor, name, params)
+                columns = [desc[0] for desc in cursor.description]
+                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    except Exception as e:
+        print(f"Query error: {e}")
+        raise e
+
+def _copy_value(value):
+    """Format one value for COPY text format"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+def _bulk_insert(cursor, table, columns, rows):
+    """COPY rows into table, falling back to execute_values if COPY is refused"""
+    target = sql.SQL("{} ({})").format(
+        sql.Identifier(table),
+        sql.SQL(', ').join(sql.Identifier(c) for c in columns)
+    )
+
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(_copy_value(v) for v in row))
+        buffer.write('\n')
+    buffer.seek(0)
+
+    # Savepoint so a refused COPY (e.g. behind some poolers) keeps the transaction usable
+    try:
+        with savepoint(cursor, 'bulk_insert'):
+            cursor.copy_expert(
+                sql.SQL("COPY {} FROM STDIN").format(target), buffer
+            )
+        return len(rows)
+    except psycopg2.Error as e:
+        print(f"COPY into {table} failed, using execute_values: {e}")
+
+    execute_values(
+        cursor,
+        sql.SQL("INSERT INTO {} VALUES %s").format(target).as_string(cursor),
+        rows,
+        page_size=5000
+    )
+    return len(rows)
+
+def bulk_insert(table, columns, rows, cursor=None):
+    """
+    Stream rows into a table through COPY ... FROM STDIN
+
+    Args:
+        table: Target table name
+        columns: Sequence of column names
+        rows: List of value tuples (same order as columns)
+        cursor: Optional cursor to write inside the caller's transaction
+
+    Returns:
+        Number of rows written
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+
+    try:
+        if cursor is not None:
+            return _bulk_insert(cursor, table, columns, rows)
+        with get_db_cursor(commit=True) as cursor:
+            return _bulk_insert(cursor, table, columns, rows)
+    except Exception as e:
+        print(f"Bulk insert error: {e}")
+        raise e
+
+def reserve_ids(cursor, table, count):
+    """
+    Reserve a block of ids from a table's SERIAL sequence in one round-trip
+
+    Args:
+        cursor: Cursor of the transaction that will insert the rows
+        table: Table whose 'id' sequence is used
+        count: Number of ids to reserve
+
+    Returns:
+        List of reserved ids
+    """
+    if count <= 0:
+        return []
+
+    cursor.execute("""
+        SELECT nextval(pg_get_serial_sequence(%s, 'id'))
+        FROM generate_series(1, %s)
+    """, (table, count))
+    return [row[0] for row in cursor.fetchall()]
+
 def test_connection():
     """Test database connection"""
     try:
@@ -146,3 +872,70 @@ def test_connection():
     except Exception as e:
         print(f"Connection test failed: {e}")
         return False
+
+# =============================================
+# HEALTH CHECK
+# =============================================
+
+class HealthCheck:
+    """
+    Process-wide cached result of the connection test
+
+    Streamlit reruns the app script on every interaction; a healthy result
+    is reused for `interval` seconds, then re-checked in a background
+    thread while callers keep the last result. Unknown or failed states
+    are checked synchronously so the error page is never shown stale.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._healthy = None
+        self._checked_at = 0.0
+        self._rechecking = False
+
+    def is_healthy(self):
+        """Whether the database was reachable at the last check"""
+        with self._lock:
+            healthy = self._healthy
+            recheck = (
+                healthy
+                and not self._rechecking
+                and time.monotonic() - self._checked_at >= self.interval
+            )
+            if recheck:
+                self._rechecking = True
+
+        if not healthy:
+            return self.check()
+        if recheck:
+            threading.Thread(target=self.check, daemon=True).start()
+        return True
+
+    def check(self):
+        """Run the connection test now and cache its result"""
+        # The server version is only logged when the state changes
+        if self._healthy:
+            healthy = _ping()
+        else:
+            healthy = test_connection()
+        with self._lock:
+            self._healthy = healthy
+            self._checked_at = time.monotonic()
+            self._rechecking = False
+        return healthy
+
+def _ping():
+    try:
+        with get_db_cursor() as cursor:
+            cursor.execute("SELECT 1")
+            return True
+    except Exception as e:
+        print(f"Connection test failed: {e}")
+        return False
+
+health_check = HealthCheck(config.DB_HEALTH_CHECK_INTERVAL)
+
+def check_connection():
+    """Cached connection test for every app rerun (see HealthCheck)"""
+    return health_check.is_healthy()
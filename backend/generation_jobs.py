@@ -0,0 +1,165 @@
+# =============================================
+# BACKGROUND GENERATION JOBS
+# =============================================
+
+# Schedule generation runs in a worker thread so the admin's Streamlit
+# session is never blocked: the page submits a job, then polls its status.
+# The registry lives at process level, so a job survives the browser
+# disconnecting and can be picked up again from any session.
+
+import threading
+import time
+import uuid
+from backend.scheduler import ExamScheduler, GenerationCancelled
+import config
+
+# Phases reported by ExamScheduler, in order, with their French labels
+GENERATION_PHASES = {
+    'load': "Chargement des données",
+    'exams': "Création des examens",
+    'blocs': "Répartition des étudiants dans les salles",
+    'supervisors': "Attribution des surveillances",
+    'conflicts': "Détection et résolution des conflits",
+    'write': "Enregistrement du planning",
+    'refresh': "Mise à jour des statistiques",
+}
+
+JOBS_KEPT = 10  # Finished jobs kept in the registry for status lookups
+
+class GenerationJob:
+    """One schedule generation run and its progress"""
+
+    def __init__(self, start_date, default_duration):
+        self.id = uuid.uuid4().hex[:12]
+        self.start_date = start_date
+        self.default_duration = default_duration
+        self.status = 'pending'   # pending, running, completed, failed, cancelled
+        self.phase = None
+        self.counts = {}
+        self.stats = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def run(self):
+        """Worker thread body"""
+        with self._lock:
+            self.status = 'running'
+            self.started_at = time.time()
+        try:
+            scheduler = ExamScheduler(
+                on_progress=self._on_progress, cancel_event=self.cancel_event
+            )
+            stats = scheduler.generate_schedule(self.start_date, self.default_duration)
+            self._finish('completed', stats=stats)
+        except GenerationCancelled:
+            self._finish('cancelled')
+        except Exception as e:
+            self._finish('failed', error=str(e))
+
+    def _on_progress(self, phase, counts):
+        with self._lock:
+            self.phase = phase
+            self.counts = dict(counts)
+
+    def _finish(self, status, stats=None, error=None):
+        with self._lock:
+            self.status = status
+            self.stats = stats
+            self.error = error
+            self.finished_at = time.time()
+
+    def cancel(self):
+        """Ask the worker to stop at the next phase boundary"""
+        self.cancel_event.set()
+
+    @property
+    def finished(self):
+        return self.status in ('completed', 'failed', 'cancelled')
+
+    def snapshot(self):
+        """Consistent copy of the job state for display"""
+        with self._lock:
+            end = self.finished_at or time.time()
+            return {
+                'id': self.id,
+                'status': self.status,
+                'phase': self.phase,
+                'phase_label': GENERATION_PHASES.get(self.phase, ''),
+                'phase_index': list(GENERATION_PHASES).index(self.phase) + 1 if self.phase else 0,
+                'phase_count': len(GENERATION_PHASES),
+                'counts': dict(self.counts),
+                'stats': self.stats,
+                'error': self.error,
+                'cancel_requested': self.cancel_event.is_set(),
+                'elapsed': round(end - (self.started_at or end), 1),
+                'over_time': (end - (self.started_at or end)) > config.MAX_SCHEDULE_GENERATION_TIME,
+            }
+
+class JobRegistry:
+    """In-memory registry of generation jobs (one running at a time)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def submit(self, start_date, default_duration):
+        """
+        Start a generation in a worker thread
+
+        Returns:
+            The job id; if a generation is already running, its id instead
+        """
+        with self._lock:
+            running = self._running()
+            if running is not None:
+                return running.id
+
+            job = GenerationJob(start_date, default_duration)
+            self._jobs[job.id] = job
+            self._prune()
+
+        threading.Thread(
+            target=job.run, name=f"generation-{job.id}", daemon=True
+        ).start()
+        return job.id
+
+    def status(self, job_id):
+        """Snapshot of a job, or None if unknown (e.g. after a restart)"""
+        job = self._jobs.get(job_id)
+        return job.snapshot() if job else None
+
+    def latest(self):
+        """Snapshot of the most recently submitted job, or None"""
+        with self._lock:
+            if not self._jobs:
+                return None
+            job = max(self._jobs.values(), key=lambda j: j.submitted_at)
+        return job.snapshot()
+
+    def cancel(self, job_id):
+        """Request cancellation; returns False if the job is unknown or finished"""
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.cancel()
+        return True
+
+    def _running(self):
+        for job in self._jobs.values():
+            if not job.finished:
+                return job
+        return None
+
+    def _prune(self):
+        finished = sorted(
+            (j for j in self._jobs.values() if j.finished),
+            key=lambda j: j.submitted_at
+        )
+        for job in finished[:max(len(finished) - JOBS_KEPT, 0)]:
+            del self._jobs[job.id]
+
+generation_jobs = JobRegistry()
@@ -2,133 +2,273 @@
 # ANALYTICAL QUERIES MODULE
 # =============================================
 
-from backend.database import execute_query_dict, get_db_cursor
+import copy
+import functools
+import threading
+import time
+from backend.database import (
+    execute_query_dict, get_db_cursor, transaction, register_statement, execute_prepared
+)
+from backend.conflict_matrix import ConflictMatrix
+from backend.timetables import publish_timetables
+import config
 
-def get_student_schedule(etudiant_id):
-    """Get personalized exam schedule for a student"""
-    query = """
-        SELECT 
-            m.nom as module,
-            ex.date_heure,
-            ex.duree_minutes,
-            le.nom as salle,
-            le.type as salle_type,
-            f.nom as formation
-        FROM etudiants e
-        JOIN inscriptions i ON e.id = i.etudiant_id
-        JOIN modules m ON i.module_id = m.id
-        JOIN formations f ON m.formation_id = f.id
-        JOIN examens ex ON m.id = ex.module_id
-        JOIN exam_bloc eb ON ex.id = eb.examen_id
-        JOIN bloc_etudiant be ON eb.id = be.bloc_id AND be.etudiant_id = e.id
-        JOIN lieu_examen le ON eb.salle_id = le.id
-        WHERE e.id = %s
-        AND EXISTS (
-            SELECT 1 FROM (
-                SELECT is_published FROM exam_schedule_metadata 
-                ORDER BY generation_date DESC LIMIT 1
-            ) latest WHERE latest.is_published = TRUE
-        )
-        ORDER BY ex.date_heure
+# ============================================================
+# PUBLICATION STATE
+# ============================================================
+
+class PublicationState:
     """
-    return execute_query_dict(query, (etudiant_id,))
+    In-process cache of the published and latest schedule versions
 
-def get_professor_schedule(professeur_id):
-    """Get supervision schedule for a professor"""
-    query = """
-        SELECT 
-            m.nom as module,
-            ex.date_heure,
-            ex.duree_minutes,
-            le.nom as salle,
-            le.type as salle_type,
-            COUNT(be.etudiant_id) as nb_etudiants,
-            f.nom as formation,
-            d.nom as departement
-        FROM professeurs p
-        JOIN surveillance s ON p.id = s.prof_id
-        JOIN exam_bloc eb ON s.bloc_id = eb.id
-        JOIN examens ex ON eb.examen_id = ex.id
-        JOIN modules m ON ex.module_id = m.id
-        JOIN formations f ON m.formation_id = f.id
-        JOIN departements d ON f.dept_id = d.id
-        JOIN lieu_examen le ON eb.salle_id = le.id
-        LEFT JOIN bloc_etudiant be ON eb.id = be.bloc_id
-        WHERE p.id = %s
-        AND EXISTS (
-             SELECT 1 FROM (
-                 SELECT is_published FROM exam_schedule_metadata 
-                 ORDER BY generation_date DESC LIMIT 1
-             ) latest WHERE latest.is_published = TRUE
-        )
-        GROUP BY m.nom, ex.date_heure, ex.duree_minutes, le.nom, le.type, f.nom, d.nom
-        ORDER BY ex.date_heure
+    Page queries bind the cached meta_id instead of looking up
+    exam_schedule_metadata on every call. The cache is invalidated by
+    publish_schedule() and by new generations, and expires after
+    PUBLICATION_CACHE_TTL seconds to catch changes made by other processes.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._published = None
+        self._latest = None
+
+    def published_meta_id(self):
+        """Id of the published schedule version, or None"""
+        self._ensure_loaded()
+        return self._published
+
+    def latest_meta_id(self):
+        """Id of the latest completed schedule version, or None"""
+        self._ensure_loaded()
+        return self._latest
+
+    def invalidate(self):
+        """Forget the cached versions; the next read reloads them"""
+        with self._lock:
+            self._loaded_at = None
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._loaded_at is not None and time.time() - self._loaded_at < self.ttl:
+                return
+            rows = execute_query_dict("""
+                SELECT
+                    (SELECT id FROM exam_schedule_metadata WHERE is_published) as published,
+                    (SELECT id FROM exam_schedule_metadata
+                     WHERE status = 'completed'
+                     ORDER BY generation_date DESC LIMIT 1) as latest
+            """)
+            self._published = rows[0]['published'] if rows else None
+            self._latest = rows[0]['latest'] if rows else None
+            self._loaded_at = time.time()
+
+publication_state = PublicationState(config.PUBLICATION_CACHE_TTL)
+
+def get_published_meta_id():
+    """Id of the published schedule version, or None"""
+    return publication_state.published_meta_id()
+
+def get_latest_meta_id():
+    """Id of the latest completed schedule version, or None"""
+    return publication_state.latest_meta_id()
+
+def invalidate_publication_state():
+    """Call after a generation or a publication changed the versions"""
+    publication_state.invalidate()
+    query_cache.invalidate()
+
+# ============================================================
+# QUERY RESULT CACHE
+# ============================================================
+
+class QueryCache:
+    """
+    Process-wide cache of dashboard query results
+
+    Streamlit runs every session as a thread of the same process and keeps
+    imported modules across reruns, so one instance is shared by all users.
+    Keys include the published and latest schedule versions, so a new
+    generation or publication is never served stale results. Concurrent
+    misses on the same key wait for a single database round-trip, and
+    callers receive copies (like st.cache_data), so a page mutating a
+    result cannot corrupt another session's.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}      # key -> (expires_at, value)
+        self._key_locks = {}    # key -> Lock serializing the computation (while cached or computing)
+        self._generation = 0    # bumped on invalidate()
+
+    def get(self, key, ttl, compute):
+        """Cached value of key, computed at most once per TTL and generation"""
+        value = self._lookup(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Another session may have filled it while we waited
+            value = self._lookup(key)
+            if value is not None:
+                return value
+
+            with self._lock:
+                generation = self._generation
+            try:
+                value = (compute(),)
+            except Exception:
+                with self._lock:
+                    self._drop_key_lock(key, key_lock)
+                raise
+
+            with self._lock:
+                # Drop results computed across an invalidation
+                if generation == self._generation:
+                    self._purge_expired()
+                    self._entries[key] = (time.time() + ttl, value)
+                else:
+                    self._drop_key_lock(key, key_lock)
+            return value
+
+    def invalidate(self):
+        """Forget every cached result"""
+        with self._lock:
+            self._entries.clear()
+            self._key_locks.clear()
+            self._generation += 1
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.time():
+                return entry[1]
+            return None
+
+    def _purge_expired(self):
+        now = time.time()
+        for key in [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+            # Kept while another session is recomputing the key
+            key_lock = self._key_locks.get(key)
+            if key_lock is not None and not key_lock.locked():
+                del self._key_locks[key]
+
+    def _drop_key_lock(self, key, key_lock):
+        # Only if no newer lock replaced it (after an invalidation)
+        if self._key_locks.get(key) is key_lock:
+            del self._key_locks[key]
+
+query_cache = QueryCache()
+
+def cached_query(ttl):
     """
-    return execute_query_dict(query, (professeur_id,))
+    Cache a query function's results across sessions
+
+    Args:
+        ttl: Seconds a result stays valid; results are also dropped as soon
+             as the schedule version or validation state changes
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (
+                func.__name__,
+                publication_state.published_meta_id(),
+                publication_state.latest_meta_id(),
+                args,
+                tuple(sorted(kwargs.items()))
+            )
+            (value,) = query_cache.get(key, ttl, lambda: func(*args, **kwargs))
+            return copy.deepcopy(value)
+        wrapper.uncached = func
+        return wrapper
+    return decorator
+
+def invalidate_query_cache():
+    """Call after schedule rows or validation states changed"""
+    query_cache.invalidate()
+
+# ============================================================
+# PAGE QUERIES
+# ============================================================
 
-def get_department_statistics(dept_id=None):
-    """Get exam statistics by department"""
+# Timetable lookups, prepared once per pooled connection
+STUDENT_TIMETABLE = register_statement('student_timetable', """
+    SELECT module, date_heure, duree_minutes, salle, salle_type, formation
+    FROM student_timetable
+    WHERE meta_id = $1 AND etudiant_id = $2
+    ORDER BY date_heure
+""")
+PROFESSOR_TIMETABLE = register_statement('professor_timetable', """
+    SELECT
+        module, date_heure, duree_minutes, salle, salle_type,
+        nb_etudiants, formation, departement
+    FROM professor_timetable
+    WHERE meta_id = $1 AND prof_id = $2
+    ORDER BY date_heure
+""")
+
+def get_student_schedule(etudiant_id):
+    """Get personalized exam schedule for a student (published snapshot)"""
+    meta_id = get_published_meta_id()
+    if meta_id is None:
+        return []
+    return execute_prepared(STUDENT_TIMETABLE, (meta_id, etudiant_id))
+
+def get_professor_schedule(professeur_id):
+    """Get supervision schedule for a professor (published snapshot)"""
+    meta_id = get_published_meta_id()
+    if meta_id is None:
+        return []
+    return execute_prepared(PROFESSOR_TIMETABLE, (meta_id, professeur_id))
+
+@cached_query(ttl=config.ANALYTICS_CACHE_TTL)
+def get_department_statistics(dept_id=None, meta_id=None):
+    """Get exam statistics by department (latest schedule version by default)"""
+    meta_id = meta_id or get_latest_meta_id()
     query = """
-        SELECT 
-            d.nom as departement,
-            COUNT(DISTINCT ex.id) as total_exams,
-            COUNT(DISTINCT eb.id) as total_blocs,
-            COUNT(DISTINCT be.etudiant_id) as total_students,
-            COUNT(DISTINCT s.prof_id) as professors_assigned
-        FROM departements d
-        JOIN formations f ON d.id = f.dept_id
-        JOIN modules m ON f.id = m.formation_id
-        LEFT JOIN examens ex ON m.id = ex.module_id
-        LEFT JOIN exam_bloc eb ON ex.id = eb.examen_id
-        LEFT JOIN bloc_etudiant be ON eb.id = be.bloc_id
-        LEFT JOIN surveillance s ON eb.id = s.bloc_id
-        WHERE (%s IS NULL OR d.id = %s)
-        GROUP BY d.id, d.nom
-        ORDER BY d.nom
+        SELECT departement, total_exams, total_blocs, total_students, professors_assigned
+        FROM mv_department_statistics
+        WHERE meta_id = %s
+        AND (%s IS NULL OR dept_id = %s)
+        ORDER BY departement
     """
-    return execute_query_dict(query, (dept_id, dept_id))
+    return execute_query_dict(query, (meta_id, dept_id, dept_id))
 
-def get_room_occupancy_stats():
+@cached_query(ttl=config.ANALYTICS_CACHE_TTL)
+def get_room_occupancy_stats(meta_id=None):
     """Get room and amphitheater occupancy statistics"""
+    meta_id = meta_id or get_latest_meta_id()
     query = """
-        SELECT 
-            le.type,
-            COUNT(DISTINCT le.id) as total_rooms,
-            COUNT(DISTINCT eb.salle_id) as rooms_used,
-            ROUND(COUNT(DISTINCT eb.salle_id)::NUMERIC / COUNT(DISTINCT le.id) * 100, 2) as utilization_rate,
-            AVG(le.capacite) as avg_capacity,
-            MAX(le.capacite) as max_capacity,
-            MIN(le.capacite) as min_capacity
-        FROM lieu_examen le
-        LEFT JOIN exam_bloc eb ON le.id = eb.salle_id
-        GROUP BY le.type
-    """
-    return execute_query_dict(query)
-
-def get_supervision_fairness():
+        SELECT
+            type, total_rooms, rooms_used, utilization_rate,
+            avg_capacity, max_capacity, min_capacity
+        FROM mv_room_occupancy
+        WHERE meta_id = %s
+    """
+    return execute_query_dict(query, (meta_id,))
+
+@cached_query(ttl=config.ANALYTICS_CACHE_TTL)
+def get_supervision_fairness(meta_id=None):
     """Get supervision distribution fairness metrics"""
+    meta_id = meta_id or get_latest_meta_id()
     query = """
-        SELECT 
-            p.id,
-            p.nom,
-            p.prenom,
-            d.nom as departement,
-            COUNT(DISTINCT s.id) as total_supervisions,
-            COUNT(DISTINCT DATE(ex.date_heure)) as days_assigned,
-            ROUND(COUNT(DISTINCT s.id)::NUMERIC / NULLIF(COUNT(DISTINCT DATE(ex.date_heure)), 0), 2) as avg_per_day
-        FROM professeurs p
-        JOIN departements d ON p.dept_id = d.id
-        LEFT JOIN surveillance s ON p.id = s.prof_id
-        LEFT JOIN exam_bloc eb ON s.bloc_id = eb.id
-        LEFT JOIN examens ex ON eb.examen_id = ex.id
-        GROUP BY p.id, p.nom, p.prenom, d.nom
-        HAVING COUNT(DISTINCT s.id) > 0
+        SELECT id, nom, prenom, departement, total_supervisions, days_assigned, avg_per_day
+        FROM mv_supervision_fairness
+        WHERE meta_id = %s
         ORDER BY total_supervisions DESC
     """
-    return execute_query_dict(query)
+    return execute_query_dict(query, (meta_id,))
 
-def get_conflicts_report():
+@cached_query(ttl=config.ANALYTICS_CACHE_TTL)
+def get_conflicts_report(meta_id=None):
     """Get detailed conflicts report"""
+    meta_id = meta_id or get_latest_meta_id()
     conflicts = {}
     
     # Student conflicts (multiple exams same day)
@@ -148,10 +288,11 @@ def get_conflicts_report():
         JOIN exam_bloc eb ON be.bloc_id = eb.id
         JOIN examens ex ON eb.examen_id = ex.id
         JOIN modules m ON ex.module_id = m.id
+        WHERE be.meta_id = %s
         GROUP BY e.id, e.nom, e.prenom,e.groupe, f.nom, DATE(ex.date_heure)
         HAVING COUNT(*) > 1
     """
-    conflicts['students'] = execute_query_dict(query_student)
+    conflicts['students'] = execute_query_dict(query_student, (meta_id,))
     
     # Professor conflicts (>3 supervisions per day)
     query_prof = """
@@ -167,10 +308,11 @@ def get_conflicts_report():
         JOIN surveillance s ON p.id = s.prof_id
         JOIN exam_bloc eb ON s.bloc_id = eb.id
         JOIN examens ex ON eb.examen_id = ex.id
+        WHERE s.meta_id = %s
         GROUP BY p.id, p.nom, p.prenom, d.nom, DATE(ex.date_heure)
         HAVING COUNT(*) > 3
     """
-    conflicts['professors'] = execute_query_dict(query_prof)
+    conflicts['professors'] = execute_query_dict(query_prof, (meta_id,))
     
     # Room capacity conflicts
     query_capacity = """
@@ -186,77 +328,107 @@ def get_conflicts_report():
         JOIN examens ex ON eb.examen_id = ex.id
         JOIN modules m ON ex.module_id = m.id
         LEFT JOIN bloc_etudiant be ON eb.id = be.bloc_id
+        WHERE eb.meta_id = %s
         GROUP BY le.nom, le.type, le.capacite, m.nom, ex.date_heure
         HAVING COUNT(be.etudiant_id) > le.capacite
     """
-    conflicts['capacity'] = execute_query_dict(query_capacity)
+    conflicts['capacity'] = execute_query_dict(query_capacity, (meta_id,))
     
     return conflicts
 
-def get_global_kpis():
-    """Get global KPIs for dashboard"""
-    kpis = {}
-    
-    # Total exams
-    result = execute_query_dict("SELECT COUNT(*) as count FROM examens")
-    kpis['total_exams'] = result[0]['count'] if result else 0
-    
-    # Total students scheduled
-    result = execute_query_dict("""
-        SELECT COUNT(DISTINCT etudiant_id) as count FROM bloc_etudiant
-    """)
-    kpis['total_students'] = result[0]['count'] if result else 0
-    
-    # Total exam blocs
-    result = execute_query_dict("SELECT COUNT(*) as count FROM exam_bloc")
-    kpis['total_blocs'] = result[0]['count'] if result else 0
-    
-    # Room utilization
-    result = execute_query_dict("""
-        SELECT 
-            ROUND(COUNT(DISTINCT eb.salle_id)::NUMERIC / 
-                  (SELECT COUNT(*) FROM lieu_examen) * 100, 2) as rate
-        FROM exam_bloc eb
-    """)
-    kpis['room_utilization'] = result[0]['rate'] if result else 0
-    
-    # Conflict rate
-    conflicts = get_conflicts_report()
-    total_conflicts = (
-        len(conflicts.get('students', [])) +
-        len(conflicts.get('professors', [])) +
-        len(conflicts.get('capacity', []))
+@cached_query(ttl=config.ANALYTICS_CACHE_TTL)
+def get_global_kpis(meta_id=None):
+    """
+    Get global KPIs for dashboard
+
+    Every KPI, the conflict counts and the version metadata come from a
+    single CTE query; each schedule table is scanned once.
+    """
+    meta_id = meta_id or get_latest_meta_id()
+    query = """
+        WITH blocs AS (
+            SELECT eb.id, eb.salle_id, ex.date_heure
+            FROM exam_bloc eb
+            JOIN examens ex ON eb.examen_id = ex.id
+            WHERE eb.meta_id = %(meta_id)s
+        ),
+        bloc_students AS (
+            SELECT bloc_id, etudiant_id
+            FROM bloc_etudiant
+            WHERE meta_id = %(meta_id)s
+        ),
+        student_conflicts AS (
+            SELECT 1
+            FROM bloc_students bs
+            JOIN blocs b ON bs.bloc_id = b.id
+            GROUP BY bs.etudiant_id, DATE(b.date_heure)
+            HAVING COUNT(*) > 1
+        ),
+        professor_conflicts AS (
+            SELECT 1
+            FROM surveillance s
+            JOIN blocs b ON s.bloc_id = b.id
+            WHERE s.meta_id = %(meta_id)s
+            GROUP BY s.prof_id, DATE(b.date_heure)
+            HAVING COUNT(*) > 3
+        ),
+        capacity_conflicts AS (
+            SELECT 1
+            FROM (
+                SELECT bloc_id, COUNT(*) as student_count
+                FROM bloc_students
+                GROUP BY bloc_id
+            ) bc
+            JOIN blocs b ON bc.bloc_id = b.id
+            JOIN lieu_examen le ON b.salle_id = le.id
+            WHERE bc.student_count > le.capacite
+        ),
+        kpis AS (
+            SELECT
+                (SELECT COUNT(*) FROM examens WHERE meta_id = %(meta_id)s) as kpi_total_exams,
+                (SELECT COUNT(DISTINCT etudiant_id) FROM bloc_students) as kpi_total_students,
+                (SELECT COUNT(*) FROM blocs) as kpi_total_blocs,
+                (SELECT ROUND(COUNT(DISTINCT salle_id)::NUMERIC /
+                        NULLIF((SELECT COUNT(*) FROM lieu_examen), 0) * 100, 2)
+                 FROM blocs) as kpi_room_utilization,
+                (SELECT COUNT(*) FROM student_conflicts) as kpi_student_conflicts,
+                (SELECT COUNT(*) FROM professor_conflicts) as kpi_professor_conflicts,
+                (SELECT COUNT(*) FROM capacity_conflicts) as kpi_capacity_conflicts
+        )
+        SELECT k.*, m.*
+        FROM kpis k
+        LEFT JOIN exam_schedule_metadata m ON m.id = %(meta_id)s
+    """
+    result = execute_query_dict(query, {'meta_id': meta_id})
+    row = dict(result[0]) if result else {}
+
+    # kpi_* columns are the KPIs, the rest is the version metadata
+    kpis = {key[4:]: row.pop(key) for key in list(row) if key.startswith('kpi_')}
+    kpis['total_conflicts'] = (
+        kpis.get('student_conflicts', 0) +
+        kpis.get('professor_conflicts', 0) +
+        kpis.get('capacity_conflicts', 0)
     )
-    kpis['total_conflicts'] = total_conflicts
-    
-    # Last generation metadata
-    result = execute_query_dict("""
-        SELECT * FROM exam_schedule_metadata
-        ORDER BY generation_date DESC
-        LIMIT 1
-    """)
-    kpis['last_generation'] = result[0] if result else None
-    
+    kpis['last_generation'] = row if row.get('id') is not None else None
+
     return kpis
 
-def get_exam_timeline():
+@cached_query(ttl=config.ANALYTICS_CACHE_TTL)
+def get_exam_timeline(meta_id=None):
     """Get exam timeline for visualization"""
+    meta_id = meta_id or get_latest_meta_id()
     query = """
-        SELECT 
-            DATE(ex.date_heure) as exam_date,
-            COUNT(DISTINCT ex.id) as exam_count,
-            COUNT(DISTINCT eb.id) as bloc_count,
-            COUNT(DISTINCT be.etudiant_id) as student_count
-        FROM examens ex
-        LEFT JOIN exam_bloc eb ON ex.id = eb.examen_id
-        LEFT JOIN bloc_etudiant be ON eb.id = be.bloc_id
-        GROUP BY DATE(ex.date_heure)
+        SELECT exam_date, exam_count, bloc_count, student_count
+        FROM mv_exam_timeline
+        WHERE meta_id = %s
         ORDER BY exam_date
     """
-    return execute_query_dict(query)
+    return execute_query_dict(query, (meta_id,))
 
-def get_department_exam_count():
+@cached_query(ttl=config.ANALYTICS_CACHE_TTL)
+def get_department_exam_count(meta_id=None):
     """Get exam count by department for charts"""
+    meta_id = meta_id or get_latest_meta_id()
     query = """
         SELECT 
             d.nom as departement,
@@ -264,76 +436,57 @@ def get_department_exam_count():
         FROM departements d
         JOIN formations f ON d.id = f.dept_id
         JOIN modules m ON f.id = m.formation_id
-        LEFT JOIN examens ex ON m.id = ex.module_id
+        LEFT JOIN examens ex ON m.id = ex.module_id AND ex.meta_id = %s
         GROUP BY d.nom
         ORDER BY exam_count DESC
     """
-    return execute_query_dict(query)
+    return execute_query_dict(query, (meta_id,))
 
 # ============================================================
 # NEW QUERIES FOR ROLE-BASED FEATURES
 # ============================================================
 
-def get_conflicts_by_dept():
+@cached_query(ttl=config.ANALYTICS_CACHE_TTL)
+def get_conflicts_by_dept(meta_id=None):
     """
     Get conflict counts grouped by department.
     Useful for Vice-Doyen and Chef Dept.
     """
+    meta_id = meta_id or get_latest_meta_id()
     query = """
-    WITH StudentConflicts AS (
-        SELECT e.id, f.dept_id
-        FROM etudiants e
-        JOIN formations f ON e.formation_id = f.id
-        JOIN bloc_etudiant be ON e.id = be.etudiant_id
-        JOIN exam_bloc eb ON be.bloc_id = eb.id
-        JOIN examens ex ON eb.examen_id = ex.id
-        GROUP BY e.id, f.dept_id, DATE(ex.date_heure)
-        HAVING COUNT(*) > 1
-    )
-    SELECT 
-        d.nom as departement,
-        COUNT(sc.id) as conflict_count
-    FROM departements d
-    LEFT JOIN StudentConflicts sc ON d.id = sc.dept_id
-    GROUP BY d.nom
-    ORDER BY conflict_count DESC
+        SELECT departement, conflict_count
+        FROM mv_conflicts_by_dept
+        WHERE meta_id = %s
+        ORDER BY conflict_count DESC
     """
-    return execute_query_dict(query)
+    return execute_query_dict(query, (meta_id,))
 
-def get_professor_hours_stats():
+@cached_query(ttl=config.ANALYTICS_CACHE_TTL)
+def get_professor_hours_stats(meta_id=None):
     """
     Get statistics on professor supervision hours.
     Useful for fairness analysis.
     """
+    meta_id = meta_id or get_latest_meta_id()
     query = """
-    SELECT 
-        d.nom as departement,
-        AVG(supervision_mins/60.0) as avg_hours,
-        MAX(supervision_mins/60.0) as max_hours,
-        MIN(supervision_mins/60.0) as min_hours
-    FROM (
-        SELECT 
-            p.id, 
-            p.dept_id,
-            COALESCE(SUM(ex.duree_minutes), 0) as supervision_mins
-        FROM professeurs p
-        LEFT JOIN surveillance s ON p.id = s.prof_id
-        LEFT JOIN exam_bloc eb ON s.bloc_id = eb.id
-        LEFT JOIN examens ex ON eb.examen_id = ex.id
-        GROUP BY p.id, p.dept_id
-    ) prof_stats
-    JOIN departements d ON prof_stats.dept_id = d.id
-    GROUP BY d.nom
-    ORDER BY avg_hours DESC
+        SELECT departement, avg_hours, max_hours, min_hours
+        FROM mv_professor_hours
+        WHERE meta_id = %s
+        ORDER BY avg_hours DESC
     """
-    return execute_query_dict(query)
+    return execute_query_dict(query, (meta_id,))
 
 def search_global_schedule(dept_id=None, formation_id=None, date_filter=None):
     """
     Search global schedule with filters.
     For Students/Profs looking up other exams.
     """
-    params = []
+    meta_id = get_published_meta_id()
+    if meta_id is None:
+        return []
+
+    # Only the published version is visible
+    params = [meta_id]
     base_query = """
         SELECT 
             m.nom as module,
@@ -348,7 +501,7 @@ def search_global_schedule(dept_id=None, formation_id=None, date_filter=None):
         JOIN departements d ON f.dept_id = d.id
         JOIN exam_bloc eb ON ex.id = eb.examen_id
         JOIN lieu_examen le ON eb.salle_id = le.id
-        WHERE 1=1
+        WHERE ex.meta_id = %s
     """
     
     if dept_id:
@@ -363,137 +516,182 @@ def search_global_schedule(dept_id=None, formation_id=None, date_filter=None):
         base_query += " AND DATE(ex.date_heure) = %s"
         params.append(date_filter)
 
-    # Enforce publication check
-    base_query += """
-        AND EXISTS (
-            SELECT 1 FROM (
-                SELECT is_published FROM exam_schedule_metadata 
-                ORDER BY generation_date DESC LIMIT 1
-            ) latest WHERE latest.is_published = TRUE
-        )
-    """
-        
     base_query += " ORDER BY ex.date_heure LIMIT 100"
     
     return execute_query_dict(base_query, tuple(params))
 
+# ============================================================
+# CO-ENROLMENT QUERIES (SPARSE MATRIX)
+# ============================================================
+
+_conflict_matrix = None
+_conflict_matrix_loaded_at = None
+
+def get_conflict_matrix(refresh=False):
+    """
+    Process-wide ConflictMatrix, built from inscriptions on first use
+
+    Publications and generations leave it alone (inscriptions are
+    unchanged); it is dropped by invalidate_conflict_matrix() where
+    inscriptions are written, and rebuilt after CONFLICT_MATRIX_TTL seconds
+    to catch inscriptions changed by another process.
+    """
+    global _conflict_matrix, _conflict_matrix_loaded_at
+    expired = (
+        _conflict_matrix_loaded_at is None
+        or time.time() - _conflict_matrix_loaded_at >= config.CONFLICT_MATRIX_TTL
+    )
+    if _conflict_matrix is None or refresh or expired:
+        _conflict_matrix = ConflictMatrix.load()
+        _conflict_matrix_loaded_at = time.time()
+    return _conflict_matrix
+
+def invalidate_conflict_matrix():
+    """Call after inscriptions changed; the next read rebuilds the matrix"""
+    global _conflict_matrix
+    _conflict_matrix = None
+
+def get_module_conflicts(module_id):
+    """
+    Get modules sharing students with a module.
+    Useful to check which exams cannot share a day.
+    """
+    shared = get_conflict_matrix().neighbours(module_id)
+    if not shared:
+        return []
+
+    query = """
+        SELECT m.id, m.nom as module, f.nom as formation
+        FROM modules m
+        JOIN formations f ON m.formation_id = f.id
+        WHERE m.id = ANY(%s)
+    """
+    rows = execute_query_dict(query, (list(shared),))
+    for row in rows:
+        row['shared_students'] = shared[row['id']]
+    return sorted(rows, key=lambda r: r['shared_students'], reverse=True)
+
 # ============================================================
 # VALIDATION WORKFLOW QUERIES
 # ============================================================
 
+@cached_query(ttl=config.WORKFLOW_CACHE_TTL)
 def get_latest_schedule_metadata():
-    """Get the latest generation metadata including validation status"""
+    """Get the latest completed generation metadata including validation status"""
     query = """
         SELECT * FROM exam_schedule_metadata
+        WHERE status = 'completed'
         ORDER BY generation_date DESC
         LIMIT 1
     """
     result = execute_query_dict(query)
     return result[0] if result else None
 
+@cached_query(ttl=config.WORKFLOW_CACHE_TTL)
+def get_generation_history(limit=10):
+    """Per-phase metrics of the latest generations, newest first"""
+    query = """
+        SELECT id, generation_date, execution_time_seconds, status, phase_metrics
+        FROM exam_schedule_metadata
+        WHERE phase_metrics IS NOT NULL
+        ORDER BY generation_date DESC
+        LIMIT %s
+    """
+    return execute_query_dict(query, (limit,))
+
+
+# Optional filters are NULL parameters, so one prepared statement serves
+# every combination
+VALIDATION_STATE = register_statement('validation_state', """
+    SELECT 
+        vs.id,
+        vs.validator_role,
+        vs.dept_id,
+        d.nom as departement,
+        vs.status,
+        vs.comment,
+        vs.val_date
+    FROM validation_state vs
+    LEFT JOIN departements d ON vs.dept_id = d.id
+    WHERE vs.meta_id = $1
+    AND ($2::INTEGER IS NULL OR vs.dept_id = $2)
+    AND ($3::VARCHAR IS NULL OR vs.validator_role = $3)
+    ORDER BY d.nom NULLS LAST
+""")
 
+@cached_query(ttl=config.WORKFLOW_CACHE_TTL)
 def get_validation_state(meta_id, dept_id=None, role=None):
     """
     Get validation status from validation_state table.
     """
-    params = [meta_id]
-    query = """
-        SELECT 
-            vs.id,
-            vs.validator_role,
-            vs.dept_id,
-            d.nom as departement,
-            vs.status,
-            vs.comment,
-            vs.val_date
-        FROM validation_state vs
-        LEFT JOIN departements d ON vs.dept_id = d.id
-        WHERE vs.meta_id = %s
-    """
-    
-    if dept_id:
-        query += " AND vs.dept_id = %s"
-        params.append(dept_id)
-        
-    if role:
-        query += " AND vs.validator_role = %s"
-        params.append(role)
-        
-    query += " ORDER BY d.nom NULLS LAST"
-    
-    return execute_query_dict(query, tuple(params))
+    return execute_prepared(VALIDATION_STATE, (meta_id, dept_id or None, role or None))
 
 def update_validation_state(meta_id, role, status, dept_id=None, comment=None, user_id=None):
     """Update validation status in validation_state table"""
-    import psycopg2
-    import config
-    
-    conn = None
     try:
-        conn = psycopg2.connect(**config.DB_CONFIG)
-        cur = conn.cursor()
-        
-        query = """
-            INSERT INTO validation_state (meta_id, validator_role, dept_id, status, comment, validator_user_id, val_date)
-            VALUES (%s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-            ON CONFLICT (meta_id, validator_role, dept_id) 
-            DO UPDATE SET 
-                status = EXCLUDED.status,
-                comment = EXCLUDED.comment,
-                validator_user_id = EXCLUDED.validator_user_id,
-                val_date = EXCLUDED.val_date
-        """
-        cur.execute(query, (meta_id, role, dept_id, status, comment, user_id))
-        conn.commit()
+        with transaction() as uow:
+            uow.execute("""
+                INSERT INTO validation_state (meta_id, validator_role, dept_id, status, comment, validator_user_id, val_date)
+                VALUES (%s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+                ON CONFLICT (meta_id, validator_role, dept_id) 
+                DO UPDATE SET 
+                    status = EXCLUDED.status,
+                    comment = EXCLUDED.comment,
+                    validator_user_id = EXCLUDED.validator_user_id,
+                    val_date = EXCLUDED.val_date
+            """, (meta_id, role, dept_id, status, comment, user_id))
+        invalidate_query_cache()
         return True
     except Exception as e:
-        if conn: conn.rollback()
         print(f"Error updating validation state: {e}")
         return False
-    finally:
-        if cur: cur.close()
-        if conn: conn.close()
 
 def publish_schedule(meta_id, user_id=None):
     """
     Publish the schedule.
     1. Update validation_state for VICE_DOYEN.
-    2. Set is_published = TRUE in metadata for visibility.
+    2. Switch the published version to meta_id for visibility.
+    3. Build the student and professor timetable snapshots.
+
+    All steps run in one transaction, so readers see either the previous
+    published version or the new one, never none.
     """
-    import psycopg2
-    import config
-    
-    conn = None
-    cur = None
     try:
-        conn = psycopg2.connect(**config.DB_CONFIG)
-        cur = conn.cursor()
-        
-        # 1. Update validation_state
-        query_val = """
-            INSERT INTO validation_state (meta_id, validator_role, dept_id, status, validator_user_id, val_date)
-            VALUES (%s, 'VICE_DOYEN', NULL, 'VALIDATED', %s, CURRENT_TIMESTAMP)
-            ON CONFLICT (meta_id, validator_role, dept_id) 
-            DO UPDATE SET status = 'VALIDATED', val_date = CURRENT_TIMESTAMP
-        """
-        cur.execute(query_val, (meta_id, user_id))
-        
-        # 2. Update metadata visibility
-        query_meta = """
-            UPDATE exam_schedule_metadata
-            SET is_published = TRUE,
-                global_validation_status = 'VALIDATED'
-            WHERE id = %s
-        """
-        cur.execute(query_meta, (meta_id,))
-        
-        conn.commit()
+        with transaction() as uow:
+            # 1. Update validation_state
+            uow.execute("""
+                INSERT INTO validation_state (meta_id, validator_role, dept_id, status, validator_user_id, val_date)
+                VALUES (%s, 'VICE_DOYEN', NULL, 'VALIDATED', %s, CURRENT_TIMESTAMP)
+                ON CONFLICT (meta_id, validator_role, dept_id) 
+                DO UPDATE SET status = 'VALIDATED', val_date = CURRENT_TIMESTAMP
+            """, (meta_id, user_id))
+
+            # 2. Switch the published pointer (at most one published version)
+            row = uow.execute(
+                "SELECT id FROM exam_schedule_metadata WHERE is_published"
+            ).fetchone()
+            previous_meta_id = row[0] if row else None
+
+            uow.execute("""
+                UPDATE exam_schedule_metadata
+                SET is_published = FALSE
+                WHERE is_published AND id <> %s
+            """, (meta_id,))
+            published = uow.execute("""
+                UPDATE exam_schedule_metadata
+                SET is_published = TRUE,
+                    global_validation_status = 'VALIDATED'
+                WHERE id = %s AND status = 'completed'
+            """, (meta_id,))
+            if published.rowcount != 1:
+                raise ValueError(f"Schedule version {meta_id} is not completed")
+
+            # 3. Denormalized timetables for the student and professor pages
+            publish_timetables(uow.cursor, meta_id, previous_meta_id)
+
+        invalidate_publication_state()
         return True
     except Exception as e:
-        if conn: conn.rollback()
         print(f"Error publishing schedule: {e}")
         return False
-    finally:
-        if cur: cur.close()
-        if conn: conn.close()
 
@@ -0,0 +1,123 @@
+# =============================================
+# ROOM OCCUPANCY INDEX
+# =============================================
+
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from datetime import timedelta
+
+class RoomOccupancy:
+    """
+    Time-aware room occupancy index
+
+    Each room keeps its bookings as sorted, non-overlapping [start, end)
+    intervals, so an overlap check is a single bisection.
+
+    Free rooms are indexed per queried interval: the first query over
+    [start, end) builds the list of rooms free over it, sorted by
+    (capacity, id), in O(rooms). Bookings and releases then update the
+    lists of the overlapping intervals in place, so "free room with
+    capacity >= N over [start, end)" is a bisection afterwards. Exams start
+    on a handful of slots, so the same intervals are queried over and over.
+    """
+
+    def __init__(self, rooms):
+        """
+        Args:
+            rooms: List of room dicts with at least 'id' and 'capacite'
+        """
+        self.rooms = sorted(rooms, key=lambda r: (r['capacite'], r['id']))
+        self._by_id = {r['id']: r for r in self.rooms}
+        self._starts = {r['id']: [] for r in self.rooms}
+        self._ends = {r['id']: [] for r in self.rooms}
+        self._free = {}                        # (start, end) -> sorted [(capacite, id)]
+        self._free_by_day = defaultdict(set)   # date -> indexed (start, end) touching it
+
+    def is_free(self, room_id, start, end):
+        """Check that no booking of the room overlaps [start, end)"""
+        starts = self._starts[room_id]
+        # Last booking starting before 'end' is the only one that can overlap
+        idx = bisect_left(starts, end) - 1
+        return idx < 0 or self._ends[room_id][idx] <= start
+
+    def book(self, room_id, start, end):
+        """Book the room over [start, end)"""
+        insort(self._starts[room_id], start)
+        insort(self._ends[room_id], end)
+
+        entry = (self._by_id[room_id]['capacite'], room_id)
+        for key in self._indexed_overlapping(start, end):
+            free = self._free[key]
+            idx = bisect_left(free, entry)
+            if idx < len(free) and free[idx] == entry:
+                del free[idx]
+
+    def release(self, room_id, start, end):
+        """Remove a booking previously made with book()"""
+        # Bookings never overlap, so starts and ends share their order
+        starts = self._starts[room_id]
+        del starts[bisect_left(starts, start)]
+        ends = self._ends[room_id]
+        del ends[bisect_left(ends, end)]
+
+        entry = (self._by_id[room_id]['capacite'], room_id)
+        for key in self._indexed_overlapping(start, end):
+            free = self._free[key]
+            idx = bisect_left(free, entry)
+            if (idx == len(free) or free[idx] != entry) and self.is_free(room_id, *key):
+                free.insert(idx, entry)
+
+    def best_fit(self, min_capacity, start, end):
+        """Smallest free room seating at least min_capacity students, or None"""
+        free = self._free_list(start, end)
+        idx = bisect_left(free, (min_capacity,))
+        return self._by_id[free[idx][1]] if idx < len(free) else None
+
+    def free_rooms(self, start, end, min_capacity=0, largest_first=False):
+        """
+        Yield rooms free over [start, end) with capacity >= min_capacity
+
+        Each step bisects the live free list from the last room yielded, so
+        rooms booked while iterating are skipped.
+        """
+        free = self._free_list(start, end)
+        if largest_first:
+            idx = len(free) - 1
+            while idx >= 0 and free[idx][0] >= min_capacity:
+                entry = free[idx]
+                yield self._by_id[entry[1]]
+                idx = bisect_left(free, entry) - 1
+        else:
+            idx = bisect_left(free, (min_capacity,))
+            while idx < len(free):
+                entry = free[idx]
+                yield self._by_id[entry[1]]
+                idx = bisect_right(free, entry)
+
+    def _free_list(self, start, end):
+        key = (start, end)
+        free = self._free.get(key)
+        if free is None:
+            free = [
+                (r['capacite'], r['id']) for r in self.rooms
+                if self.is_free(r['id'], start, end)
+            ]
+            self._free[key] = free
+            for day in self._days(start, end):
+                self._free_by_day[day].add(key)
+        return free
+
+    def _indexed_overlapping(self, start, end):
+        """Indexed intervals overlapping [start, end)"""
+        keys = set()
+        for day in self._days(start, end):
+            keys.update(self._free_by_day.get(day, ()))
+        return [key for key in keys if key[0] < end and start < key[1]]
+
+    @staticmethod
+    def _days(start, end):
+        day = start.date()
+        last = max(end - timedelta(microseconds=1), start).date()
+        while day <= last:
+            yield day
+            day += timedelta(days=1)
@@ -2,299 +2,708 @@
 # EXAM SCHEDULING OPTIMIZATION ALGORITHM
 # =============================================
 
+import heapq
 import time
+import tracemalloc
+from collections import defaultdict
 from datetime import datetime, timedelta
-from backend.database import execute_query_dict, execute_update, execute_many, get_db_cursor
+from psycopg2.extras import Json
+from backend.database import (
+    execute_query, execute_query_dict, get_db_cursor, bulk_insert, reserve_ids,
+    get_sql_counters
+)
+from backend.room_occupancy import RoomOccupancy
+from backend.slot_assignment import assign_slots
+from backend.conflict_matrix import ConflictMatrix
+from backend.queries import invalidate_publication_state, invalidate_query_cache
+from backend.timetables import has_timetables, rebuild_timetables
+from backend.analytics_views import refresh_analytics_views
 import config
 
+class GenerationCancelled(Exception):
+    """Raised inside generate_schedule when its cancel event is set"""
+
 class ExamScheduler:
     """
     Exam scheduling optimization algorithm
     Implements room/amphi merging and group splitting logic
+
+    The engine works fully in memory: reference data is loaded once with a
+    handful of queries, every step runs on Python structures, and the result
+    is written back in a single transaction.
     """
-    
-    def __init__(self):
+
+    def __init__(self, on_progress=None, cancel_event=None):
+        """
+        Args:
+            on_progress: Optional callable(phase, counts) called as
+                         generation moves through its phases
+            cancel_event: Optional threading.Event; once set, generation
+                          stops at the next phase boundary
+        """
         self.start_time = None
         self.execution_time = None
-        
+        self.on_progress = on_progress
+        self.cancel_event = cancel_event
+
+        # Reference data (filled by _load_data)
+        self.modules = []             # [{id, nom, formation_id, dept_id}]
+        self.student_groups = {}      # etudiant_id -> groupe
+        self.enrolments = {}          # module_id -> [etudiant_id, ...]
+        self.rooms = []               # classrooms, capacity DESC
+        self.amphitheaters = []       # amphis, capacity DESC
+        self.rooms_by_id = {}         # salle_id -> room dict
+        self.room_index = None        # RoomOccupancy over classrooms
+        self.amphi_index = None       # RoomOccupancy over amphis
+        self.professors = []          # [{id, dept_id}]
+        self.conflict_matrix = None   # ConflictMatrix over the inscriptions
+
+        # Generated schedule (written by _flush_schedule)
+        self.exams = []               # [{module_id, date_heure, duree_minutes, dept_id}]
+        self.blocs = []               # [{module_id, salle_id, date_heure, dept_id, students}]
+        self.surveillances = []       # [(bloc_index, prof_id)]
+        self.meta_id = None           # schedule version being generated or edited
+        self.resolution_time = 0.0
+        self.schedule_loaded = False  # in-memory state mirrors the stored schedule
+        self.edit_meta_id = None      # version edited incrementally (None: latest draft)
+        self.edit_published = False   # allow editing the published version in place
+
+        # Per-phase instrumentation of generate_schedule
+        self.phase_metrics = []       # [{phase, wall_time, round_trips, rows_written, peak_memory_mb}]
+        self._current_phase = None
+
     def generate_schedule(self, start_date, default_duration=120):
         """
         Generate complete exam schedule
-        
+
         Args:
             start_date: Start date for exams (datetime.date)
             default_duration: Default exam duration in minutes
-            
+
         Returns:
             dict with generation statistics
         """
         self.start_time = time.time()
-        
+        self.phase_metrics = []
+
+        # The new version is registered up front; readers keep using the
+        # published one until the pointer is switched by publish_schedule()
+        self.meta_id = self._create_version(start_date)
+
+        trace_memory = config.GENERATION_TRACE_MEMORY and not tracemalloc.is_tracing()
+        if trace_memory:
+            tracemalloc.start()
+
         try:
-            # Step 1: Clear existing schedule
-            self._clear_existing_schedule()
-            
+            # Step 1: Load reference data in memory
+            self._begin_phase('load')
+            self._load_data()
+
             # Step 2: Create exams for all modules
-            exam_ids = self._create_exams(start_date, default_duration)
-            
+            self._begin_phase('exams')
+            self._create_exams(start_date, default_duration)
+
             # Step 3: Assign students to exam blocs with room assignment
-            self._assign_students_to_blocs(exam_ids)
-            
+            self._begin_phase('blocs')
+            self._assign_students_to_blocs()
+
             # Step 4: Assign supervisors
+            self._begin_phase('supervisors')
             self._assign_supervisors()
-            
+
             # Step 5: Detect and resolve conflicts
+            self._begin_phase('conflicts')
             conflicts = self._detect_conflicts()
             resolved = self._resolve_conflicts(conflicts)
-            
+
             # Step 6: Calculate statistics
             stats = self._calculate_statistics(conflicts, resolved)
-            
-            self.execution_time = time.time() - self.start_time
-            stats['execution_time'] = round(self.execution_time, 2)
-            
-            # Step 7: Save metadata
-            self._save_metadata(start_date, stats)
-            
+
+            # Step 7: Write the new version and complete its metadata atomically
+            # (last point where the run can be cancelled)
+            self._begin_phase('write')
+            with get_db_cursor(commit=True) as cursor:
+                self._flush_schedule(cursor, self.meta_id)
+
+                self.execution_time = time.time() - self.start_time
+                stats['execution_time'] = round(self.execution_time, 2)
+                stats['meta_id'] = self.meta_id
+
+                self._save_metadata(cursor, self.meta_id, start_date, stats)
+                self._prune_versions(cursor)
+
+            # The version is committed from here on: never fails it
+            self._finish_committed_version()
+            stats['phase_metrics'] = self.phase_metrics
             return stats
-            
+
+        except GenerationCancelled:
+            print(f"Scheduling of version {self.meta_id} cancelled")
+            self._mark_version_failed(self.meta_id)
+            raise
         except Exception as e:
             print(f"Scheduling error: {e}")
+            self._mark_version_failed(self.meta_id)
             raise e
-    
-    def _clear_existing_schedule(self):
-        """Clear all existing exam schedule data"""
-        queries = [
-            "DELETE FROM surveillance",
-            "DELETE FROM bloc_etudiant",
-            "DELETE FROM exam_bloc",
-            "DELETE FROM examens"
+        finally:
+            if trace_memory:
+                tracemalloc.stop()
+
+    def _finish_committed_version(self):
+        """
+        Post-commit steps: planner statistics, analytics views, phase metrics
+
+        Their failure leaves the committed version completed (it only delays
+        statistics and dashboards), so errors are logged, not raised.
+        """
+        invalidate_publication_state()
+        try:
+            self._begin_phase('refresh', check_cancel=False)
+            self._analyze_schedule_tables()
+            refresh_analytics_views()
+        except Exception as e:
+            print(f"Refresh after generating version {self.meta_id} failed: {e}")
+        finally:
+            self._end_phase()
+
+        try:
+            self._save_phase_metrics(self.meta_id)
+        except Exception as e:
+            print(f"Could not save phase metrics of version {self.meta_id}: {e}")
+
+    def _begin_phase(self, phase, check_cancel=True):
+        """Close the running phase's metrics, report progress, start `phase`"""
+        self._end_phase()
+        self._report_progress(phase, check_cancel)
+
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self._current_phase = (phase, time.perf_counter(), get_sql_counters())
+
+    def _end_phase(self):
+        """
+        Record wall time, SQL round-trips, rows written and peak Python
+        memory (whole process, None when not traced) of the running phase
+        """
+        if self._current_phase is None:
+            return
+        phase, started, counters_before = self._current_phase
+        counters = get_sql_counters()
+        peak_memory = None
+        if tracemalloc.is_tracing():
+            peak_memory = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+
+        self.phase_metrics.append({
+            'phase': phase,
+            'wall_time': round(time.perf_counter() - started, 3),
+            'round_trips': counters['round_trips'] - counters_before['round_trips'],
+            'rows_written': counters['rows_written'] - counters_before['rows_written'],
+            'peak_memory_mb': peak_memory,
+        })
+        self._current_phase = None
+
+    def _report_progress(self, phase, check_cancel=True):
+        """
+        Phase boundary: stop if cancelled, then notify on_progress
+
+        Counts are those reached so far (exams created, blocs placed,
+        supervisors assigned).
+        """
+        if check_cancel and self.cancel_event is not None and self.cancel_event.is_set():
+            raise GenerationCancelled(f"generation of version {self.meta_id} cancelled")
+        if self.on_progress is not None:
+            self.on_progress(phase, {
+                'exams_created': len(self.exams),
+                'blocs_placed': len(self.blocs),
+                'supervisors_assigned': len(self.surveillances),
+            })
+
+    # =============================================
+    # INCREMENTAL RESCHEDULING
+    # =============================================
+
+    def move_exam(self, exam_id, new_datetime, force=False):
+        """
+        Move one exam to a new date/time
+
+        Args:
+            exam_id: examens.id
+            new_datetime: New start (datetime, not on a Friday)
+            force: Apply even if students get two exams the same day
+
+        Returns:
+            dict with the size of the written diff
+        """
+        module_id = self._module_of_exam(exam_id)
+        return self._apply_incremental(
+            {module_id: {'date_heure': new_datetime}}, force=force
+        )
+
+    def resize_exam(self, exam_id, duree_minutes):
+        """Change the duration of one exam and re-check its rooms"""
+        if duree_minutes <= 0:
+            raise ValueError("Exam duration must be positive")
+        module_id = self._module_of_exam(exam_id)
+        return self._apply_incremental({module_id: {'duree_minutes': duree_minutes}})
+
+    def reroom_exam(self, exam_id, salle_ids=None):
+        """
+        Re-place one exam's students
+
+        Args:
+            exam_id: examens.id
+            salle_ids: Optional rooms to use, in order; default is a fresh
+                       placement among all free rooms
+        """
+        module_id = self._module_of_exam(exam_id)
+        rooms = None
+        if salle_ids is not None:
+            rooms = [self.rooms_by_id[salle_id] for salle_id in salle_ids]
+        exam = self.exam_by_module[module_id]
+        return self._apply_incremental(
+            {module_id: {'date_heure': exam['date_heure']}}, rooms=rooms
+        )
+
+    def move_formation(self, formation_id, day_shift, force=False):
+        """
+        Shift every exam of a formation by a number of calendar days
+
+        Args:
+            formation_id: formations.id
+            day_shift: Days to add (negative to move earlier)
+            force: Apply even if students get two exams the same day
+        """
+        self._ensure_schedule_loaded()
+        changes = {
+            e['module_id']: {'date_heure': e['date_heure'] + timedelta(days=day_shift)}
+            for e in self.exams if e['formation_id'] == formation_id
+        }
+        if not changes:
+            raise ValueError(f"No exams scheduled for formation {formation_id}")
+        return self._apply_incremental(changes, force=force)
+
+    def _module_of_exam(self, exam_id):
+        self._ensure_schedule_loaded()
+        for exam in self.exams:
+            if exam['id'] == exam_id:
+                return exam['module_id']
+        raise ValueError(f"Exam {exam_id} not found")
+
+    def load_schedule(self, meta_id=None, edit_published=False):
+        """
+        Choose the schedule version later edits apply to and load it in memory
+
+        Args:
+            meta_id: Completed version to edit; default is the latest
+                     unpublished draft
+            edit_published: Allow editing the published version in place
+                            (students and professors see each edit at once);
+                            otherwise generate a new version and publish it
+
+        Raises:
+            ValueError: no such draft, or the version is published
+        """
+        self.edit_meta_id = meta_id
+        self.edit_published = edit_published
+        self.schedule_loaded = False
+        self._load_current_schedule()
+
+    def _ensure_schedule_loaded(self):
+        if not self.schedule_loaded:
+            self._load_current_schedule()
+
+    def _load_current_schedule(self):
+        """Load the edited schedule version (see load_schedule) in memory"""
+        if self.edit_meta_id is None:
+            result = execute_query("""
+                SELECT id, is_published FROM exam_schedule_metadata
+                WHERE status = 'completed' AND NOT is_published
+                ORDER BY generation_date DESC
+                LIMIT 1
+            """)
+            if not result:
+                raise ValueError("No unpublished schedule version to edit")
+        else:
+            result = execute_query("""
+                SELECT id, is_published FROM exam_schedule_metadata
+                WHERE id = %s AND status = 'completed'
+            """, (self.edit_meta_id,))
+            if not result:
+                raise ValueError(f"Schedule version {self.edit_meta_id} is not completed")
+        meta_id, is_published = result[0]
+        if is_published and not self.edit_published:
+            raise ValueError(
+                f"Schedule version {meta_id} is published: edit a new version, "
+                "or pass edit_published=True"
+            )
+
+        self._load_data()
+        modules = {m['id']: m for m in self.modules}
+        self.meta_id = meta_id
+
+        self.exams = []
+        for exam in execute_query_dict("""
+            SELECT id, module_id, date_heure, duree_minutes FROM examens
+            WHERE meta_id = %s
+        """, (self.meta_id,)):
+            module = modules[exam['module_id']]
+            exam['dept_id'] = module['dept_id']
+            exam['formation_id'] = module['formation_id']
+            self.exams.append(exam)
+        exam_by_id = {e['id']: e for e in self.exams}
+
+        students = defaultdict(list)
+        for bloc_id, etudiant_id in execute_query("""
+            SELECT bloc_id, etudiant_id FROM bloc_etudiant
+            WHERE meta_id = %s
+            ORDER BY bloc_id, etudiant_id
+        """, (self.meta_id,)):
+            students[bloc_id].append(etudiant_id)
+
+        self.blocs = []
+        bloc_index = {}
+        self.room_index = RoomOccupancy(self.rooms)
+        self.amphi_index = RoomOccupancy(self.amphitheaters)
+        for bloc_id, examen_id, salle_id in execute_query("""
+            SELECT id, examen_id, salle_id FROM exam_bloc
+            WHERE meta_id = %s
+            ORDER BY id
+        """, (self.meta_id,)):
+            exam = exam_by_id[examen_id]
+            room = self.rooms_by_id[salle_id]
+            bloc_index[bloc_id] = len(self.blocs)
+            self.blocs.append({
+                'id': bloc_id,
+                'module_id': exam['module_id'],
+                'salle_id': salle_id,
+                'salle_type': room['type'],
+                'date_heure': exam['date_heure'],
+                'dept_id': exam['dept_id'],
+                'students': students.get(bloc_id, [])
+            })
+            index = self.amphi_index if room['type'] == 'amphi' else self.room_index
+            index.book(salle_id, *self._exam_interval(exam))
+
+        self.surveillances = [
+            (bloc_index[bloc_id], prof_id)
+            for bloc_id, prof_id in execute_query(
+                "SELECT bloc_id, prof_id FROM surveillance WHERE meta_id = %s", (self.meta_id,)
+            )
         ]
-        
-        for query in queries:
-            execute_update(query)
-    
+
+        self._build_repair_index()
+        self.schedule_loaded = True
+
+    def _apply_incremental(self, changes, rooms=None, force=False):
+        """
+        Apply exam changes in memory and commit only the affected rows
+
+        Only the changed exams' students and the professors of their blocs
+        are checked; the rest of the schedule is left untouched.
+        """
+        started = time.time()
+        self._ensure_schedule_loaded()
+
+        for change in changes.values():
+            new_dt = change.get('date_heure')
+            if new_dt is not None and new_dt.weekday() == 4:
+                raise ValueError("No exams on Friday")
+
+        moves = {m: c['date_heure'] for m, c in changes.items() if 'date_heure' in c}
+        delta = self._student_conflict_delta(moves)
+        if delta > 0 and not force:
+            raise ValueError(f"Change would create {delta} student conflict(s)")
+
+        if not self._update_exams(changes, rooms=rooms):
+            # In-memory state was re-placed; reload before the next change
+            self.schedule_loaded = False
+            raise ValueError("Not enough free rooms for the changed exam(s)")
+
+        touched = [self.exam_by_module[m] for m in changes]
+        blocs = [self.blocs[i] for m in changes for i in self.blocs_by_module.get(m, [])]
+        supervisors = [
+            (self.blocs[i], prof_id)
+            for m in changes for i in self.blocs_by_module.get(m, [])
+            for prof_id in self.bloc_supervisors[i]
+        ]
+
+        try:
+            with get_db_cursor(commit=True) as cursor:
+                exam_ids = [e['id'] for e in touched]
+                # Cascades to bloc_etudiant and surveillance
+                cursor.execute("DELETE FROM exam_bloc WHERE examen_id = ANY(%s)", (exam_ids,))
+                for exam in touched:
+                    cursor.execute("""
+                        UPDATE examens SET date_heure = %s, duree_minutes = %s WHERE id = %s
+                    """, (exam['date_heure'], exam['duree_minutes'], exam['id']))
+
+                for bloc, bloc_id in zip(blocs, reserve_ids(cursor, 'exam_bloc', len(blocs))):
+                    bloc['id'] = bloc_id
+                meta_id = self.meta_id
+                bulk_insert('exam_bloc', ('id', 'meta_id', 'examen_id', 'salle_id'), [
+                    (b['id'], meta_id, self.exam_by_module[b['module_id']]['id'], b['salle_id'])
+                    for b in blocs
+                ], cursor=cursor)
+                bulk_insert('bloc_etudiant', ('meta_id', 'bloc_id', 'etudiant_id'), [
+                    (meta_id, b['id'], student_id) for b in blocs for student_id in b['students']
+                ], cursor=cursor)
+                bulk_insert('surveillance', ('meta_id', 'bloc_id', 'prof_id'), [
+                    (meta_id, b['id'], prof_id) for b, prof_id in supervisors
+                ], cursor=cursor)
+
+                # Only the departments owning a changed exam must validate again
+                cursor.execute("""
+                    UPDATE validation_state
+                    SET status = 'PENDING', val_date = CURRENT_TIMESTAMP
+                    WHERE validator_role = 'CHEF_DEPT'
+                    AND dept_id = ANY(%s)
+                    AND meta_id = %s
+                """, (sorted({e['dept_id'] for e in touched}), self.meta_id))
+
+                # Patch the published timetable snapshots for the changed exams
+                if has_timetables(cursor, self.meta_id):
+                    rebuild_timetables(cursor, self.meta_id, exam_ids)
+
+                # Version totals follow the edit
+                cursor.execute("""
+                    UPDATE exam_schedule_metadata SET total_blocs = %s, end_date = %s
+                    WHERE id = %s
+                """, (
+                    sum(1 for b in self.blocs if b is not None),
+                    max(e['date_heure'].date() for e in self.exams),
+                    self.meta_id
+                ))
+        except Exception:
+            # The in-memory schedule no longer mirrors the stored one
+            self.schedule_loaded = False
+            raise
+
+        # Dashboards catch up in the background; the edit itself stays fast
+        invalidate_query_cache()
+        refresh_analytics_views(wait=False)
+
+        # Removed blocs stay as None placeholders; indexes remain valid
+        return {
+            'exams_updated': len(touched),
+            'blocs_written': len(blocs),
+            'students_checked': sum(len(b['students']) for b in blocs),
+            'professors_checked': len({prof_id for _, prof_id in supervisors}),
+            'student_conflicts_delta': delta,
+            'execution_time': round(time.time() - started, 3)
+        }
+
+    def _load_data(self):
+        """Load modules, students, inscriptions, rooms and professors in memory"""
+        self.modules = execute_query_dict("""
+            SELECT m.id, m.nom, m.formation_id, f.dept_id
+            FROM modules m
+            JOIN formations f ON m.formation_id = f.id
+            ORDER BY m.formation_id, m.id
+        """)
+
+        self.student_groups = dict(execute_query("SELECT id, groupe FROM etudiants"))
+
+        # DISTINCT: a student may hold one inscription per academic year
+        self.enrolments = defaultdict(list)
+        for module_id, etudiant_id in execute_query("""
+            SELECT DISTINCT module_id, etudiant_id
+            FROM inscriptions
+            ORDER BY module_id, etudiant_id
+        """):
+            self.enrolments[module_id].append(etudiant_id)
+
+        all_rooms = execute_query_dict("""
+            SELECT id, nom, capacite, type
+            FROM lieu_examen
+            ORDER BY capacite DESC, id
+        """)
+        self.rooms = [r for r in all_rooms if r['type'] == 'classe']
+        self.amphitheaters = [r for r in all_rooms if r['type'] == 'amphi']
+        self.rooms_by_id = {r['id']: r for r in all_rooms}
+
+        self.professors = execute_query_dict("""
+            SELECT id, dept_id
+            FROM professeurs
+            ORDER BY id
+        """)
+
+        self.exams = []
+        self.blocs = []
+        self.surveillances = []
+        self.schedule_loaded = False
+
     def _create_exams(self, start_date, default_duration):
         """
         Create exam records for all modules
-        SMART STRATEGY: Group by formation to avoid student conflicts
+        Slots come from a DSatur colouring of the module conflict graph:
+        modules sharing a student never fall on the same day, and each slot
+        stays within the seats and rooms actually available.
         """
-        # Get all modules with formation_id
-        modules = execute_query_dict("""
-            SELECT id, nom, formation_id 
-            FROM modules 
-            ORDER BY formation_id, id
-        """)
-        
+        self.conflict_matrix = ConflictMatrix.from_enrolments(self.enrolments)
+        graph = self.conflict_matrix.conflict_graph()
+
+        # Rooms a group occupies when it does not fit in a single classroom
+        all_rooms = self.rooms + self.amphitheaters
+        room_size = max(
+            sum(r['capacite'] for r in self.rooms) // max(len(self.rooms), 1), 1
+        )
+
+        demand = {}
+        rooms_needed = {}
+        for m in self.modules:
+            groups = self._get_students_by_group(m['id'])
+            demand[m['id']] = sum(len(g) for g in groups.values())
+            rooms_needed[m['id']] = sum(-(-len(g) // room_size) for g in groups.values())
+
+        seats_per_slot = int(sum(r['capacite'] for r in all_rooms) * config.SLOT_SEAT_FILL_RATE)
+
+        # An exam longer than the gap to the next slots still holds its rooms there
+        hours = config.EXAM_TIME_SLOTS
+        slot_spans = [
+            [s for s in range(i, len(hours)) if hours[s] * 60 < hours[i] * 60 + default_duration]
+            for i in range(len(hours))
+        ]
+
+        deadline = (self.start_time or time.time()) + \
+            config.MAX_SCHEDULE_GENERATION_TIME * config.SLOT_ASSIGNMENT_TIME_SHARE
+
+        print(f"Scheduling {len(self.modules)} modules "
+              f"({self.conflict_matrix.conflict_pairs()} conflict pairs)...")
+
+        slots = assign_slots(
+            [m['id'] for m in self.modules], graph, demand, rooms_needed,
+            slots_per_day=len(config.EXAM_TIME_SLOTS),
+            seats_per_slot=seats_per_slot,
+            rooms_per_slot=len(all_rooms),
+            deadline=deadline,
+            slot_spans=slot_spans
+        )
+
         exams_created = []
-        
-        # Group modules by formation
-        from collections import defaultdict
-        formation_modules = defaultdict(list)
-        for m in modules:
-            formation_modules[m['formation_id']].append(m)
-            
-        print(f"Scheduling {len(modules)} modules across {len(formation_modules)} formations...")
-        
-        # Schedule each formation
-        for f_id, f_modules in formation_modules.items():
-            # Spread strategy:
-            # 1. Start offset based on formation ID (balances global load)
-            # 2. Each module in formation gets a distinct day (prevents student conflicts)
-            # 3. Time slot rotates based on formation (balances daily room usage)
-            
-            start_offset = (f_id % 6) # Spread starts over first 6 days
-            slot_base = (f_id % 4)    # Assign specific slot to this formation
-            
-            for i, module in enumerate(f_modules):
-                # Calculate target day index (skipping Fridays logic needed)
-                # Spacing: 1 module per day per formation
-                # day_index 0 is start_date
-                
-                day_offset = start_offset + i
-                
-                # Calculate actual date skipping Fridays
-                exam_date = self._get_date_skipping_fridays(start_date, day_offset)
-                
-                # Determine time slot (rotate slightly to fill gaps)
-                # But kept constant for formation usually better for mental model
-                # Let's use fixed slot for formation, unless overridden
-                slot_index = (slot_base + (i // 7)) % 4 # Shift slot only after a week
-                
-                hour = config.EXAM_TIME_SLOTS[slot_index]
-                
-                exam_time = datetime.combine(
-                    exam_date,
-                    datetime.min.time()
-                ).replace(hour=hour)
-                
-                exams_created.append({
-                    'module_id': module['id'],
-                    'date_heure': exam_time,
-                    'duree_minutes': default_duration
-                })
-        
-        # Batch insert exams
-        query = """
-            INSERT INTO examens (module_id, date_heure, duree_minutes)
-            VALUES (%s, %s, %s)
-            RETURNING id, module_id
-        """
-        
-        exam_ids = {}
-        with get_db_cursor(commit=True) as cursor:
-            # Optimization: Use executemany? No, we need returning IDs.
-            # Stick to loop for now, 1200 queries is fast enough (order of ms)
-            for exam in exams_created:
-                cursor.execute(query, (exam['module_id'], exam['date_heure'], exam['duree_minutes']))
-                result = cursor.fetchone()
-                exam_ids[result[1]] = result[0]  # module_id -> exam_id
-        
-        return exam_ids
+        for module in self.modules:
+            day_index, slot_index = slots[module['id']]
+
+            # Calculate actual date skipping Fridays
+            exam_date = self._get_date_skipping_fridays(start_date, day_index)
+            hour = config.EXAM_TIME_SLOTS[slot_index]
+
+            exam_time = datetime.combine(
+                exam_date,
+                datetime.min.time()
+            ).replace(hour=hour)
+
+            exams_created.append({
+                'module_id': module['id'],
+                'date_heure': exam_time,
+                'duree_minutes': default_duration,
+                'dept_id': module['dept_id'],
+                'formation_id': module['formation_id']
+            })
+
+        days = len({day for day, _ in slots.values()})
+        print(f"Exam session spans {days} day(s)")
+
+        self.exams = exams_created
+        return exams_created
 
     def _get_date_skipping_fridays(self, start_date, day_offset):
         """
         Calculate date adding offset but skipping Fridays
-        Logic: 
+        Logic:
         1. Find first valid day (if start is Friday, move to Saturday)
         2. From there, add 'day_offset' valid days
         """
         current_date = start_date
-        
+
         # 1. Normalize start date
         while current_date.weekday() == 4: # If Friday
              current_date += timedelta(days=1)
-             
+
         # 2. Add offset days skipping Fridays
         days_added = 0
         while days_added < day_offset:
             current_date += timedelta(days=1)
             if current_date.weekday() != 4: # If not Friday
                 days_added += 1
-                
+
         return current_date
-    
-    
-    def _assign_students_to_blocs(self, exam_ids):
+
+
+    def _assign_students_to_blocs(self):
         """
         Assign students to exam blocs with room assignment
         Implements merge/split logic with TIME-AWARE room tracking
+        (a room is busy for the whole [start, start + duration) interval)
         """
-        # Get rooms and amphitheaters
-        rooms = execute_query_dict("""
-            SELECT id, nom, capacite, type 
-            FROM lieu_examen 
-            WHERE type = 'classe'
-            ORDER BY capacite DESC
-        """)
-        
-        amphitheaters = execute_query_dict("""
-            SELECT id, nom, capacite
-            FROM lieu_examen 
-            WHERE type = 'amphi'
-            ORDER BY capacite DESC
-        """)
-        
-        # Track room availability: date_time_str -> set(room_ids)
-        room_schedule = {} # stores occupied room_ids for each datetime
-        
-        # Helper to check availability
-        def is_room_free(room_id, exam_dt):
-            time_key = exam_dt.isoformat()
-            if time_key not in room_schedule:
-                return True
-            return room_id not in room_schedule[time_key]
-            
-        # Helper to book room
-        def book_room(room_id, exam_dt):
-            time_key = exam_dt.isoformat()
-            if time_key not in room_schedule:
-                room_schedule[time_key] = set()
-            room_schedule[time_key].add(room_id)
-
-        # Get exam details (need time for collision detection)
-        if not exam_ids:
-            return
+        self.room_index = RoomOccupancy(self.rooms)
+        self.amphi_index = RoomOccupancy(self.amphitheaters)
 
-        exam_details_map = {}
-        # Fetch all exams at once
-        all_exams = execute_query_dict("SELECT id, date_heure, module_id FROM examens")
-        for ex in all_exams:
-            exam_details_map[ex['id']] = ex
+        if not self.exams:
+            return
 
         # Process exams
         # Ideally, we should process exams by time to emulate reality, or by size?
         # Let's process by time then by size to ensure fairness
-        sorted_exams = sorted(
-            [exam_details_map[eid] for eid in exam_ids.values()],
-            key=lambda x: x['date_heure']
-        )
-        
-        for exam in sorted_exams:
-            exam_id = exam['id']
-            module_id = exam['module_id']
-            exam_time = exam['date_heure']
-            
-            students_by_group = self._get_students_by_group(module_id)
-            
+        sorted_exams = sorted(self.exams, key=lambda x: x['date_heure'])
+
+        for position, exam in enumerate(sorted_exams, 1):
+            # Longest in-memory step: report (and honour cancellation) as it goes
+            if position % 100 == 0:
+                self._report_progress('blocs')
+
+            students_by_group = self._get_students_by_group(exam['module_id'])
+
             if not students_by_group:
                 continue
-            
+
+            start, end = self._exam_interval(exam)
+
             # Try to merge groups in amphitheaters first
             remaining_groups = self._try_merge_in_amphitheaters(
-                exam_id, students_by_group, amphitheaters, 
-                exam_time, is_room_free, book_room
+                exam, students_by_group, start, end
             )
-            
+
             # Assign remaining groups to rooms
             if remaining_groups:
-                self._assign_groups_to_rooms(
-                    exam_id, remaining_groups, rooms,
-                    exam_time, is_room_free, book_room
-                )
-    
+                self._assign_groups_to_rooms(exam, remaining_groups, start, end)
+
+    def _exam_interval(self, exam):
+        """Return the [start, end) datetimes an exam occupies its rooms"""
+        start = exam['date_heure']
+        return start, start + timedelta(minutes=exam['duree_minutes'])
+
     def _get_students_by_group(self, module_id):
         """Get students enrolled in a module, grouped by their group"""
-        query = """
-            SELECT e.id, e.groupe
-            FROM inscriptions i
-            JOIN etudiants e ON i.etudiant_id = e.id
-            WHERE i.module_id = %s
-            ORDER BY e.groupe, e.id
-        """
-        
-        students = execute_query_dict(query, (module_id,))
-        
+        students = sorted(
+            (self.student_groups[sid], sid)
+            for sid in self.enrolments.get(module_id, [])
+            if sid in self.student_groups
+        )
+
         # Group students
         groups = {}
-        for student in students:
-            group = student['groupe']
+        for group, student_id in students:
             if group not in groups:
                 groups[group] = []
-            groups[group].append(student['id'])
-        
+            groups[group].append(student_id)
+
         return groups
-    
-    def _try_merge_in_amphitheaters(self, exam_id, students_by_group, amphitheaters, 
-                                  exam_time, is_room_free_func, book_room_func):
+
+    def _try_merge_in_amphitheaters(self, exam, students_by_group, start, end):
         """
         Try to merge multiple groups in amphitheaters
         """
         remaining_groups = dict(students_by_group)
-        
-        # Sort amphis by capacity descending (already sorted), but we iterate looking for free ones
-        for amphi in amphitheaters:
+
+        # Free amphis only, largest first
+        for amphi in self.amphi_index.free_rooms(start, end, largest_first=True):
             if not remaining_groups:
                 break
-                
-            # STRICT CHECK: Only use if free
-            if not is_room_free_func(amphi['id'], exam_time):
-                continue
-            
+
             # Try to fit as many groups as possible in this amphi
             merged_students = []
             merged_group_names = []
-            
+
             # Greedy fit: take largest groups first or just order?
             # Let's stick to simple iteration for now, but we can improve
             for group_name in list(remaining_groups.keys()):
@@ -302,7 +711,7 @@ class ExamScheduler:
                     merged_students.extend(remaining_groups[group_name])
                     merged_group_names.append(group_name)
                     # Don't delete yet, wait until confirmed used
-            
+
             # Create bloc if we merged at least 2 groups or filled the amphi well (>60%)
             # OR if it's a huge group that needs an amphi anyway
             should_use = False
@@ -310,309 +719,785 @@ class ExamScheduler:
                 should_use = True
             elif len(merged_students) >= amphi['capacite'] * 0.6:
                 should_use = True
-            elif len(merged_group_names) == 1 and len(merged_students) > 50: 
+            elif len(merged_group_names) == 1 and len(merged_students) > 50:
                 # Single large group
                 should_use = True
 
             if should_use:
-                self._create_exam_bloc(exam_id, amphi['id'], merged_students)
-                book_room_func(amphi['id'], exam_time) # BOOK IT
-                
+                self._create_exam_bloc(exam, amphi, merged_students)
+                self.amphi_index.book(amphi['id'], start, end) # BOOK IT
+
                 # Remove assigned groups
                 for name in merged_group_names:
                     del remaining_groups[name]
-        
+
         return remaining_groups
-    
-    def _assign_groups_to_rooms(self, exam_id, students_by_group, rooms,
-                              exam_time, is_room_free_func, book_room_func):
+
+    def _assign_groups_to_rooms(self, exam, students_by_group, start, end):
         """
         Assign groups to regular rooms
         """
-        # Sort rooms by capacity ASCENDING to find best fit (smallest room that fits)
-        # But for splitting we might want large rooms.
-        # Strategy: 
+        # Strategy:
         # 1. Try to fit whole group in a specific room (Best Fit)
         # 2. If fail, split group
-        
-        sorted_rooms_asc = sorted(rooms, key=lambda x: x['capacite'])
-        
         for group_name, student_ids in students_by_group.items():
-            num_students = len(student_ids)
-            
-            # Find Best Fit room
-            suitable_room = None
-            for room in sorted_rooms_asc:
-                if room['capacite'] >= num_students and is_room_free_func(room['id'], exam_time):
-                    suitable_room = room
-                    break
-            
+            # Smallest free room that fits
+            suitable_room = self.room_index.best_fit(len(student_ids), start, end)
+
             if suitable_room:
                 # perfect match
-                self._create_exam_bloc(exam_id, suitable_room['id'], student_ids)
-                book_room_func(suitable_room['id'], exam_time)
+                self._create_exam_bloc(exam, suitable_room, student_ids)
+                self.room_index.book(suitable_room['id'], start, end)
             else:
                 # Split group across multiple rooms
-                self._split_group_to_rooms(
-                    exam_id, student_ids, rooms, 
-                    exam_time, is_room_free_func, book_room_func
-                )
-    
-    def _split_group_to_rooms(self, exam_id, student_ids, rooms,
-                            exam_time, is_room_free_func, book_room_func):
-        """Split a large group across multiple rooms"""
+                self._split_group_to_rooms(exam, student_ids, start, end)
+
+    def _split_group_to_rooms(self, exam, student_ids, start, end):
+        """
+        Split a large group across multiple rooms
+
+        Returns:
+            The students left without a seat (in their original order)
+        """
         remaining_students = list(student_ids)
-        
-        # Use largest available rooms for splitting to minimize fragmentation
-        # 'rooms' is passed as default sort (Descending capacity usually)
-        sorted_rooms_desc = sorted(rooms, key=lambda x: x['capacite'], reverse=True)
 
-        for room in sorted_rooms_desc:
+        # Use largest available rooms for splitting to minimize fragmentation
+        for room in self.room_index.free_rooms(start, end, largest_first=True):
             if not remaining_students:
                 break
-                
-            if not is_room_free_func(room['id'], exam_time):
-                continue
-            
+
             # Take as many students as fit in this room
             chunk_size = min(len(remaining_students), room['capacite'])
             room_students = remaining_students[:chunk_size]
             remaining_students = remaining_students[chunk_size:]
-            
-            self._create_exam_bloc(exam_id, room['id'], room_students)
-            book_room_func(room['id'], exam_time)
-            
+
+            self._create_exam_bloc(exam, room, room_students)
+            self.room_index.book(room['id'], start, end)
+
         if remaining_students:
-            print(f"WARNING: Could not house {len(remaining_students)} students for exam {exam_id} at {exam_time}!")
-            # Fallback: overload the last room or create a virtual overflow room?
-            # For now, let's just log it. In reality this triggers the 'student_no_seat' conflict.
-                                
-    def _create_exam_bloc(self, exam_id, salle_id, student_ids):
-        """Create an exam bloc and assign students"""
-        # Create bloc
-        query_bloc = """
-            INSERT INTO exam_bloc (examen_id, salle_id)
-            VALUES (%s, %s)
-            RETURNING id
-        """
-        
-        with get_db_cursor(commit=True) as cursor:
-            cursor.execute(query_bloc, (exam_id, salle_id))
-            bloc_id = cursor.fetchone()[0]
-            
-            # Assign students to bloc
-            query_students = """
-                INSERT INTO bloc_etudiant (bloc_id, etudiant_id)
-                VALUES (%s, %s)
-            """
-            
-            student_data = [(bloc_id, student_id) for student_id in student_ids]
-            cursor.executemany(query_students, student_data)
-    
+            print(f"WARNING: Could not house {len(remaining_students)} students for module {exam['module_id']} at {start}!")
+            # Reported as a 'student_no_seat' conflict by _detect_conflicts
+        return remaining_students
+
+    def _create_exam_bloc(self, exam, room, student_ids):
+        """Create an in-memory exam bloc and assign students"""
+        self.blocs.append({
+            'module_id': exam['module_id'],
+            'salle_id': room['id'],
+            'salle_type': room['type'],
+            'date_heure': exam['date_heure'],
+            'dept_id': exam['dept_id'],
+            'students': list(student_ids)
+        })
+        return len(self.blocs) - 1
+
     def _assign_supervisors(self):
-        """Assign supervisors to exam blocs"""
-        # Get all blocs that need supervision
-        blocs = execute_query_dict("""
-            SELECT eb.id as bloc_id, eb.salle_id, ex.date_heure, ex.module_id,
-                   le.type as salle_type, m.formation_id, f.dept_id
-            FROM exam_bloc eb
-            JOIN examens ex ON eb.examen_id = ex.id
-            JOIN lieu_examen le ON eb.salle_id = le.id
-            JOIN modules m ON ex.module_id = m.id
-            JOIN formations f ON m.formation_id = f.id
-            ORDER BY ex.date_heure, eb.id
-        """)
-        
-        # Track professor assignments per day
-        prof_assignments = {}  # date -> prof_id -> count
-        
-        for bloc in blocs:
+        """
+        Assign supervisors to exam blocs
+
+        Professors sit in per-department heaps keyed by (daily load, total
+        load, id), rebuilt once per exam day and updated in place, so each
+        pick is O(log professors) and load is spread evenly.
+        """
+        # Blocs in chronological order (stable on creation order)
+        bloc_order = sorted(
+            range(len(self.blocs)),
+            key=lambda i: self.blocs[i]['date_heure']
+        )
+
+        total_load = {p['id']: 0 for p in self.professors}
+        intervals = {e['module_id']: self._exam_interval(e) for e in self.exams}
+        current_date = None
+        queues = {}
+        busy = defaultdict(list)  # prof_id -> [(start, end)] supervised that day
+
+        for bloc_index in bloc_order:
+            bloc = self.blocs[bloc_index]
             supervisors_needed = config.ROOM_SUPERVISION[bloc['salle_type']]
             exam_date = bloc['date_heure'].date()
-            
-            # Get available professors (prefer same department)
-            available_profs = self._get_available_professors(
-                exam_date, bloc['dept_id'], prof_assignments
-            )
-            
-            # Assign supervisors
-            assigned = 0
-            for prof in available_profs:
-                if assigned >= supervisors_needed:
+
+            if exam_date != current_date:
+                current_date = exam_date
+                queues = self._build_supervisor_queues(total_load)
+                busy.clear()
+            start, end = intervals[bloc['module_id']]
+
+            # Pop least-loaded professors (prefer same department)
+            picked = []
+            skipped = []
+            while len(picked) < supervisors_needed:
+                entry = self._pop_supervisor(queues, bloc['dept_id'])
+                if entry is None:
                     break
-                
-                # Assign professor
-                execute_update(
-                    "INSERT INTO surveillance (bloc_id, prof_id) VALUES (%s, %s)",
-                    (bloc['bloc_id'], prof['id'])
-                )
-                
-                # Track assignment
-                if exam_date not in prof_assignments:
-                    prof_assignments[exam_date] = {}
-                prof_assignments[exam_date][prof['id']] = \
-                    prof_assignments[exam_date].get(prof['id'], 0) + 1
-                
-                assigned += 1
-    
-    def _get_available_professors(self, exam_date, preferred_dept_id, prof_assignments):
-        """Get professors available for supervision on a given date"""
-        # Get all professors, prefer same department
-        all_profs = execute_query_dict("""
-            SELECT id, dept_id
-            FROM professeurs
-            ORDER BY CASE WHEN dept_id = %s THEN 0 ELSE 1 END, id
-        """, (preferred_dept_id,))
-        
-        # Filter by availability (max 3 per day)
-        available = []
-        for prof in all_profs:
-            current_count = prof_assignments.get(exam_date, {}).get(prof['id'], 0)
-            if current_count < config.MAX_SUPERVISIONS_PER_DAY:
-                available.append(prof)
-        
-        return available
-    
+                if any(s < end and start < e for s, e in busy[entry[2]]):
+                    skipped.append(entry)
+                    continue
+                picked.append(entry)
+
+            for daily, total, prof_id, dept_id in picked:
+                self.surveillances.append((bloc_index, prof_id))
+                busy[prof_id].append((start, end))
+                total_load[prof_id] = total + 1
+
+                # Back in the queue until the daily limit is reached
+                if daily + 1 < config.MAX_SUPERVISIONS_PER_DAY:
+                    heapq.heappush(queues[dept_id], (daily + 1, total + 1, prof_id, dept_id))
+
+            for entry in skipped:
+                heapq.heappush(queues[entry[3]], entry)
+
+    def _build_supervisor_queues(self, total_load):
+        """Build one (daily load, total load) heap per department for a new day"""
+        queues = defaultdict(list)
+        for prof in self.professors:
+            queues[prof['dept_id']].append((0, total_load[prof['id']], prof['id'], prof['dept_id']))
+        for queue in queues.values():
+            heapq.heapify(queue)
+        return queues
+
+    def _pop_supervisor(self, queues, preferred_dept_id):
+        """Pop the least-loaded professor, same department first"""
+        queue = queues.get(preferred_dept_id)
+        if queue:
+            return heapq.heappop(queue)
+
+        # Fallback: least-loaded head among the other departments
+        best = None
+        for dept_id, queue in queues.items():
+            if queue and (best is None or queue[0] < queues[best][0]):
+                best = dept_id
+        if best is None:
+            return None
+        return heapq.heappop(queues[best])
+
     def _detect_conflicts(self):
-        """Detect scheduling conflicts"""
+        """Detect scheduling conflicts on the in-memory schedule"""
         conflicts = {
             'student_multiple_exams': [],
             'professor_overloaded': [],
-            'room_capacity': []
+            'room_capacity': [],
+            'student_no_seat': []
         }
-        
+
         # Conflict 1: Students with multiple exams same day
-        query_student = """
-            SELECT e.id, e.nom, e.prenom, DATE(ex.date_heure) as exam_date, 
-                   COUNT(*) as exam_count
-            FROM etudiants e
-            JOIN bloc_etudiant be ON e.id = be.etudiant_id
-            JOIN exam_bloc eb ON be.bloc_id = eb.id
-            JOIN examens ex ON eb.examen_id = ex.id
-            GROUP BY e.id, e.nom, e.prenom, DATE(ex.date_heure)
-            HAVING COUNT(*) > 1
-        """
-        conflicts['student_multiple_exams'] = execute_query_dict(query_student)
-        
+        student_days = defaultdict(int)
+        for bloc in self.blocs:
+            exam_date = bloc['date_heure'].date()
+            for student_id in bloc['students']:
+                student_days[(student_id, exam_date)] += 1
+        conflicts['student_multiple_exams'] = [
+            {'id': student_id, 'exam_date': exam_date, 'exam_count': count}
+            for (student_id, exam_date), count in student_days.items()
+            if count > 1
+        ]
+
         # Conflict 2: Professors with >3 supervisions per day
-        query_prof = """
-            SELECT p.id, p.nom, p.prenom, DATE(ex.date_heure) as exam_date,
-                   COUNT(*) as supervision_count
-            FROM professeurs p
-            JOIN surveillance s ON p.id = s.prof_id
-            JOIN exam_bloc eb ON s.bloc_id = eb.id
-            JOIN examens ex ON eb.examen_id = ex.id
-            GROUP BY p.id, p.nom, p.prenom, DATE(ex.date_heure)
-            HAVING COUNT(*) > %s
-        """
-        conflicts['professor_overloaded'] = execute_query_dict(
-            query_prof, (config.MAX_SUPERVISIONS_PER_DAY,)
-        )
-        
+        prof_days = defaultdict(int)
+        for bloc_index, prof_id in self.surveillances:
+            prof_days[(prof_id, self.blocs[bloc_index]['date_heure'].date())] += 1
+        conflicts['professor_overloaded'] = [
+            {'id': prof_id, 'exam_date': exam_date, 'supervision_count': count}
+            for (prof_id, exam_date), count in prof_days.items()
+            if count > config.MAX_SUPERVISIONS_PER_DAY
+        ]
+
         # Conflict 3: Room capacity violations
-        query_capacity = """
-            SELECT eb.id as bloc_id, le.nom as salle, le.capacite,
-                   COUNT(be.etudiant_id) as student_count
-            FROM exam_bloc eb
-            JOIN lieu_examen le ON eb.salle_id = le.id
-            LEFT JOIN bloc_etudiant be ON eb.id = be.bloc_id
-            GROUP BY eb.id, le.nom, le.capacite
-            HAVING COUNT(be.etudiant_id) > le.capacite
-        """
-        conflicts['room_capacity'] = execute_query_dict(query_capacity)
-        
+        for bloc_index, bloc in enumerate(self.blocs):
+            room = self.rooms_by_id[bloc['salle_id']]
+            if len(bloc['students']) > room['capacite']:
+                conflicts['room_capacity'].append({
+                    'bloc_index': bloc_index,
+                    'salle': room['nom'],
+                    'capacite': room['capacite'],
+                    'student_count': len(bloc['students'])
+                })
+
+        # Conflict 4: Enrolled students left without a seat
+        seated = defaultdict(int)
+        for bloc in self.blocs:
+            seated[bloc['module_id']] += len(bloc['students'])
+        for exam in self.exams:
+            enrolled = sum(
+                1 for sid in self.enrolments.get(exam['module_id'], ())
+                if sid in self.student_groups
+            )
+            if seated[exam['module_id']] < enrolled:
+                conflicts['student_no_seat'].append({
+                    'module_id': exam['module_id'],
+                    'student_count': enrolled - seated[exam['module_id']]
+                })
+
         return conflicts
-    
+
     def _resolve_conflicts(self, conflicts):
-        """Attempt to automatically resolve conflicts"""
-        resolved_count = 0
-        
-        # For now, conflicts should be minimal due to proper assignment logic
-        # Manual resolution would be needed for complex cases
-        
+        """
+        Attempt to automatically resolve conflicts
+
+        Repairs the in-memory schedule with local moves:
+        - student same-day conflicts: swap exam days within a formation,
+          or move the exam to another session day at the same hour
+        - professor overloads: hand extra supervisions to a free professor
+        - capacity overflows: re-split the extra students into free rooms
+        - students without a seat: place them in free rooms
+        Moves are accepted on incremental delta checks over the touched
+        students and professors only.
+
+        Returns:
+            Number of conflicts resolved
+        """
+        started = time.time()
+        detected = sum(len(v) for v in conflicts.values())
+        if detected == 0:
+            self.resolution_time = 0.0
+            return 0
+
+        self._build_repair_index()
+
+        for conflict in conflicts.get('room_capacity', []):
+            self._repair_capacity(conflict['bloc_index'])
+
+        for conflict in conflicts.get('student_no_seat', []):
+            self._repair_unseated(conflict['module_id'])
+
+        for conflict in conflicts.get('student_multiple_exams', []):
+            self._repair_student_day(conflict['id'], conflict['exam_date'])
+
+        for conflict in conflicts.get('professor_overloaded', []):
+            self._repair_professor_day(conflict['id'], conflict['exam_date'])
+
+        self._compact_blocs()
+
+        remaining = sum(len(v) for v in self._detect_conflicts().values())
+        resolved_count = max(detected - remaining, 0)
+
+        self.resolution_time = time.time() - started
+        print(f"Resolved {resolved_count}/{detected} conflicts in {self.resolution_time:.2f}s")
+
         return resolved_count
-    
+
+    def _build_repair_index(self):
+        """Index the in-memory schedule for incremental updates"""
+        self.exam_by_module = {e['module_id']: e for e in self.exams}
+        self.blocs_by_module = defaultdict(list)
+        self.bloc_supervisors = defaultdict(list)
+        self.student_day = defaultdict(int)      # (etudiant_id, date) -> exams
+        self.student_modules = defaultdict(set)  # etudiant_id -> placed module_ids
+        self.prof_day = defaultdict(int)         # (prof_id, date) -> supervisions
+        self.prof_total = defaultdict(int)       # prof_id -> supervisions
+        self.prof_slots = defaultdict(list)      # (prof_id, date) -> [(start, end)]
+
+        intervals = {e['module_id']: self._exam_interval(e) for e in self.exams}
+        for i, bloc in enumerate(self.blocs):
+            self.blocs_by_module[bloc['module_id']].append(i)
+            exam_date = bloc['date_heure'].date()
+            for student_id in bloc['students']:
+                self.student_day[(student_id, exam_date)] += 1
+                self.student_modules[student_id].add(bloc['module_id'])
+
+        for bloc_index, prof_id in self.surveillances:
+            self.bloc_supervisors[bloc_index].append(prof_id)
+            bloc = self.blocs[bloc_index]
+            self._book_supervisor(prof_id, bloc, intervals[bloc['module_id']])
+
+    def _book_supervisor(self, prof_id, bloc, interval):
+        exam_date = bloc['date_heure'].date()
+        self.prof_day[(prof_id, exam_date)] += 1
+        self.prof_total[prof_id] += 1
+        self.prof_slots[(prof_id, exam_date)].append(interval)
+
+    def _unbook_supervisor(self, prof_id, bloc, interval):
+        exam_date = bloc['date_heure'].date()
+        self.prof_day[(prof_id, exam_date)] -= 1
+        self.prof_total[prof_id] -= 1
+        self.prof_slots[(prof_id, exam_date)].remove(interval)
+
+    def _pick_supervisor(self, bloc, exclude=()):
+        """Least-loaded professor free during the bloc, same department first"""
+        start, end = self._exam_interval(self.exam_by_module[bloc['module_id']])
+        exam_date = start.date()
+
+        best = None
+        best_key = None
+        for prof in self.professors:
+            prof_id = prof['id']
+            if prof_id in exclude:
+                continue
+            if self.prof_day[(prof_id, exam_date)] >= config.MAX_SUPERVISIONS_PER_DAY:
+                continue
+            if any(s < end and start < e for s, e in self.prof_slots.get((prof_id, exam_date), ())):
+                continue
+            key = (
+                0 if prof['dept_id'] == bloc['dept_id'] else 1,
+                self.prof_day[(prof_id, exam_date)],
+                self.prof_total[prof_id],
+                prof_id
+            )
+            if best_key is None or key < best_key:
+                best, best_key = prof_id, key
+        return best
+
+    def _staff_bloc(self, bloc_index):
+        """Assign the required supervisors to a newly created bloc"""
+        bloc = self.blocs[bloc_index]
+        interval = self._exam_interval(self.exam_by_module[bloc['module_id']])
+        supervisors = self.bloc_supervisors[bloc_index]
+        while len(supervisors) < config.ROOM_SUPERVISION[bloc['salle_type']]:
+            prof_id = self._pick_supervisor(bloc, exclude=supervisors)
+            if prof_id is None:
+                break
+            supervisors.append(prof_id)
+            self._book_supervisor(prof_id, bloc, interval)
+
+    def _unplace_exam(self, exam):
+        """Remove an exam's blocs, room bookings and supervisions"""
+        start, end = self._exam_interval(exam)
+        for i in self.blocs_by_module.pop(exam['module_id'], []):
+            bloc = self.blocs[i]
+            index = self.amphi_index if bloc['salle_type'] == 'amphi' else self.room_index
+            index.release(bloc['salle_id'], start, end)
+            for prof_id in self.bloc_supervisors.pop(i, []):
+                self._unbook_supervisor(prof_id, bloc, (start, end))
+            exam_date = start.date()
+            for student_id in bloc['students']:
+                self.student_day[(student_id, exam_date)] -= 1
+                self.student_modules[student_id].discard(exam['module_id'])
+            self.blocs[i] = None
+
+    def _place_exam(self, exam):
+        """
+        Place an exam's students in rooms at its current time and staff the blocs
+
+        Returns:
+            True if every enrolled student got a seat
+        """
+        students_by_group = self._get_students_by_group(exam['module_id'])
+        start, end = self._exam_interval(exam)
+        first = len(self.blocs)
+
+        remaining_groups = self._try_merge_in_amphitheaters(exam, students_by_group, start, end)
+        if remaining_groups:
+            self._assign_groups_to_rooms(exam, remaining_groups, start, end)
+
+        housed = 0
+        for i in range(first, len(self.blocs)):
+            self.blocs_by_module[exam['module_id']].append(i)
+            for student_id in self.blocs[i]['students']:
+                self.student_day[(student_id, start.date())] += 1
+                self.student_modules[student_id].add(exam['module_id'])
+            housed += len(self.blocs[i]['students'])
+            self._staff_bloc(i)
+
+        return housed == sum(len(g) for g in students_by_group.values())
+
+    def _move_exams(self, moves):
+        """
+        Apply {module_id: new datetime} moves, reverting if a student loses a seat
+
+        Returns:
+            True if the moves were applied
+        """
+        return self._update_exams({m: {'date_heure': dt} for m, dt in moves.items()})
+
+    def _update_exams(self, changes, rooms=None):
+        """
+        Re-place exams after changing their fields, reverting on failure
+
+        Args:
+            changes: dict module_id -> {field: new value} (date_heure, duree_minutes)
+            rooms: Optional list of room dicts the exams must use
+
+        Returns:
+            True if every student of the changed exams got a seat
+        """
+        exams = [self.exam_by_module[m] for m in changes]
+        previous = {
+            e['module_id']: {field: e[field] for field in changes[e['module_id']]}
+            for e in exams
+        }
+
+        def place(exam):
+            if rooms is None:
+                return self._place_exam(exam)
+            return self._place_exam_in_rooms(exam, rooms)
+
+        for exam in exams:
+            self._unplace_exam(exam)
+        for exam in exams:
+            exam.update(changes[exam['module_id']])
+        placed = all([place(exam) for exam in exams])
+
+        if not placed:
+            for exam in exams:
+                self._unplace_exam(exam)
+            for exam in exams:
+                exam.update(previous[exam['module_id']])
+            for exam in exams:
+                self._place_exam(exam)
+
+        return placed
+
+    def _place_exam_in_rooms(self, exam, rooms):
+        """
+        Place an exam's students in the given rooms only, in the given order
+
+        Returns:
+            True if every enrolled student got a seat
+        """
+        students = [
+            student_id
+            for group in self._get_students_by_group(exam['module_id']).values()
+            for student_id in group
+        ]
+        start, end = self._exam_interval(exam)
+        first = len(self.blocs)
+
+        for room in rooms:
+            if not students:
+                break
+            index = self.amphi_index if room['type'] == 'amphi' else self.room_index
+            if not index.is_free(room['id'], start, end):
+                continue
+            self._create_exam_bloc(exam, room, students[:room['capacite']])
+            index.book(room['id'], start, end)
+            students = students[room['capacite']:]
+
+        for i in range(first, len(self.blocs)):
+            self.blocs_by_module[exam['module_id']].append(i)
+            for student_id in self.blocs[i]['students']:
+                self.student_day[(student_id, start.date())] += 1
+                self.student_modules[student_id].add(exam['module_id'])
+            self._staff_bloc(i)
+
+        return not students
+
+    def _exam_students(self, module_id):
+        return [
+            student_id
+            for i in self.blocs_by_module.get(module_id, [])
+            for student_id in self.blocs[i]['students']
+        ]
+
+    def _student_conflict_delta(self, moves):
+        """Change in (student, day) conflicts if exams moved to new days"""
+        changes = defaultdict(int)
+        for module_id, new_dt in moves.items():
+            old_date = self.exam_by_module[module_id]['date_heure'].date()
+            new_date = new_dt.date()
+            if old_date == new_date:
+                continue
+            for student_id in self._exam_students(module_id):
+                changes[(student_id, old_date)] -= 1
+                changes[(student_id, new_date)] += 1
+
+        delta = 0
+        for key, change in changes.items():
+            before = self.student_day.get(key, 0)
+            delta += (before + change > 1) - (before > 1)
+        return delta
+
+    def _repair_student_day(self, student_id, exam_date):
+        """Spread a student's same-day exams over other days"""
+        if self.student_day.get((student_id, exam_date), 0) <= 1:
+            return
+
+        same_day = [
+            self.exam_by_module[m] for m in sorted(self.student_modules[student_id])
+            if self.exam_by_module[m]['date_heure'].date() == exam_date
+        ]
+        session_days = sorted({e['date_heure'].date() for e in self.exams})
+
+        for exam in same_day:
+            # 1. Swap days with another exam of the same formation
+            candidates = [
+                {exam['module_id']: other['date_heure'], other['module_id']: exam['date_heure']}
+                for other in self.exams
+                if other['formation_id'] == exam['formation_id']
+                and other['date_heure'].date() != exam_date
+            ]
+            # 2. Move to another session day at the same hour
+            candidates += [
+                {exam['module_id']: datetime.combine(day, exam['date_heure'].time())}
+                for day in session_days if day != exam_date
+            ]
+
+            scored = sorted(
+                (self._student_conflict_delta(moves), n, moves)
+                for n, moves in enumerate(candidates)
+            )
+            for delta, _, moves in scored:
+                if delta >= 0:
+                    break
+                if self._move_exams(moves):
+                    if self.student_day.get((student_id, exam_date), 0) <= 1:
+                        return
+                    break
+
+    def _repair_professor_day(self, prof_id, exam_date):
+        """Hand a professor's extra supervisions of the day to other professors"""
+        for bloc_index, supervisors in list(self.bloc_supervisors.items()):
+            if self.prof_day[(prof_id, exam_date)] <= config.MAX_SUPERVISIONS_PER_DAY:
+                return
+            bloc = self.blocs[bloc_index]
+            if prof_id not in supervisors or bloc['date_heure'].date() != exam_date:
+                continue
+
+            interval = self._exam_interval(self.exam_by_module[bloc['module_id']])
+            self._unbook_supervisor(prof_id, bloc, interval)
+            replacement = self._pick_supervisor(bloc, exclude=supervisors)
+            if replacement is None:
+                self._book_supervisor(prof_id, bloc, interval)
+                continue
+            supervisors[supervisors.index(prof_id)] = replacement
+            self._book_supervisor(replacement, bloc, interval)
+
+    def _repair_capacity(self, bloc_index):
+        """Re-split an overfull bloc into additional free rooms"""
+        bloc = self.blocs[bloc_index]
+        capacity = self.rooms_by_id[bloc['salle_id']]['capacite']
+        if len(bloc['students']) <= capacity:
+            return
+
+        exam = self.exam_by_module[bloc['module_id']]
+        start, end = self._exam_interval(exam)
+        overflow = bloc['students'][capacity:]
+        first = len(self.blocs)
+
+        # Students that found no free room stay in the overfull bloc
+        unplaced = self._split_group_to_rooms(exam, overflow, start, end)
+        bloc['students'] = bloc['students'][:capacity] + unplaced
+
+        for i in range(first, len(self.blocs)):
+            self.blocs_by_module[exam['module_id']].append(i)
+            self._staff_bloc(i)
+
+    def _repair_unseated(self, module_id):
+        """Seat an exam's students left without a room in free rooms"""
+        exam = self.exam_by_module[module_id]
+        seated = {
+            student_id
+            for i in self.blocs_by_module.get(module_id, [])
+            for student_id in self.blocs[i]['students']
+        }
+        unseated = [
+            student_id
+            for group in self._get_students_by_group(module_id).values()
+            for student_id in group
+            if student_id not in seated
+        ]
+        start, end = self._exam_interval(exam)
+        first = len(self.blocs)
+
+        self._split_group_to_rooms(exam, unseated, start, end)
+
+        for i in range(first, len(self.blocs)):
+            self.blocs_by_module[module_id].append(i)
+            for student_id in self.blocs[i]['students']:
+                self.student_day[(student_id, start.date())] += 1
+                self.student_modules[student_id].add(module_id)
+            self._staff_bloc(i)
+
+    def _compact_blocs(self):
+        """Drop removed blocs and rebuild surveillances with fresh indexes"""
+        new_index = {}
+        blocs = []
+        for i, bloc in enumerate(self.blocs):
+            if bloc is not None:
+                new_index[i] = len(blocs)
+                blocs.append(bloc)
+
+        self.surveillances = [
+            (new_index[i], prof_id)
+            for i in sorted(self.bloc_supervisors)
+            if i in new_index
+            for prof_id in self.bloc_supervisors[i]
+        ]
+        self.blocs = blocs
+        self._build_repair_index()
+
     def _calculate_statistics(self, conflicts, resolved):
         """Calculate generation statistics"""
         stats = {}
-        
-        # Total exams
-        result = execute_query_dict("SELECT COUNT(*) as count FROM examens")
-        stats['total_exams'] = result[0]['count'] if result else 0
-        
-        # Total blocs
-        result = execute_query_dict("SELECT COUNT(*) as count FROM exam_bloc")
-        stats['total_blocs'] = result[0]['count'] if result else 0
-        
-        # Total students scheduled
-        result = execute_query_dict("""
-            SELECT COUNT(DISTINCT etudiant_id) as count FROM bloc_etudiant
-        """)
-        stats['total_students'] = result[0]['count'] if result else 0
-        
+
+        stats['total_exams'] = len(self.exams)
+        stats['total_blocs'] = len(self.blocs)
+        stats['total_students'] = len({
+            student_id for bloc in self.blocs for student_id in bloc['students']
+        })
+
         # Conflicts
         stats['conflicts_detected'] = (
             len(conflicts.get('student_multiple_exams', [])) +
             len(conflicts.get('professor_overloaded', [])) +
-            len(conflicts.get('room_capacity', []))
+            len(conflicts.get('room_capacity', [])) +
+            len(conflicts.get('student_no_seat', []))
         )
         stats['conflicts_resolved'] = resolved
-        
+        stats['resolution_time'] = round(self.resolution_time, 2)
+
         # Room utilization
-        result = execute_query_dict("""
-            SELECT 
-                le.type,
-                COUNT(DISTINCT eb.salle_id) as used_count,
-                (SELECT COUNT(*) FROM lieu_examen WHERE type = le.type) as total_count
-            FROM exam_bloc eb
-            JOIN lieu_examen le ON eb.salle_id = le.id
-            GROUP BY le.type
-        """)
-        
-        stats['room_utilization'] = {row['type']: row for row in result}
-        
+        used_rooms = {bloc['salle_id'] for bloc in self.blocs}
+        utilization = {}
+        for room in self.rooms_by_id.values():
+            row = utilization.setdefault(
+                room['type'], {'type': room['type'], 'used_count': 0, 'total_count': 0}
+            )
+            row['total_count'] += 1
+            if room['id'] in used_rooms:
+                row['used_count'] += 1
+
+        stats['room_utilization'] = {
+            t: row for t, row in utilization.items() if row['used_count'] > 0
+        }
+
         return stats
-    
-    def _save_metadata(self, start_date, stats):
-        """Save generation metadata"""
-        # Get end date from last exam
-        result = execute_query_dict("""
-            SELECT MAX(DATE(date_heure)) as end_date FROM examens
-        """)
-        end_date = result[0]['end_date'] if result else start_date
-        
+
+    def _flush_schedule(self, cursor, meta_id):
+        """
+        Write the in-memory schedule as version meta_id
+
+        Runs on the caller's cursor so the whole write is a single transaction.
+        Other versions are left untouched, so the published schedule stays
+        readable while the new one is written.
+        """
+        if not self.exams:
+            return
+
+        # 1. Server ids for every exam and bloc, reserved in one round-trip each
+        exam_ids = reserve_ids(cursor, 'examens', len(self.exams))
+        for exam, exam_id in zip(self.exams, exam_ids):
+            exam['id'] = exam_id
+        exam_id_by_module = {e['module_id']: e['id'] for e in self.exams}
+
+        bloc_ids = reserve_ids(cursor, 'exam_bloc', len(self.blocs))
+        for bloc, bloc_id in zip(self.blocs, bloc_ids):
+            bloc['id'] = bloc_id
+
+        # 2. Exams and blocs (ids are known, no RETURNING needed)
+        bulk_insert('examens', ('id', 'meta_id', 'module_id', 'date_heure', 'duree_minutes'), [
+            (e['id'], meta_id, e['module_id'], e['date_heure'], e['duree_minutes'])
+            for e in self.exams
+        ], cursor=cursor)
+
+        bulk_insert('exam_bloc', ('id', 'meta_id', 'examen_id', 'salle_id'), [
+            (b['id'], meta_id, exam_id_by_module[b['module_id']], b['salle_id'])
+            for b in self.blocs
+        ], cursor=cursor)
+
+        # 3. Students and supervisors (streamed through COPY)
+        bulk_insert('bloc_etudiant', ('meta_id', 'bloc_id', 'etudiant_id'), [
+            (meta_id, bloc['id'], student_id)
+            for bloc in self.blocs
+            for student_id in bloc['students']
+        ], cursor=cursor)
+
+        bulk_insert('surveillance', ('meta_id', 'bloc_id', 'prof_id'), [
+            (meta_id, self.blocs[bloc_index]['id'], prof_id)
+            for bloc_index, prof_id in self.surveillances
+        ], cursor=cursor)
+
+    def _create_version(self, start_date):
+        """Register a new schedule version in its own transaction"""
+        with get_db_cursor(commit=True) as cursor:
+            cursor.execute("""
+                INSERT INTO exam_schedule_metadata (start_date, status)
+                VALUES (%s, 'generating')
+                RETURNING id
+            """, (start_date,))
+            return cursor.fetchone()[0]
+
+    def _mark_version_failed(self, meta_id):
+        """Flag an aborted generation; its rows were never committed"""
+        try:
+            with get_db_cursor(commit=True) as cursor:
+                # A committed version keeps its status
+                cursor.execute("""
+                    UPDATE exam_schedule_metadata SET status = 'failed'
+                    WHERE id = %s AND status <> 'completed'
+                """, (meta_id,))
+        except Exception as e:
+            print(f"Could not mark version {meta_id} as failed: {e}")
+
+    def _analyze_schedule_tables(self):
+        """
+        Refresh planner statistics after a bulk write
+
+        Until autovacuum runs, the planner would estimate a single row for
+        the new version and pick nested loops for every query filtering on it.
+        """
+        with get_db_cursor(commit=True) as cursor:
+            for table in ('examens', 'exam_bloc', 'bloc_etudiant', 'surveillance'):
+                cursor.execute(f"ANALYZE {table}")
+
+    def _prune_versions(self, cursor):
+        """
+        Drop the rows of old unpublished versions
+
+        The published version and the SCHEDULE_VERSIONS_KEPT latest completed
+        ones are kept; pruned versions keep their metadata and validation
+        history and are marked 'archived'.
+        """
+        cursor.execute("""
+            SELECT id FROM exam_schedule_metadata
+            WHERE status = 'completed' AND NOT is_published
+            ORDER BY generation_date DESC
+            OFFSET %s
+        """, (config.SCHEDULE_VERSIONS_KEPT,))
+        old_ids = [row[0] for row in cursor.fetchall()]
+        if not old_ids:
+            return
+
+        for table in ('surveillance', 'bloc_etudiant', 'exam_bloc', 'examens'):
+            cursor.execute(f"DELETE FROM {table} WHERE meta_id = ANY(%s)", (old_ids,))
+        cursor.execute("""
+            UPDATE exam_schedule_metadata SET status = 'archived' WHERE id = ANY(%s)
+        """, (old_ids,))
+
+    def _save_phase_metrics(self, meta_id):
+        """Store the per-phase metrics once the refresh phase is measured too"""
+        with get_db_cursor(commit=True) as cursor:
+            cursor.execute("""
+                UPDATE exam_schedule_metadata SET phase_metrics = %s WHERE id = %s
+            """, (Json(self.phase_metrics), meta_id))
+
+    def _save_metadata(self, cursor, meta_id, start_date, stats):
+        """Complete the version metadata and open its validation workflow"""
+        # End date from last exam
+        end_date = max(
+            (e['date_heure'].date() for e in self.exams), default=start_date
+        )
+
         query = """
-            INSERT INTO exam_schedule_metadata 
-            (start_date, end_date, execution_time_seconds, total_exams, total_blocs,
-             conflicts_detected, conflicts_resolved, status)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, 'completed')
+            UPDATE exam_schedule_metadata
+            SET start_date = %s, end_date = %s, execution_time_seconds = %s,
+                total_exams = %s, total_blocs = %s,
+                conflicts_detected = %s, conflicts_resolved = %s,
+                status = 'completed'
+            WHERE id = %s
         """
-        
-        execute_update(query, (
+
+        cursor.execute(query, (
             start_date,
             end_date,
             stats.get('execution_time', 0),
             stats.get('total_exams', 0),
             stats.get('total_blocs', 0),
             stats.get('conflicts_detected', 0),
-            stats.get('conflicts_resolved', 0)
+            stats.get('conflicts_resolved', 0),
+            meta_id
         ))
 
-        # Get the ID of the inserted metadata
-        result = execute_query_dict("SELECT id FROM exam_schedule_metadata ORDER BY generation_date DESC LIMIT 1")
-        if result:
-            meta_id = result[0]['id']
-            
-            # Initialize validation states
-            # 1. Departments (CHEF_DEPT)
-            execute_update("""
-                INSERT INTO validation_state (meta_id, validator_role, dept_id, status)
-                SELECT %s, 'CHEF_DEPT', id, 'PENDING'
-                FROM departements
-            """, (meta_id,))
-            
-            # 2. Vice Doyen (VICE_DOYEN)
-            execute_update("""
-                INSERT INTO validation_state (meta_id, validator_role, dept_id, status)
-                VALUES (%s, 'VICE_DOYEN', NULL, 'PENDING')
-            """, (meta_id,))
+        # Initialize validation states
+        # 1. Departments (CHEF_DEPT)
+        cursor.execute("""
+            INSERT INTO validation_state (meta_id, validator_role, dept_id, status)
+            SELECT %s, 'CHEF_DEPT', id, 'PENDING'
+            FROM departements
+        """, (meta_id,))
+
+        # 2. Vice Doyen (VICE_DOYEN)
+        cursor.execute("""
+            INSERT INTO validation_state (meta_id, validator_role, dept_id, status)
+            VALUES (%s, 'VICE_DOYEN', NULL, 'PENDING')
+        """, (meta_id,))
+
+        return meta_id
@@ -0,0 +1,106 @@
+# =============================================
+# EXAM SLOT ASSIGNMENT (GRAPH COLOURING)
+# =============================================
+
+import heapq
+import time
+from collections import defaultdict
+
+def assign_slots(module_ids, graph, demand, rooms_needed, slots_per_day,
+                 seats_per_slot, rooms_per_slot, deadline=None, slot_spans=None):
+    """
+    Assign every module to a (day, slot) with DSatur
+
+    Modules sharing a student never share a day, and each slot stays within
+    the seat and room capacity. Modules are coloured by highest saturation
+    (distinct days already taken by neighbours), then degree, then size,
+    each on the earliest feasible day, which keeps the session short.
+
+    Args:
+        module_ids: Modules to schedule
+        graph: dict module_id -> conflicting module_ids
+               (see ConflictMatrix.conflict_graph())
+        demand: dict module_id -> number of students
+        rooms_needed: dict module_id -> estimated number of rooms
+        slots_per_day: Number of time slots per exam day
+        seats_per_slot: Total seats available in one slot
+        rooms_per_slot: Total rooms available in one slot
+        deadline: Optional time.time() value; once passed, the remaining
+                  modules are placed in static degree order without
+                  saturation updates
+        slot_spans: Optional list giving, for each slot index, the slot
+                    indexes an exam starting there still occupies (itself
+                    included); its seats and rooms are charged to all of
+                    them. By default an exam only holds its own slot.
+
+    Returns:
+        dict module_id -> (day_index, slot_index)
+    """
+    if slot_spans is None:
+        slot_spans = [[slot] for slot in range(slots_per_day)]
+
+    assignment = {}
+    neighbour_days = defaultdict(set)
+    seats_used = defaultdict(int)    # (day, slot) -> seats
+    rooms_used = defaultdict(int)    # (day, slot) -> rooms
+
+    def priority(m):
+        return (-len(neighbour_days[m]), -len(graph.get(m, ())), -demand.get(m, 0), m)
+
+    heap = [priority(m) for m in module_ids]
+    heapq.heapify(heap)
+    static_order = None
+
+    while len(assignment) < len(module_ids):
+        if static_order is None and deadline is not None and time.time() > deadline:
+            print("Slot assignment time budget exceeded, finishing in static order")
+            static_order = iter(sorted(
+                (m for m in module_ids if m not in assignment),
+                key=lambda m: (-len(graph.get(m, ())), -demand.get(m, 0), m)
+            ))
+
+        if static_order is not None:
+            module_id = next(static_order)
+        else:
+            entry = heapq.heappop(heap)
+            module_id = entry[3]
+            # Lazy deletion: skip assigned or outdated entries
+            if module_id in assignment or entry != priority(module_id):
+                continue
+
+        day, slot = _first_feasible_slot(
+            module_id, neighbour_days[module_id], demand, rooms_needed,
+            slot_spans, seats_per_slot, rooms_per_slot, seats_used, rooms_used
+        )
+        assignment[module_id] = (day, slot)
+        for held in slot_spans[slot]:
+            seats_used[(day, held)] += demand.get(module_id, 0)
+            rooms_used[(day, held)] += rooms_needed.get(module_id, 0)
+
+        for neighbour in graph.get(module_id, ()):
+            if neighbour not in assignment and day not in neighbour_days[neighbour]:
+                neighbour_days[neighbour].add(day)
+                if static_order is None:
+                    heapq.heappush(heap, priority(neighbour))
+
+    return assignment
+
+def _first_feasible_slot(module_id, forbidden_days, demand, rooms_needed,
+                         slot_spans, seats_per_slot, rooms_per_slot,
+                         seats_used, rooms_used):
+    """Earliest (day, slot) free of neighbours and within capacity over its whole span"""
+    seats = demand.get(module_id, 0)
+    rooms = rooms_needed.get(module_id, 0)
+
+    day = 0
+    while True:
+        if day not in forbidden_days:
+            for slot, span in enumerate(slot_spans):
+                held = [(day, s) for s in span]
+                # An empty span always accepts a module, even an oversized one
+                if all(seats_used[k] == 0 and rooms_used[k] == 0 for k in held):
+                    return (day, slot)
+                if all(seats_used[k] + seats <= seats_per_slot
+                       and rooms_used[k] + rooms <= rooms_per_slot for k in held):
+                    return (day, slot)
+        day += 1
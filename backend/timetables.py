@@ -0,0 +1,114 @@
+# =============================================
+# PUBLISHED TIMETABLE SNAPSHOTS
+# =============================================
+
+# Denormalized copies of the published schedule, one row per
+# (student, exam) and per (professor, bloc), so page loads are a single
+# index lookup instead of an eight-table join.
+
+STUDENT_SNAPSHOT = """
+    INSERT INTO student_timetable
+    (meta_id, etudiant_id, examen_id, module, formation, date_heure,
+     duree_minutes, salle, salle_type)
+    SELECT
+        be.meta_id,
+        be.etudiant_id,
+        ex.id,
+        m.nom,
+        f.nom,
+        ex.date_heure,
+        ex.duree_minutes,
+        le.nom,
+        le.type
+    FROM bloc_etudiant be
+    JOIN exam_bloc eb ON be.bloc_id = eb.id
+    JOIN examens ex ON eb.examen_id = ex.id
+    JOIN modules m ON ex.module_id = m.id
+    JOIN formations f ON m.formation_id = f.id
+    JOIN lieu_examen le ON eb.salle_id = le.id
+    WHERE be.meta_id = %s
+"""
+
+PROFESSOR_SNAPSHOT = """
+    INSERT INTO professor_timetable
+    (meta_id, prof_id, examen_id, bloc_id, module, formation, departement,
+     date_heure, duree_minutes, salle, salle_type, nb_etudiants)
+    SELECT
+        s.meta_id,
+        s.prof_id,
+        ex.id,
+        eb.id,
+        m.nom,
+        f.nom,
+        d.nom,
+        ex.date_heure,
+        ex.duree_minutes,
+        le.nom,
+        le.type,
+        COALESCE(bc.nb_etudiants, 0)
+    FROM surveillance s
+    JOIN exam_bloc eb ON s.bloc_id = eb.id
+    JOIN examens ex ON eb.examen_id = ex.id
+    JOIN modules m ON ex.module_id = m.id
+    JOIN formations f ON m.formation_id = f.id
+    JOIN departements d ON f.dept_id = d.id
+    JOIN lieu_examen le ON eb.salle_id = le.id
+    LEFT JOIN (
+        SELECT bloc_id, COUNT(*) as nb_etudiants
+        FROM bloc_etudiant
+        WHERE meta_id = %s
+        GROUP BY bloc_id
+    ) bc ON bc.bloc_id = eb.id
+    WHERE s.meta_id = %s
+"""
+
+def publish_timetables(cursor, meta_id, previous_meta_id=None):
+    """
+    Build the snapshots of a newly published version
+
+    Runs on the caller's cursor, inside the publication transaction. The
+    previous published version's rows are kept until the next publication
+    so processes still holding its meta_id keep reading a full timetable.
+    """
+    keep = [m for m in (meta_id, previous_meta_id) if m is not None]
+    for table in ('student_timetable', 'professor_timetable'):
+        cursor.execute(f"DELETE FROM {table} WHERE meta_id <> ALL(%s)", (keep,))
+
+    rebuild_timetables(cursor, meta_id)
+
+def rebuild_timetables(cursor, meta_id, exam_ids=None):
+    """
+    Rebuild the snapshot rows of a version
+
+    Args:
+        cursor: Cursor of the transaction changing the schedule
+        meta_id: Schedule version
+        exam_ids: Only rebuild these exams (incremental changes);
+                  default is the whole version
+
+    Returns:
+        (student rows, professor rows) written
+    """
+    exam_filter = ""
+    params = ()
+    if exam_ids is not None:
+        exam_filter = " AND examen_id = ANY(%s)"
+        params = (list(exam_ids),)
+
+    for table in ('student_timetable', 'professor_timetable'):
+        cursor.execute(
+            f"DELETE FROM {table} WHERE meta_id = %s{exam_filter}", (meta_id, *params)
+        )
+
+    exam_filter = exam_filter.replace("examen_id", "ex.id")
+    cursor.execute(STUDENT_SNAPSHOT + exam_filter, (meta_id, *params))
+    student_rows = cursor.rowcount
+    cursor.execute(PROFESSOR_SNAPSHOT + exam_filter, (meta_id, meta_id, *params))
+    return student_rows, cursor.rowcount
+
+def has_timetables(cursor, meta_id):
+    """Whether a version currently has snapshot rows (published or just replaced)"""
+    cursor.execute(
+        "SELECT EXISTS (SELECT 1 FROM student_timetable WHERE meta_id = %s)", (meta_id,)
+    )
+    return cursor.fetchone()[0]
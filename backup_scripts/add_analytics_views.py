@@ -0,0 +1,18 @@
+from backend.database import execute_update
+from backend.analytics_views import ANALYTICS_VIEWS, view_ddl, refresh_analytics_views
+
+def create_views():
+    """Create the materialized analytics views if not exists"""
+    print("--- Creating Views ---")
+    for name in ANALYTICS_VIEWS:
+        try:
+            for statement in view_ddl(name):
+                execute_update(statement)
+            print(f"✅ Created {name}")
+        except Exception as e:
+            print(f"⚠️ Error creating {name}: {e}")
+
+if __name__ == "__main__":
+    create_views()
+    refresh_analytics_views()
+    print("\n✅ Migration Complete!")
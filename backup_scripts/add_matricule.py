@@ -1,12 +1,28 @@
 import random
 import string
-from backend.database import execute_update, execute_query_dict, execute_many
+from backend.database import execute_update, execute_query_dict, get_db_cursor, bulk_insert
 
 def generate_matricule(prefix, length=6):
     """Generate a random matricule with prefix"""
     suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=length))
     return f"{prefix}-{suffix}"
 
+def bulk_update_matricules(table, updates):
+    """Apply (matricule, id) pairs with one COPY into a staging table and one UPDATE"""
+    with get_db_cursor(commit=True) as cursor:
+        cursor.execute("""
+            CREATE TEMP TABLE matricule_updates (matricule VARCHAR(20), id INTEGER)
+            ON COMMIT DROP
+        """)
+        bulk_insert('matricule_updates', ('matricule', 'id'), updates, cursor=cursor)
+        cursor.execute(f"""
+            UPDATE {table} t
+            SET matricule = u.matricule
+            FROM matricule_updates u
+            WHERE t.id = u.id
+        """)
+        return cursor.rowcount
+
 def add_columns():
     """Add matricule column if not exists"""
     print("--- Adding Columns ---")
@@ -45,13 +61,7 @@ def populate_students():
         
         updates.append((mat, stu['id']))
     
-    # Bulk update is tricky with standard SQL 'UPDATE ... WHERE ...' for different values
-    # We'll use individual updates for safety given currently available helpers, 
-    # or better: use execute_many with a specific query if supported properly.
-    # backend.database.execute_many executes the *same* query with different params.
-    
-    query = "UPDATE etudiants SET matricule = %s WHERE id = %s"
-    rowcount = execute_many(query, updates)
+    rowcount = bulk_update_matricules('etudiants', updates)
     print(f"✅ Updated {rowcount} students.")
 
 def populate_profs():
@@ -76,8 +86,7 @@ def populate_profs():
                 break
         updates.append((mat, prof['id']))
         
-    query = "UPDATE professeurs SET matricule = %s WHERE id = %s"
-    rowcount = execute_many(query, updates)
+    rowcount = bulk_update_matricules('professeurs', updates)
     print(f"✅ Updated {rowcount} professors.")
 
 if __name__ == "__main__":
@@ -0,0 +1,15 @@
+from backend.database import execute_update
+
+def add_columns():
+    """Add phase_metrics to exam_schedule_metadata if not exists"""
+    print("--- Adding Columns ---")
+    try:
+        execute_update("ALTER TABLE exam_schedule_metadata ADD COLUMN IF NOT EXISTS phase_metrics JSONB;")
+        print("✅ Added 'phase_metrics' to exam_schedule_metadata")
+    except Exception as e:
+        print(f"⚠️ Error adding to exam_schedule_metadata (might exist): {e}")
+    print("ℹ️ Metrics are recorded from the next generation on.")
+
+if __name__ == "__main__":
+    add_columns()
+    print("\n✅ Migration Complete!")
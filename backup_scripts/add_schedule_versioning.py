@@ -0,0 +1,85 @@
+from backend.database import execute_update, execute_query_dict, get_db_cursor
+
+SCHEDULE_TABLES = ('examens', 'exam_bloc', 'bloc_etudiant', 'surveillance')
+
+def add_columns():
+    """Add meta_id to the schedule tables if not exists"""
+    print("--- Adding Columns ---")
+    for table in SCHEDULE_TABLES:
+        try:
+            execute_update(f"""
+                ALTER TABLE {table} ADD COLUMN IF NOT EXISTS meta_id INTEGER
+                REFERENCES exam_schedule_metadata(id) ON DELETE CASCADE;
+            """)
+            print(f"✅ Added 'meta_id' to {table}")
+        except Exception as e:
+            print(f"⚠️ Error adding to {table} (might exist): {e}")
+
+def backfill_versions():
+    """Attach existing schedule rows to the latest generation"""
+    print("\n--- Backfilling Versions ---")
+    latest = execute_query_dict("""
+        SELECT id FROM exam_schedule_metadata
+        ORDER BY generation_date DESC LIMIT 1
+    """)
+
+    with get_db_cursor(commit=True) as cursor:
+        if not latest:
+            cursor.execute("SELECT COUNT(*) FROM examens")
+            if cursor.fetchone()[0] == 0:
+                print("ℹ️ No schedule stored, nothing to backfill.")
+                return
+            cursor.execute("""
+                INSERT INTO exam_schedule_metadata (start_date, status)
+                SELECT MIN(date_heure)::DATE, 'completed' FROM examens
+                RETURNING id
+            """)
+            meta_id = cursor.fetchone()[0]
+        else:
+            meta_id = latest[0]['id']
+
+        for table in SCHEDULE_TABLES:
+            cursor.execute(f"UPDATE {table} SET meta_id = %s WHERE meta_id IS NULL", (meta_id,))
+            print(f"✅ {cursor.rowcount} row(s) of {table} attached to version {meta_id}")
+
+        # Older generations lost their rows when the tables were wiped
+        cursor.execute("""
+            UPDATE exam_schedule_metadata SET status = 'archived'
+            WHERE id <> %s AND status = 'completed' AND NOT is_published
+        """, (meta_id,))
+
+def add_constraints():
+    """NOT NULL, version indexes and the single published version"""
+    print("\n--- Adding Constraints ---")
+    statements = [
+        *(f"ALTER TABLE {table} ALTER COLUMN meta_id SET NOT NULL;" for table in SCHEDULE_TABLES),
+        "CREATE INDEX IF NOT EXISTS idx_examens_meta ON examens(meta_id, module_id);",
+        "CREATE INDEX IF NOT EXISTS idx_exam_bloc_meta ON exam_bloc(meta_id);",
+        "CREATE INDEX IF NOT EXISTS idx_bloc_etudiant_meta ON bloc_etudiant(meta_id, etudiant_id);",
+        "CREATE INDEX IF NOT EXISTS idx_surveillance_meta ON surveillance(meta_id, prof_id);",
+        """CREATE INDEX IF NOT EXISTS idx_metadata_generation
+           ON exam_schedule_metadata(status, generation_date DESC);""",
+        "ALTER TABLE exam_schedule_metadata DROP CONSTRAINT IF EXISTS exam_schedule_metadata_status_check;",
+        """ALTER TABLE exam_schedule_metadata ADD CONSTRAINT exam_schedule_metadata_status_check
+           CHECK (status IN ('generating', 'completed', 'failed', 'archived'));""",
+        # Keep only the most recent published version
+        """UPDATE exam_schedule_metadata SET is_published = FALSE
+           WHERE is_published AND id <> (
+               SELECT id FROM exam_schedule_metadata WHERE is_published
+               ORDER BY generation_date DESC LIMIT 1
+           );""",
+        """CREATE UNIQUE INDEX IF NOT EXISTS idx_metadata_published
+           ON exam_schedule_metadata(is_published) WHERE is_published;""",
+    ]
+    for statement in statements:
+        try:
+            execute_update(statement)
+        except Exception as e:
+            print(f"⚠️ Error: {e}")
+    print("✅ Constraints added")
+
+if __name__ == "__main__":
+    add_columns()
+    backfill_versions()
+    add_constraints()
+    print("\n✅ Migration Complete!")
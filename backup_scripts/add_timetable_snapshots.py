@@ -0,0 +1,68 @@
+from backend.database import execute_update, execute_query_dict, get_db_cursor
+from backend.timetables import rebuild_timetables
+
+TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS student_timetable (
+        meta_id INTEGER NOT NULL,
+        etudiant_id INTEGER NOT NULL,
+        examen_id INTEGER NOT NULL,
+        module VARCHAR(150) NOT NULL,
+        formation VARCHAR(150) NOT NULL,
+        date_heure TIMESTAMP NOT NULL,
+        duree_minutes INTEGER NOT NULL,
+        salle VARCHAR(100) NOT NULL,
+        salle_type VARCHAR(20) NOT NULL,
+        PRIMARY KEY (meta_id, etudiant_id, examen_id)
+    );
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_student_timetable_lookup ON student_timetable(meta_id, etudiant_id, date_heure);",
+    "CREATE INDEX IF NOT EXISTS idx_student_timetable_exam ON student_timetable(meta_id, examen_id);",
+    """
+    CREATE TABLE IF NOT EXISTS professor_timetable (
+        meta_id INTEGER NOT NULL,
+        prof_id INTEGER NOT NULL,
+        examen_id INTEGER NOT NULL,
+        bloc_id INTEGER NOT NULL,
+        module VARCHAR(150) NOT NULL,
+        formation VARCHAR(150) NOT NULL,
+        departement VARCHAR(100) NOT NULL,
+        date_heure TIMESTAMP NOT NULL,
+        duree_minutes INTEGER NOT NULL,
+        salle VARCHAR(100) NOT NULL,
+        salle_type VARCHAR(20) NOT NULL,
+        nb_etudiants INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (meta_id, prof_id, bloc_id)
+    );
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_professor_timetable_lookup ON professor_timetable(meta_id, prof_id, date_heure);",
+    "CREATE INDEX IF NOT EXISTS idx_professor_timetable_exam ON professor_timetable(meta_id, examen_id);",
+]
+
+def create_tables():
+    """Create the snapshot tables if not exists"""
+    print("--- Creating Tables ---")
+    for statement in TABLES:
+        try:
+            execute_update(statement)
+        except Exception as e:
+            print(f"⚠️ Error: {e}")
+    print("✅ Snapshot tables ready")
+
+def build_published():
+    """Build the snapshots of the currently published version"""
+    print("\n--- Building Snapshots ---")
+    published = execute_query_dict("SELECT id FROM exam_schedule_metadata WHERE is_published")
+    if not published:
+        print("ℹ️ No published schedule, snapshots will be built on publication.")
+        return
+
+    meta_id = published[0]['id']
+    with get_db_cursor(commit=True) as cursor:
+        students, professors = rebuild_timetables(cursor, meta_id)
+    print(f"✅ Version {meta_id}: {students} student rows, {professors} professor rows")
+
+if __name__ == "__main__":
+    create_tables()
+    build_published()
+    print("\n✅ Migration Complete!")
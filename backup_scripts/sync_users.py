@@ -1,4 +1,4 @@
-from backend.database import execute_query_dict, execute_many
+from backend.database import execute_query_dict, bulk_insert
 
 def sync_students():
     print("--- Syncing Missing Students ---")
@@ -37,16 +37,10 @@ def sync_students():
         password = s['nom'] + s['prenom']
         inserts.append((s['id'], username, password, 'student'))
     
-    # 4. Execute insert
-    insert_query = """
-        INSERT INTO users (user_id, username, password, role)
-        VALUES (%s, %s, %s, %s)
-    """
-    
+    # 4. Execute insert (single COPY stream)
     try:
-        # Assuming simple batch insert
         print(f"Inserting {len(inserts)} users...")
-        count = execute_many(insert_query, inserts)
+        count = bulk_insert('users', ('user_id', 'username', 'password', 'role'), inserts)
         print(f"✅ Successfully inserted {count} users.")
         
         # Verify
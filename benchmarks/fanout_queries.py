@@ -0,0 +1,138 @@
+# =============================================
+# BENCHMARK: FAN-OUT VS PRE-AGGREGATED ANALYTICS
+# =============================================
+
+# Compares single-chain (fan-out) and pre-aggregated definitions of
+# mv_department_statistics and mv_exam_timeline: rows produced by join
+# nodes (from EXPLAIN ANALYZE), median latency and result equality.
+#
+# Usage (from the project root, on a database with a generated schedule):
+#     python -m benchmarks.fanout_queries [runs] [work_mem]
+
+import sys
+import time
+import statistics
+from backend.database import get_db_cursor
+from backend.analytics_views import ANALYTICS_VIEWS, VERSIONS
+
+FANOUT_DEPARTMENT_STATISTICS = """
+    WITH {versions}
+    SELECT
+        v.meta_id,
+        d.id as dept_id,
+        d.nom as departement,
+        COUNT(DISTINCT ex.id) as total_exams,
+        COUNT(DISTINCT eb.id) as total_blocs,
+        COUNT(DISTINCT be.etudiant_id) as total_students,
+        COUNT(DISTINCT s.prof_id) as professors_assigned
+    FROM versions v
+    CROSS JOIN departements d
+    JOIN formations f ON d.id = f.dept_id
+    JOIN modules m ON f.id = m.formation_id
+    LEFT JOIN examens ex ON m.id = ex.module_id AND ex.meta_id = v.meta_id
+    LEFT JOIN exam_bloc eb ON ex.id = eb.examen_id
+    LEFT JOIN bloc_etudiant be ON eb.id = be.bloc_id
+    LEFT JOIN surveillance s ON eb.id = s.bloc_id
+    GROUP BY v.meta_id, d.id, d.nom
+"""
+
+PRE_AGGREGATED_EXAM_TIMELINE = """
+    WITH {versions},
+    exam_days AS (
+        SELECT ex.id as examen_id, ex.meta_id, DATE(ex.date_heure) as exam_date
+        FROM examens ex
+        JOIN versions v ON ex.meta_id = v.meta_id
+    ),
+    exams AS (
+        SELECT meta_id, exam_date, COUNT(*) as exam_count
+        FROM exam_days
+        GROUP BY meta_id, exam_date
+    ),
+    blocs AS (
+        SELECT ed.meta_id, ed.exam_date, COUNT(*) as bloc_count
+        FROM exam_bloc eb
+        JOIN exam_days ed ON eb.examen_id = ed.examen_id
+        GROUP BY ed.meta_id, ed.exam_date
+    ),
+    students AS (
+        SELECT meta_id, exam_date, COUNT(*) as student_count
+        FROM (
+            SELECT DISTINCT ed.meta_id, ed.exam_date, be.etudiant_id
+            FROM bloc_etudiant be
+            JOIN exam_bloc eb ON be.bloc_id = eb.id
+            JOIN exam_days ed ON eb.examen_id = ed.examen_id
+        ) day_students
+        GROUP BY meta_id, exam_date
+    )
+    SELECT
+        e.meta_id,
+        e.exam_date,
+        e.exam_count,
+        COALESCE(b.bloc_count, 0) as bloc_count,
+        COALESCE(st.student_count, 0) as student_count
+    FROM exams e
+    LEFT JOIN blocs b ON b.meta_id = e.meta_id AND b.exam_date = e.exam_date
+    LEFT JOIN students st ON st.meta_id = e.meta_id AND st.exam_date = e.exam_date
+"""
+
+# view -> [(label, query)], the first variant is the reference for equality
+VARIANTS = {
+    'mv_department_statistics': [
+        ('fan-out', FANOUT_DEPARTMENT_STATISTICS),
+        ('current', ANALYTICS_VIEWS['mv_department_statistics'][0]),
+    ],
+    'mv_exam_timeline': [
+        ('current', ANALYTICS_VIEWS['mv_exam_timeline'][0]),
+        ('pre-aggregated', PRE_AGGREGATED_EXAM_TIMELINE),
+    ],
+}
+
+JOIN_NODES = ('Hash Join', 'Merge Join', 'Nested Loop')
+
+def join_rows(plan):
+    """Rows produced by every join node of an EXPLAIN ANALYZE JSON plan"""
+    rows = 0
+    if plan['Node Type'] in JOIN_NODES:
+        rows += plan['Actual Rows'] * plan['Actual Loops']
+    for child in plan.get('Plans', []):
+        rows += join_rows(child)
+    return rows
+
+def measure(cursor, query, runs):
+    """(join rows, median latency in ms, sorted result rows)"""
+    cursor.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + query)
+    plan = cursor.fetchone()[0][0]['Plan']
+
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        cursor.execute(query)
+        result = cursor.fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    return join_rows(plan), statistics.median(timings), sorted(result)
+
+def main(runs=5, work_mem=None):
+    with get_db_cursor() as cursor:
+        if work_mem:
+            cursor.execute("SET work_mem = %s", (work_mem,))
+        cursor.execute("SHOW work_mem")
+        work_mem = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) FROM exam_schedule_metadata WHERE status = 'completed'")
+        print(f"Completed schedule versions: {cursor.fetchone()[0]} (work_mem {work_mem})")
+
+        for name, variants in VARIANTS.items():
+            print(f"\n{name}")
+            reference = None
+            for label, query in variants:
+                rows, latency, result = measure(cursor, query.format(versions=VERSIONS), runs)
+                if reference is None:
+                    reference = result
+                print(f"  {label:<15} join rows {rows:>10,}   {latency:>7.1f} ms"
+                      f"   same rows: {result == reference}")
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 5,
+        sys.argv[2] if len(sys.argv) > 2 else None
+    )
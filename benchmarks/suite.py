@@ -0,0 +1,339 @@
+# =============================================
+# BENCHMARK SUITE: SCHEDULER AND PAGE QUERIES
+# =============================================
+
+# Times ExamScheduler.generate_schedule (end to end and per phase), the
+# publication of the generated version, and every read function of
+# backend/queries.py cold (process caches emptied) and warm (cached
+# results, prepared statements, PostgreSQL buffers already loaded).
+# Results are written as JSON with the dataset size and git revision, then
+# compared against a baseline: the exit status is 1 when a timing
+# regressed, so the suite can gate a deploy. Timings depend on the machine
+# and dataset, so no baseline is committed: create one locally with
+# --save-baseline (benchmarks/baseline.json) on the reference revision.
+#
+# Runs only against a local PostgreSQL, loaded by the seed scripts or
+# database/generate_data.py (each run writes and publishes a schedule
+# version):
+#     EXAMDB_DSN="dbname=examdb host=localhost" python -m benchmarks.suite
+#     ... python -m benchmarks.suite --save-baseline   (on the reference revision)
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from backend import queries
+from backend.database import get_db_cursor
+from backend.scheduler import ExamScheduler
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(BENCHMARKS_DIR, 'baseline.json')
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, 'results')
+
+GENERATION_START = datetime.date(2026, 1, 11)  # A Sunday, fixed for reproducible schedules
+GENERATION_DURATION = 120
+
+TOLERANCE = 0.25      # Relative slowdown reported as a regression
+MIN_DELTA_MS = 5      # Slowdowns below this are noise, whatever their ratio
+
+DATASET_TABLES = [
+    'departements', 'formations', 'modules', 'lieu_examen',
+    'professeurs', 'etudiants', 'inscriptions',
+]
+
+# Read functions of backend/queries.py -> arguments built from sample ids
+QUERY_CASES = {
+    'get_published_meta_id': lambda ids: (),
+    'get_latest_meta_id': lambda ids: (),
+    'get_student_schedule': lambda ids: (ids['etudiant_id'],),
+    'get_professor_schedule': lambda ids: (ids['prof_id'],),
+    'get_department_statistics': lambda ids: (),
+    'get_room_occupancy_stats': lambda ids: (),
+    'get_supervision_fairness': lambda ids: (),
+    'get_conflicts_report': lambda ids: (),
+    'get_global_kpis': lambda ids: (),
+    'get_exam_timeline': lambda ids: (),
+    'get_department_exam_count': lambda ids: (),
+    'get_conflicts_by_dept': lambda ids: (),
+    'get_professor_hours_stats': lambda ids: (),
+    'search_global_schedule': lambda ids: (ids['dept_id'],),
+    'get_conflict_matrix': lambda ids: (),
+    'get_module_conflicts': lambda ids: (ids['module_id'],),
+    'get_latest_schedule_metadata': lambda ids: (),
+    'get_generation_history': lambda ids: (),
+    'get_validation_state': lambda ids: (ids['meta_id'],),
+}
+
+# Writes and cache helpers, timed elsewhere or not at all
+SKIPPED_FUNCTIONS = {
+    'cached_query', 'invalidate_query_cache', 'invalidate_publication_state',
+    'invalidate_conflict_matrix',
+    'update_validation_state', 'publish_schedule',
+}
+
+# =============================================
+# ENVIRONMENT
+# =============================================
+
+def git_revision():
+    """(short commit hash, uncommitted changes) of the working tree, or (None, None)"""
+    try:
+        revision = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCHMARKS_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+        changes = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], cwd=BENCHMARKS_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+        return revision, bool(changes)
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+def dataset_size(cursor):
+    """Row count of every reference table"""
+    counts = {}
+    for table in DATASET_TABLES:
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        counts[table] = cursor.fetchone()[0]
+    return counts
+
+def sample_ids(cursor, meta_id):
+    """Deterministic ids for the per-user and per-entity queries"""
+    cursor.execute("""
+        SELECT
+            (SELECT MIN(etudiant_id) FROM bloc_etudiant WHERE meta_id = %s),
+            (SELECT MIN(prof_id) FROM surveillance WHERE meta_id = %s),
+            (SELECT MIN(id) FROM departements),
+            (SELECT MIN(module_id) FROM inscriptions)
+    """, (meta_id, meta_id))
+    etudiant_id, prof_id, dept_id, module_id = cursor.fetchone()
+    return {
+        'meta_id': meta_id,
+        'etudiant_id': etudiant_id,
+        'prof_id': prof_id,
+        'dept_id': dept_id,
+        'module_id': module_id,
+    }
+
+def reset_caches():
+    """Empty every process-level cache of backend.queries"""
+    queries.invalidate_publication_state()
+    queries.invalidate_conflict_matrix()
+
+# =============================================
+# MEASUREMENTS
+# =============================================
+
+def bench_generation(runs):
+    """
+    Generate and publish `runs` schedule versions
+
+    Returns:
+        dict with median end-to-end and per-phase seconds, the publication
+        time and the meta_id of the last (published) version
+    """
+    totals, publications, phases = [], [], {}
+    stats = None
+    for run in range(runs):
+        print(f"--- Generation {run + 1}/{runs} ---")
+        started = time.perf_counter()
+        stats = ExamScheduler().generate_schedule(GENERATION_START, GENERATION_DURATION)
+        totals.append(time.perf_counter() - started)
+        for metric in stats['phase_metrics']:
+            phases.setdefault(metric['phase'], []).append(metric['wall_time'])
+
+        started = time.perf_counter()
+        if not queries.publish_schedule(stats['meta_id']):
+            raise RuntimeError(f"Publication of version {stats['meta_id']} failed")
+        publications.append(time.perf_counter() - started)
+
+    return {
+        'runs': runs,
+        'meta_id': stats['meta_id'],
+        'total_exams': stats['total_exams'],
+        'total_blocs': stats['total_blocs'],
+        'total_s': round(statistics.median(totals), 3),
+        'phases_s': {
+            phase: round(statistics.median(times), 3) for phase, times in phases.items()
+        },
+        'publish_s': round(statistics.median(publications), 3),
+    }
+
+def time_call(func, args):
+    """(elapsed ms, result size) of one call"""
+    started = time.perf_counter()
+    result = func(*args)
+    elapsed = (time.perf_counter() - started) * 1000
+    size = len(result) if isinstance(result, (list, dict)) else None
+    return elapsed, size
+
+def bench_queries(ids, runs):
+    """Median cold and warm latency (ms) of every function in QUERY_CASES"""
+    results = {}
+    for name, build_args in QUERY_CASES.items():
+        func = getattr(queries, name)
+        args = build_args(ids)
+
+        cold = []
+        for _ in range(runs):
+            reset_caches()
+            elapsed, size = time_call(func, args)
+            cold.append(elapsed)
+
+        # The last cold call left the caches filled
+        warm = [time_call(func, args)[0] for _ in range(runs)]
+
+        results[name] = {
+            'cold_ms': round(statistics.median(cold), 2),
+            'warm_ms': round(statistics.median(warm), 2),
+            'rows': size,
+        }
+        print(f"  {name:<30} cold {results[name]['cold_ms']:>9.2f} ms"
+              f"   warm {results[name]['warm_ms']:>9.2f} ms")
+    return results
+
+def uncovered_functions():
+    """Public functions of backend/queries.py the suite does not time"""
+    return sorted(
+        name for name, value in vars(queries).items()
+        if callable(value) and getattr(value, '__module__', None) == queries.__name__
+        and not name.startswith('_') and not isinstance(value, type)
+        and name not in QUERY_CASES and name not in SKIPPED_FUNCTIONS
+    )
+
+# =============================================
+# BASELINE COMPARISON
+# =============================================
+
+def timings(results):
+    """Flat {metric: milliseconds} view of a results document"""
+    flat = {}
+    generation = results.get('generation')
+    if generation:
+        flat['generation.total'] = generation['total_s'] * 1000
+        flat['generation.publish'] = generation['publish_s'] * 1000
+        for phase, seconds in generation['phases_s'].items():
+            flat[f'generation.{phase}'] = seconds * 1000
+    for name, result in results.get('queries', {}).items():
+        flat[f'queries.{name}.cold'] = result['cold_ms']
+        flat[f'queries.{name}.warm'] = result['warm_ms']
+    return flat
+
+def compare(results, baseline, tolerance=TOLERANCE, min_delta_ms=MIN_DELTA_MS):
+    """
+    Timings slower than the baseline by more than `tolerance` (and by at
+    least `min_delta_ms`)
+
+    Returns:
+        list of (metric, baseline ms, current ms), worst ratio first
+    """
+    if baseline['dataset'] != results['dataset']:
+        print("⚠️ Dataset differs from the baseline, timings are not comparable:")
+        print(f"   baseline {baseline['dataset']}")
+        print(f"   current  {results['dataset']}")
+
+    before, after = timings(baseline), timings(results)
+    regressions = []
+    for metric, current in after.items():
+        previous = before.get(metric)
+        if previous is None:
+            continue
+        if current > previous * (1 + tolerance) and current - previous >= min_delta_ms:
+            regressions.append((metric, previous, current))
+    return sorted(regressions, key=lambda r: r[2] / max(r[1], 0.001), reverse=True)
+
+# =============================================
+# MAIN
+# =============================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scheduler and page queries")
+    parser.add_argument('--runs', type=int, default=5,
+                        help="calls per query and cache state (median reported)")
+    parser.add_argument('--generation-runs', type=int, default=1,
+                        help="schedule generations (0 reuses the published version)")
+    parser.add_argument('--output', default=None,
+                        help="results file (default: benchmarks/results/<timestamp>-<revision>.json)")
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="store these results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    if not os.environ.get('EXAMDB_DSN'):
+        print("❌ Set EXAMDB_DSN to a local database: the suite writes schedule versions")
+        return 2
+
+    revision, dirty = git_revision()
+    with get_db_cursor() as cursor:
+        cursor.execute("SHOW server_version")
+        server_version = cursor.fetchone()[0]
+        dataset = dataset_size(cursor)
+    print(f"Dataset: {dataset}")
+
+    results = {
+        'revision': revision,
+        'dirty': dirty,
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'postgres': server_version,
+        'python': platform.python_version(),
+        'dataset': dataset,
+        'generation': None,
+        'queries': {},
+    }
+
+    if args.generation_runs > 0:
+        results['generation'] = bench_generation(args.generation_runs)
+        meta_id = results['generation']['meta_id']
+    else:
+        meta_id = queries.get_published_meta_id()
+        if meta_id is None:
+            print("❌ No published schedule version, run with --generation-runs 1")
+            return 2
+
+    with get_db_cursor() as cursor:
+        ids = sample_ids(cursor, meta_id)
+    print(f"--- Queries (version {meta_id}, {args.runs} runs) ---")
+    results['queries'] = bench_queries(ids, args.runs)
+
+    for name in uncovered_functions():
+        print(f"⚠️ {name} is not benchmarked, add it to QUERY_CASES or SKIPPED_FUNCTIONS")
+
+    output = args.output or os.path.join(
+        RESULTS_DIR,
+        f"{datetime.datetime.now():%Y%m%d-%H%M%S}-{revision or 'unknown'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Results written to {output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"ℹ️ No baseline at {args.baseline}, create one with --save-baseline")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    print(f"--- Compared with {baseline.get('revision')} ({baseline.get('timestamp')}) ---")
+    if not regressions:
+        print("✅ No regression")
+        return 0
+    for metric, previous, current in regressions:
+        print(f"❌ {metric}: {previous:.1f} ms -> {current:.1f} ms ({current / max(previous, 0.001):.1f}x)")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
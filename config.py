@@ -32,6 +32,23 @@ except Exception as e:
     print(f"Erreur config DB: {e}")
     DB_CONFIG = None
 
+# Local PostgreSQL (benchmarks, synthetic data), e.g. EXAMDB_DSN="dbname=examdb host=localhost"
+if os.environ.get('EXAMDB_DSN'):
+    DB_CONFIG = {'dsn': os.environ['EXAMDB_DSN']}
+
+# Connection pool (shared by every Streamlit session thread)
+DB_POOL_MIN = 2            # Connections opened at startup
+DB_POOL_MAX = 10           # Connections open at the same time (all kept open once idle)
+DB_POOL_TIMEOUT = 10       # seconds to wait for a free connection before failing
+DB_POOL_PING_AFTER = 30    # seconds idle after which a connection is checked before reuse
+DB_PREPARED_STATEMENTS = None  # PREPARE hot lookups per connection; None: only when the host is not a '-pooler' (transaction-mode) endpoint
+DB_HEALTH_CHECK_INTERVAL = 30  # seconds a successful connection test is reused across reruns
+
+# SQL tracing (opt-in: SQL_TRACE=1 in the environment)
+SQL_TRACE = os.environ.get('SQL_TRACE') == '1'
+SQL_TRACE_RERUN_QUERIES = 30   # Queries one Streamlit rerun may run before a warning
+SQL_TRACE_RERUN_MS = 500       # Total query time (ms) one rerun may spend before a warning
+
 
 # =============================================
 # APPLICATION SETTINGS
@@ -85,6 +102,10 @@ ALLOWED_DAYS = [0, 1, 2, 3, 6]  # Monday, Tuesday, Wednesday, Thursday, Sunday
 # Exam duration options (minutes)
 EXAM_DURATIONS = [90, 120, 180]
 
+# Slot assignment (graph colouring)
+SLOT_SEAT_FILL_RATE = 0.85         # Share of all seats one slot may book
+SLOT_ASSIGNMENT_TIME_SHARE = 0.5   # Share of MAX_SCHEDULE_GENERATION_TIME for slot assignment
+
 # =============================================
 # UI STYLING
 # =============================================
@@ -108,3 +129,11 @@ COLORS = {
 DEFAULT_PASSWORD = 'admin123'  # Users should change this immediately
 SESSION_TIMEOUT_MINUTES = 60
 MAX_SCHEDULE_GENERATION_TIME = 45  # seconds
+GENERATION_POLL_INTERVAL = 1  # seconds between status polls of a running generation
+GENERATION_TRACE_MEMORY = False  # Record peak Python memory per generation phase (tracemalloc; roughly doubles generation time)
+PUBLICATION_CACHE_TTL = 60  # seconds a cached published/latest version id stays valid
+SCHEDULE_VERSIONS_KEPT = 3  # Unpublished schedule versions kept besides the published one
+ANALYTICS_CACHE_TTL = 600  # seconds a cached dashboard query result stays valid
+WORKFLOW_CACHE_TTL = 30  # seconds for cached metadata and validation states
+CONFLICT_MATRIX_TTL = 600  # seconds before the in-process co-enrolment matrix is rebuilt from inscriptions
+ANALYTICS_REFRESH_WORK_MEM = '64MB'  # work_mem of the analytics views refresh transaction
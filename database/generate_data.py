@@ -0,0 +1,388 @@
+# =============================================
+# SYNTHETIC DATA GENERATOR
+# =============================================
+# Same shape as seed_data.sql (departments, formations L1-M2, modules,
+# students in groups G1-G4, inscriptions, rooms and amphis, professors,
+# users) at any scale, reproducible from a seed, bulk-loaded with COPY.
+#
+# The schema must exist (database/schema.sql, plus the analytics views of
+# backup_scripts/add_analytics_views.py). From the project root:
+#     python -m database.generate_data --scale 8 --rooms 10 --seed 42 --reset
+#
+# --scale 1 gives about the seed's 13,000 students; --scale 8 about 100,000.
+# =============================================
+
+import argparse
+import random
+import time
+from contextlib import contextmanager
+from backend.database import get_db_cursor, bulk_insert, reserve_ids
+from backend.analytics_views import refresh_analytics_views
+from backend.queries import invalidate_conflict_matrix
+
+# Department -> (licence prefix, licence specialities, master prefix, master specialities)
+DEPARTMENTS = {
+    'Informatique': (
+        'Licence Informatique ',
+        ['Systèmes d\'Information', 'Réseaux', 'Intelligence Artificielle', 'Génie Logiciel',
+         'Cybersécurité', 'Informatique Générale', 'Systèmes Embarqués', 'Big Data'],
+        'Master ',
+        ['IA et Apprentissage', 'Cybersécurité Avancée', 'Cloud Computing',
+         'Réseaux Avancés', 'Génie Logiciel', 'Data Science'],
+    ),
+    'Mathématiques': (
+        'Licence Mathématiques ',
+        ['Pures', 'Appliquées', 'Statistiques', 'Actuariat', 'Modélisation',
+         'Mathématiques Générales', 'Analyse Numérique'],
+        'Master Mathématiques ',
+        ['Recherche Opérationnelle', 'Statistiques Avancées', 'Modélisation',
+         'Analyse Numérique', 'Cryptographie'],
+    ),
+    'Physique': (
+        'Licence Physique ',
+        ['Fondamentale', 'Appliquée', 'Énergétique', 'Matériaux',
+         'Physique Médicale', 'Optique'],
+        'Master Physique ',
+        ['Physique Théorique', 'Nanotechnologie', 'Énergies Renouvelables',
+         'Physique Nucléaire'],
+    ),
+    'Chimie': (
+        'Licence Chimie ',
+        ['Organique', 'Inorganique', 'Analytique', 'Industrielle',
+         'Pharmaceutique', 'Environnementale'],
+        'Master Chimie ',
+        ['Chimie Fine', 'Polymères', 'Catalyse', 'Chimie Verte'],
+    ),
+    'Sciences de la Vie': (
+        'Licence Biologie ',
+        ['Cellulaire', 'Moléculaire', 'Écologie', 'Microbiologie',
+         'Génétique', 'Biochimie'],
+        'Master Biologie ',
+        ['Biotechnologie', 'Génomique', 'Immunologie', 'Neurosciences'],
+    ),
+    'Sciences Économiques': (
+        'Licence ',
+        ['Économie', 'Gestion', 'Finance', 'Commerce International',
+         'Marketing', 'Comptabilité', 'Management'],
+        'Master ',
+        ['Finance d\'Entreprise', 'Audit', 'Marketing Stratégique',
+         'Management International', 'Économie Quantitative'],
+    ),
+    'Lettres et Langues': (
+        'Licence ',
+        ['Langue Arabe', 'Langue Française', 'Langue Anglaise',
+         'Traduction', 'Littérature', 'Linguistique'],
+        'Master ',
+        ['Traduction Spécialisée', 'Linguistique Appliquée',
+         'Littérature Comparée', 'Didactique'],
+    ),
+}
+
+MODULE_NAMES = [
+    'Analyse Mathématique', 'Algèbre Linéaire', 'Algorithmique', 'Programmation',
+    'Bases de Données', 'Systèmes d\'Exploitation', 'Réseaux Informatiques',
+    'Génie Logiciel', 'Intelligence Artificielle', 'Théorie des Graphes',
+    'Probabilités et Statistiques', 'Physique Générale', 'Chimie Générale',
+    'Thermodynamique', 'Mécanique Quantique', 'Optique', 'Électromagnétisme',
+    'Biologie Cellulaire', 'Génétique', 'Biochimie', 'Microbiologie',
+    'Économie Générale', 'Microéconomie', 'Macroéconomie', 'Comptabilité',
+    'Finance', 'Marketing', 'Management', 'Droit Commercial',
+    'Langue Arabe', 'Grammaire', 'Littérature', 'Traduction', 'Linguistique',
+    'Philosophie', 'Logique', 'Méthodologie', 'Recherche Opérationnelle'
+]
+
+FIRST_NAMES_M = [
+    'Mohamed', 'Ahmed', 'Ali', 'Omar', 'Youssef', 'Amine', 'Karim', 'Mehdi',
+    'Bilal', 'Hamza', 'Rami', 'Samir', 'Tarek', 'Walid', 'Sofiane', 'Reda',
+    'Nabil', 'Farid', 'Hicham', 'Rachid', 'Abdallah', 'Ibrahim', 'Ismail',
+    'Khalil', 'Mourad', 'Nadir', 'Oussama', 'Sami', 'Zakaria', 'Adel'
+]
+FIRST_NAMES_F = [
+    'Fatima', 'Amina', 'Khadija', 'Aicha', 'Meriem', 'Yasmine', 'Samira',
+    'Salma', 'Nadia', 'Leila', 'Karima', 'Malika', 'Hanane', 'Wafa', 'Souad',
+    'Houria', 'Latifa', 'Naima', 'Sabrina', 'Sarah', 'Zineb', 'Imane',
+    'Kenza', 'Lina', 'Nesrine', 'Rania', 'Siham', 'Widad'
+]
+LAST_NAMES = [
+    'Benali', 'Hassani', 'Mansouri', 'Kaddour', 'Brahimi', 'Saadi', 'Rahmani',
+    'Meziane', 'Gharbi', 'Cherif', 'Bouazza', 'Hamdi', 'Boumediene', 'Yahia',
+    'Belkacem', 'Djebbar', 'Ouali', 'Mammeri', 'Amrani', 'Taleb', 'Bouzid',
+    'Slimani', 'Zaidi', 'Fergani', 'Boukhari', 'Chaoui', 'Mokrani', 'Benziane',
+    'Khelifi', 'Guessab', 'Toumi', 'Benameur', 'Hadj', 'Bensalah', 'Djoudi'
+]
+SPECIALTIES = [
+    'Algorithmique', 'Bases de Données', 'Intelligence Artificielle', 'Réseaux',
+    'Analyse Mathématique', 'Algèbre', 'Statistiques', 'Physique Théorique',
+    'Chimie Organique', 'Biologie Moléculaire', 'Économie', 'Gestion',
+    'Linguistique', 'Littérature'
+]
+GROUPS = ['G1', 'G2', 'G3', 'G4']
+
+# Seed sizes at scale 1
+CLASSROOMS = 150            # capacity 18-22, 30 per floor
+AMPHITHEATERS = 15          # capacity 85-99
+PROFESSORS_PER_DEPT = (25, 40)
+
+DATA_TABLES = (
+    'departements', 'lieu_examen', 'users', 'exam_schedule_metadata',
+    'student_timetable', 'professor_timetable'
+)
+
+def students_per_formation(rng, niveau):
+    """More students in lower levels (same ranges as seed_data.sql)"""
+    if niveau <= 2:
+        return rng.randint(80, 120)
+    if niveau == 3:
+        return rng.randint(50, 80)
+    return rng.randint(20, 40)
+
+def formation_specs(scale):
+    """
+    (dept, name, niveau) of every formation
+
+    Formations are the unit of growth: scale 3 gives every speciality three
+    parallel tracks ("Réseaux", "Réseaux 2", "Réseaux 3"), each with its own
+    modules and students, so co-enrolment stays realistic.
+    """
+    base = []
+    for dept, (l_prefix, l_specs, m_prefix, m_specs) in DEPARTMENTS.items():
+        base += [(dept, l_prefix, spec, 'L', niveau) for spec in l_specs for niveau in (1, 2, 3)]
+        base += [(dept, m_prefix, spec, 'M', niveau) for spec in m_specs for niveau in (4, 5)]
+
+    total = max(1, round(len(base) * scale))
+    specs = []
+    for i in range(total):
+        dept, prefix, spec, level, niveau = base[i % len(base)]
+        track = i // len(base) + 1
+        if track > 1:
+            spec = f"{spec} {track}"
+        year = niveau if level == 'L' else niveau - 3
+        specs.append((dept, f"{prefix}{spec} - {level}{year}", niveau))
+    return specs
+
+def _has_column(cursor, table, column):
+    cursor.execute("""
+        SELECT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = %s AND column_name = %s
+        )
+    """, (table, column))
+    return cursor.fetchone()[0]
+
+@contextmanager
+def constraints_deferred(cursor, table):
+    """
+    Drop a table's foreign keys and plain indexes during a bulk load
+
+    Row-by-row foreign key checks and index updates cost most of a large
+    load; rebuilding them afterwards validates and sorts every row at once.
+    Unique constraints and the primary key stay in place.
+    """
+    cursor.execute("""
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'f'
+    """, (table,))
+    foreign_keys = cursor.fetchall()
+    cursor.execute("""
+        SELECT i.indexname, i.indexdef FROM pg_indexes i
+        WHERE i.tablename = %s
+        AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conname = i.indexname)
+    """, (table,))
+    indexes = cursor.fetchall()
+
+    for name, _ in foreign_keys:
+        cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"')
+    for name, _ in indexes:
+        cursor.execute(f'DROP INDEX "{name}"')
+
+    yield
+
+    for _, definition in indexes:
+        cursor.execute(definition)
+    for name, definition in foreign_keys:
+        cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}')
+
+def reset_data(cursor):
+    """Empty every data table and restart the id sequences"""
+    cursor.execute(f"TRUNCATE {', '.join(DATA_TABLES)} RESTART IDENTITY CASCADE")
+
+def load_dataset(cursor, scale=1.0, room_scale=None, professor_scale=None, seed=42):
+    """
+    Generate and COPY a synthetic dataset inside the caller's transaction
+
+    Args:
+        cursor: Cursor of the loading transaction
+        scale: Formations (and so modules, students, inscriptions) multiplier
+        room_scale: Classrooms and amphitheaters multiplier (default: scale)
+        professor_scale: Professors multiplier (default: scale)
+        seed: Random seed; the same arguments give the same dataset
+
+    Returns:
+        dict of row counts per table
+    """
+    rng = random.Random(seed)
+    room_scale = scale if room_scale is None else room_scale
+    professor_scale = scale if professor_scale is None else professor_scale
+    counts = {}
+
+    # 1. Departments
+    dept_ids = dict(zip(DEPARTMENTS, reserve_ids(cursor, 'departements', len(DEPARTMENTS))))
+    counts['departements'] = bulk_insert(
+        'departements', ('id', 'nom'),
+        [(dept_id, name) for name, dept_id in dept_ids.items()], cursor=cursor
+    )
+
+    # 2. Formations
+    specs = formation_specs(scale)
+    formation_ids = reserve_ids(cursor, 'formations', len(specs))
+    counts['formations'] = bulk_insert(
+        'formations', ('id', 'nom', 'dept_id', 'niveau'),
+        [(fid, name, dept_ids[dept], niveau) for fid, (dept, name, niveau) in zip(formation_ids, specs)],
+        cursor=cursor
+    )
+
+    # 3. Modules (6-9 per formation, first half in semester 1)
+    modules = []
+    for fid in formation_ids:
+        num_modules = rng.randint(6, 9)
+        for i in range(1, num_modules + 1):
+            modules.append((f"{rng.choice(MODULE_NAMES)} {i}", 6, fid, 1 if i <= num_modules // 2 else 2))
+    module_ids = reserve_ids(cursor, 'modules', len(modules))
+    counts['modules'] = bulk_insert(
+        'modules', ('id', 'nom', 'credits', 'formation_id', 'semestre'),
+        [(mid, *module) for mid, module in zip(module_ids, modules)], cursor=cursor
+    )
+
+    # 4. Exam locations
+    classrooms = round(CLASSROOMS * room_scale)
+    amphis = max(1, round(AMPHITHEATERS * room_scale))
+    rooms = [
+        (f"Classe {i // 30 + 1}.{i % 30 + 1}", rng.randint(18, 22), 'classe')
+        for i in range(classrooms)
+    ] + [
+        (f"Amphithéâtre {chr(65 + i) if amphis <= 26 else i + 1}", rng.randint(85, 99), 'amphi')
+        for i in range(amphis)
+    ]
+    counts['lieu_examen'] = bulk_insert('lieu_examen', ('nom', 'capacite', 'type'), rooms, cursor=cursor)
+
+    # 5. Professors
+    with_matricule = _has_column(cursor, 'professeurs', 'matricule')
+    low, high = PROFESSORS_PER_DEPT
+    professors = [
+        (rng.choice(LAST_NAMES), rng.choice(FIRST_NAMES_M + FIRST_NAMES_F), dept_id, rng.choice(SPECIALTIES))
+        for dept_id in dept_ids.values()
+        for _ in range(max(1, round(rng.randint(low, high) * professor_scale)))
+    ]
+    prof_ids = reserve_ids(cursor, 'professeurs', len(professors))
+    columns = ('id', 'nom', 'prenom', 'dept_id', 'specialite')
+    rows = [(pid, *prof) for pid, prof in zip(prof_ids, professors)]
+    if with_matricule:
+        columns += ('matricule',)
+        rows = [(*row, f"MATPROF-{row[0]}") for row in rows]
+    counts['professeurs'] = bulk_insert('professeurs', columns, rows, cursor=cursor)
+
+    # 6. Students
+    with_matricule = _has_column(cursor, 'etudiants', 'matricule')
+    students = []
+    for fid, (_, _, niveau) in zip(formation_ids, specs):
+        for _ in range(students_per_formation(rng, niveau)):
+            first_names = FIRST_NAMES_M if rng.random() > 0.5 else FIRST_NAMES_F
+            students.append((
+                rng.choice(LAST_NAMES), rng.choice(first_names), fid,
+                2024 + niveau, rng.choice(GROUPS)
+            ))
+    student_ids = reserve_ids(cursor, 'etudiants', len(students))
+    columns = ('id', 'nom', 'prenom', 'formation_id', 'promo', 'groupe')
+    rows = [(sid, *student) for sid, student in zip(student_ids, students)]
+    if with_matricule:
+        columns += ('matricule',)
+        rows = [(*row, f"MATETUD-{row[0]}") for row in rows]
+    with constraints_deferred(cursor, 'etudiants'):
+        counts['etudiants'] = bulk_insert('etudiants', columns, rows, cursor=cursor)
+
+    # 7. Inscriptions: every student in every module of their formation
+    # (derived data, built server-side without a round-trip per row)
+    with constraints_deferred(cursor, 'inscriptions'):
+        cursor.execute("""
+            INSERT INTO inscriptions (etudiant_id, module_id, annee_academique)
+            SELECT e.id, m.id, '2025-2026'
+            FROM etudiants e
+            JOIN modules m ON m.formation_id = e.formation_id
+            WHERE e.formation_id = ANY(%s)
+        """, (formation_ids,))
+        counts['inscriptions'] = cursor.rowcount
+
+    # 8. Users (same credentials as seed_data.sql; students log in with
+    # their matricule when the column exists, like sync_users.py).
+    # Admin and vice-doyen first: their numeric usernames would otherwise
+    # be taken by the professors with the same id.
+    cursor.execute("""
+        INSERT INTO users (user_id, username, password, role) VALUES
+        (NULL, '1', 'adminadmin', 'admin'),
+        (NULL, '2', 'vicedoyenvicedoyen', 'vice_doyen')
+        ON CONFLICT (username) DO NOTHING
+    """)
+    counts['users'] = cursor.rowcount
+    student_username = "matricule" if with_matricule else "id::TEXT"
+    cursor.execute(f"""
+        INSERT INTO users (user_id, username, password, role)
+        SELECT id, 'chef_' || LOWER(REPLACE(nom, ' ', '_')), 'admin123', 'chef_dept'
+        FROM departements WHERE id = ANY(%s)
+        UNION ALL
+        SELECT id, id::TEXT, nom || prenom, 'professor'
+        FROM professeurs WHERE id = ANY(%s)
+        UNION ALL
+        SELECT id, {student_username}, nom || prenom, 'student'
+        FROM etudiants WHERE formation_id = ANY(%s)
+        ON CONFLICT (username) DO NOTHING
+    """, (list(dept_ids.values()), prof_ids, formation_ids))
+    counts['users'] += cursor.rowcount
+
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Load a synthetic exam dataset")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="formations/students multiplier (1 = seed size, ~13k students)")
+    parser.add_argument('--rooms', type=float, default=None,
+                        help="rooms and amphis multiplier (default: --scale)")
+    parser.add_argument('--professors', type=float, default=None,
+                        help="professors multiplier (default: --scale)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reset', action='store_true',
+                        help="empty every data table first (schedules included)")
+    args = parser.parse_args()
+
+    started = time.time()
+    with get_db_cursor(commit=True) as cursor:
+        if args.reset:
+            print("--- Resetting Data ---")
+            reset_data(cursor)
+        else:
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM departements)")
+            if cursor.fetchone()[0]:
+                print("❌ Database already holds data, run again with --reset")
+                return
+
+        print(f"--- Loading (scale {args.scale}, seed {args.seed}) ---")
+        counts = load_dataset(cursor, args.scale, args.rooms, args.professors, args.seed)
+    # Other processes rebuild theirs after CONFLICT_MATRIX_TTL
+    invalidate_conflict_matrix()
+
+    with get_db_cursor(commit=True) as cursor:
+        for table in ('formations', 'modules', 'etudiants', 'professeurs',
+                      'inscriptions', 'lieu_examen', 'users'):
+            cursor.execute(f"ANALYZE {table}")
+
+    try:
+        # Dashboards must not keep aggregates of the removed schedules
+        refresh_analytics_views()
+    except Exception as e:
+        print(f"⚠️ Analytics views not refreshed: {e}")
+
+    for table, count in counts.items():
+        print(f"✅ {table}: {count}")
+    print(f"\n✅ Dataset loaded in {time.time() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
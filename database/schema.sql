@@ -8,6 +8,8 @@
 
 -- Drop existing tables if they exist (for development)
 -- Order matters due to foreign keys
+DROP TABLE IF EXISTS professor_timetable CASCADE;
+DROP TABLE IF EXISTS student_timetable CASCADE;
 DROP TABLE IF EXISTS validation_state CASCADE;
 DROP TABLE IF EXISTS surveillance CASCADE;
 DROP TABLE IF EXISTS bloc_etudiant CASCADE;
@@ -109,13 +111,63 @@ CREATE TABLE lieu_examen (
 
 CREATE INDEX idx_lieu_type ON lieu_examen(type);
 
+-- =============================================
+-- AUTHENTICATION & METADATA TABLES
+-- =============================================
+
+-- Users Table (for authentication)
+-- =============================================
+-- USERS TABLE (simplifiée)
+-- =============================================
+CREATE TABLE users (
+    id SERIAL PRIMARY KEY,
+    user_id INT,                        -- référence à etudiants, professeurs, départements
+    username VARCHAR(255) UNIQUE NOT NULL,
+    password VARCHAR(255) NOT NULL,     -- mot de passe en clair (ou hashé si voulu)
+    role VARCHAR(50) NOT NULL CHECK (role IN ('admin','vice_doyen','chef_dept','professor','student')),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_users_role ON users(role);
+CREATE INDEX idx_users_userid ON users(user_id);
+
+-- Exam Schedule Metadata (tracks generation runs)
+-- Updated with publication columns from v2
+CREATE TABLE exam_schedule_metadata (
+    id SERIAL PRIMARY KEY,
+    generation_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    start_date DATE NOT NULL,
+    end_date DATE,
+    execution_time_seconds DECIMAL(10, 2),
+    total_exams INTEGER,
+    total_blocs INTEGER,
+    conflicts_detected INTEGER DEFAULT 0,
+    conflicts_resolved INTEGER DEFAULT 0,
+    generated_by INTEGER REFERENCES users(id),
+    status VARCHAR(50) CHECK (status IN ('generating', 'completed', 'failed', 'archived')),
+    is_published BOOLEAN DEFAULT FALSE,
+    global_validation_status VARCHAR(50) DEFAULT 'PENDING' CHECK (global_validation_status IN ('PENDING', 'VALIDATED', 'REJECTED')),
+    notes TEXT,
+    -- Per-phase generation metrics: [{phase, wall_time, round_trips, rows_written, peak_memory_mb}]
+    phase_metrics JSONB
+);
+
+CREATE INDEX idx_metadata_generation ON exam_schedule_metadata(status, generation_date DESC);
+
+-- At most one published version: publishing is a pointer switch
+CREATE UNIQUE INDEX idx_metadata_published ON exam_schedule_metadata(is_published) WHERE is_published;
+
 -- =============================================
 -- EXAM SCHEDULING TABLES
 -- =============================================
 
--- Exams Table (One per module)
+-- Every schedule row belongs to one version (exam_schedule_metadata.id),
+-- so a new generation never touches the published schedule
+
+-- Exams Table (One per module and version)
 CREATE TABLE examens (
     id SERIAL PRIMARY KEY,
+    meta_id INTEGER NOT NULL REFERENCES exam_schedule_metadata(id) ON DELETE CASCADE,
     module_id INTEGER NOT NULL REFERENCES modules(id) ON DELETE CASCADE,
     date_heure TIMESTAMP NOT NULL,
     duree_minutes INTEGER NOT NULL CHECK (duree_minutes > 0),
@@ -124,23 +176,27 @@ CREATE TABLE examens (
     CONSTRAINT no_friday_exams CHECK (EXTRACT(DOW FROM date_heure) != 5)
 );
 
+CREATE INDEX idx_examens_meta ON examens(meta_id, module_id);
 CREATE INDEX idx_examens_module ON examens(module_id);
 CREATE INDEX idx_examens_date ON examens(date_heure);
 
 -- Exam Bloc (handles room assignment and group merging/splitting)
 CREATE TABLE exam_bloc (
     id SERIAL PRIMARY KEY,
+    meta_id INTEGER NOT NULL REFERENCES exam_schedule_metadata(id) ON DELETE CASCADE,
     examen_id INTEGER NOT NULL REFERENCES examens(id) ON DELETE CASCADE,
     salle_id INTEGER NOT NULL REFERENCES lieu_examen(id) ON DELETE CASCADE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE INDEX idx_exam_bloc_meta ON exam_bloc(meta_id);
 CREATE INDEX idx_exam_bloc_examen ON exam_bloc(examen_id);
 CREATE INDEX idx_exam_bloc_salle ON exam_bloc(salle_id);
 
 -- Students in Exam Bloc
 CREATE TABLE bloc_etudiant (
     id SERIAL PRIMARY KEY,
+    meta_id INTEGER NOT NULL REFERENCES exam_schedule_metadata(id) ON DELETE CASCADE,
     bloc_id INTEGER NOT NULL REFERENCES exam_bloc(id) ON DELETE CASCADE,
     etudiant_id INTEGER NOT NULL REFERENCES etudiants(id) ON DELETE CASCADE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -149,10 +205,12 @@ CREATE TABLE bloc_etudiant (
 
 CREATE INDEX idx_bloc_etudiant_bloc ON bloc_etudiant(bloc_id);
 CREATE INDEX idx_bloc_etudiant_etudiant ON bloc_etudiant(etudiant_id);
+CREATE INDEX idx_bloc_etudiant_meta ON bloc_etudiant(meta_id, etudiant_id);
 
 -- Supervision Table
 CREATE TABLE surveillance (
     id SERIAL PRIMARY KEY,
+    meta_id INTEGER NOT NULL REFERENCES exam_schedule_metadata(id) ON DELETE CASCADE,
     bloc_id INTEGER NOT NULL REFERENCES exam_bloc(id) ON DELETE CASCADE,
     prof_id INTEGER NOT NULL REFERENCES professeurs(id) ON DELETE CASCADE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -161,45 +219,7 @@ CREATE TABLE surveillance (
 
 CREATE INDEX idx_surveillance_bloc ON surveillance(bloc_id);
 CREATE INDEX idx_surveillance_prof ON surveillance(prof_id);
-
--- =============================================
--- AUTHENTICATION & METADATA TABLES
--- =============================================
-
--- Users Table (for authentication)
--- =============================================
--- USERS TABLE (simplifiée)
--- =============================================
-CREATE TABLE users (
-    id SERIAL PRIMARY KEY,
-    user_id INT,                        -- référence à etudiants, professeurs, départements
-    username VARCHAR(255) UNIQUE NOT NULL,
-    password VARCHAR(255) NOT NULL,     -- mot de passe en clair (ou hashé si voulu)
-    role VARCHAR(50) NOT NULL CHECK (role IN ('admin','vice_doyen','chef_dept','professor','student')),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
-
-CREATE INDEX idx_users_role ON users(role);
-CREATE INDEX idx_users_userid ON users(user_id);
-
--- Exam Schedule Metadata (tracks generation runs)
--- Updated with publication columns from v2
-CREATE TABLE exam_schedule_metadata (
-    id SERIAL PRIMARY KEY,
-    generation_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-    start_date DATE NOT NULL,
-    end_date DATE,
-    execution_time_seconds DECIMAL(10, 2),
-    total_exams INTEGER,
-    total_blocs INTEGER,
-    conflicts_detected INTEGER DEFAULT 0,
-    conflicts_resolved INTEGER DEFAULT 0,
-    generated_by INTEGER REFERENCES users(id),
-    status VARCHAR(50) CHECK (status IN ('generating', 'completed', 'failed')),
-    is_published BOOLEAN DEFAULT FALSE,
-    global_validation_status VARCHAR(50) DEFAULT 'PENDING' CHECK (global_validation_status IN ('PENDING', 'VALIDATED', 'REJECTED')),
-    notes TEXT
-);
+CREATE INDEX idx_surveillance_meta ON surveillance(meta_id, prof_id);
 
 -- =============================================
 -- VALIDATION WORKFLOW TABLES
@@ -220,6 +240,50 @@ CREATE TABLE validation_state (
     CONSTRAINT unique_validation_entry UNIQUE NULLS NOT DISTINCT (meta_id, validator_role, dept_id)
 );
 
+-- =============================================
+-- PUBLISHED TIMETABLE SNAPSHOTS
+-- =============================================
+-- Denormalized copies of the published version, built by publish_schedule
+-- and patched by incremental changes (see backend/timetables.py).
+-- No foreign keys: rows are derived data, replaced at each publication.
+
+-- One row per (student, exam)
+CREATE TABLE student_timetable (
+    meta_id INTEGER NOT NULL,
+    etudiant_id INTEGER NOT NULL,
+    examen_id INTEGER NOT NULL,
+    module VARCHAR(150) NOT NULL,
+    formation VARCHAR(150) NOT NULL,
+    date_heure TIMESTAMP NOT NULL,
+    duree_minutes INTEGER NOT NULL,
+    salle VARCHAR(100) NOT NULL,
+    salle_type VARCHAR(20) NOT NULL,
+    PRIMARY KEY (meta_id, etudiant_id, examen_id)
+);
+
+CREATE INDEX idx_student_timetable_lookup ON student_timetable(meta_id, etudiant_id, date_heure);
+CREATE INDEX idx_student_timetable_exam ON student_timetable(meta_id, examen_id);
+
+-- One row per (professor, supervised bloc), student count pre-aggregated
+CREATE TABLE professor_timetable (
+    meta_id INTEGER NOT NULL,
+    prof_id INTEGER NOT NULL,
+    examen_id INTEGER NOT NULL,
+    bloc_id INTEGER NOT NULL,
+    module VARCHAR(150) NOT NULL,
+    formation VARCHAR(150) NOT NULL,
+    departement VARCHAR(100) NOT NULL,
+    date_heure TIMESTAMP NOT NULL,
+    duree_minutes INTEGER NOT NULL,
+    salle VARCHAR(100) NOT NULL,
+    salle_type VARCHAR(20) NOT NULL,
+    nb_etudiants INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (meta_id, prof_id, bloc_id)
+);
+
+CREATE INDEX idx_professor_timetable_lookup ON professor_timetable(meta_id, prof_id, date_heure);
+CREATE INDEX idx_professor_timetable_exam ON professor_timetable(meta_id, examen_id);
+
 
 -- =============================================
 -- VIEWS FOR COMMON QUERIES
@@ -228,6 +292,7 @@ CREATE TABLE validation_state (
 -- View: Student Exam Schedule
 CREATE OR REPLACE VIEW v_student_exam_schedule AS
 SELECT 
+    ex.meta_id,
     e.id AS etudiant_id,
     e.nom AS etudiant_nom,
     e.prenom AS etudiant_prenom,
@@ -249,6 +314,7 @@ ORDER BY e.id, ex.date_heure;
 -- View: Professor Supervision Schedule
 CREATE OR REPLACE VIEW v_professor_supervision AS
 SELECT 
+    ex.meta_id,
     p.id AS professeur_id,
     p.nom AS professeur_nom,
     p.prenom AS professeur_prenom,
@@ -265,9 +331,16 @@ JOIN examens ex ON eb.examen_id = ex.id
 JOIN modules m ON ex.module_id = m.id
 JOIN lieu_examen l ON eb.salle_id = l.id
 LEFT JOIN bloc_etudiant be ON eb.id = be.bloc_id
-GROUP BY p.id, p.nom, p.prenom, m.nom, ex.date_heure, ex.duree_minutes, l.nom, l.type
+GROUP BY ex.meta_id, p.id, p.nom, p.prenom, m.nom, ex.date_heure, ex.duree_minutes, l.nom, l.type
 ORDER BY p.id, ex.date_heure;
 
+-- =============================================
+-- MATERIALIZED ANALYTICS VIEWS
+-- =============================================
+-- Dashboard aggregates per completed schedule version (mv_*), defined
+-- only in backend/analytics_views.py. Create them once the schema exists:
+--     python -m backup_scripts.add_analytics_views
+
 -- =============================================
 -- INITIAL DATA
 -- =============================================
@@ -7,11 +7,12 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import date, datetime
-from backend.scheduler import ExamScheduler
+from backend.generation_jobs import generation_jobs, GENERATION_PHASES
 from backend.queries import (
     get_global_kpis, get_conflicts_report, get_exam_timeline,
-    get_room_occupancy_stats, get_supervision_fairness
+    get_room_occupancy_stats, get_supervision_fairness, get_generation_history
 )
+import config
 
 def show():
     """Show Exam Administrator Dashboard"""
@@ -75,44 +76,167 @@ def show_generation_tab():
             submit = st.form_submit_button("🚀 Générer le Planning", use_container_width=True)
     
     if submit:
-        with st.spinner("⏳ Génération du planning en cours..."):
-            try:
-                scheduler = ExamScheduler()
-                stats = scheduler.generate_schedule(start_date_input, duration)
-                
-                # Show success message
-                st.success(f"✅ Planning généré avec succès en {stats['execution_time']} secondes!")
-                
-                # Display statistics
-                col1, col2, col3, col4 = st.columns(4)
-                
-                with col1:
-                    st.metric("Examens planifiés", stats['total_exams'])
-                
-                with col2:
-                    st.metric("Blocs créés", stats['total_blocs'])
-                
-                with col3:
-                    st.metric("Étudiants planifiés", stats['total_students'])
-                
-                with col4:
-                    status_color = "🟢" if stats['execution_time'] < 45 else "🟡"
-                    st.metric(f"{status_color} Temps", f"{stats['execution_time']}s")
-                
-                # Show conflicts if any
-                if stats['conflicts_detected'] > 0:
-                    st.warning(f"⚠️ {stats['conflicts_detected']} conflit(s) détecté(s)")
-                else:
-                    st.info("✅ Aucun conflit détecté")
-                
-                # Room utilization
-                if stats.get('room_utilization'):
-                    st.markdown("### 📍 Utilisation des Salles")
-                    util_df = pd.DataFrame(stats['room_utilization'].values())
-                    st.dataframe(util_df, use_container_width=True)
-                
-            except Exception as e:
-                st.error(f"❌ Erreur lors de la génération: {e}")
+        st.session_state.generation_job_id = generation_jobs.submit(start_date_input, duration)
+
+    show_generation_job()
+    show_generation_history()
+
+def _current_generation_job():
+    """This session's generation job, or the latest one of the process"""
+    job_id = st.session_state.get('generation_job_id')
+    job = generation_jobs.status(job_id) if job_id else None
+    return job or generation_jobs.latest()
+
+def show_generation_job():
+    """Progress of the running generation, or the result of the last one"""
+    job = _current_generation_job()
+    if job is None:
+        return
+
+    if job['status'] in ('pending', 'running'):
+        show_generation_progress()
+    else:
+        show_generation_result(job)
+
+@st.fragment(run_every=config.GENERATION_POLL_INTERVAL)
+def show_generation_progress():
+    """Polled every GENERATION_POLL_INTERVAL seconds while the job runs"""
+    job = _current_generation_job()
+    if job is None or job['status'] not in ('pending', 'running'):
+        # Full rerun: shows the result and stops polling
+        st.rerun()
+
+    label = job['phase_label'] or "En attente du démarrage"
+    st.progress(
+        job['phase_index'] / job['phase_count'],
+        text=f"⏳ Étape {job['phase_index']}/{job['phase_count']} : {label}"
+    )
+
+    counts = job['counts']
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Examens créés", counts.get('exams_created', 0))
+    with col2:
+        st.metric("Blocs placés", counts.get('blocs_placed', 0))
+    with col3:
+        st.metric("Surveillances attribuées", counts.get('supervisors_assigned', 0))
+    with col4:
+        st.metric("Temps écoulé", f"{job['elapsed']}s")
+
+    if job['over_time']:
+        st.warning(
+            f"⚠️ La génération dépasse {config.MAX_SCHEDULE_GENERATION_TIME} secondes, "
+            "elle continue en arrière-plan."
+        )
+
+    if job['cancel_requested']:
+        st.info("⛔ Annulation demandée, arrêt à la fin de l'étape en cours...")
+    elif st.button("⛔ Annuler la génération", key=f"cancel_{job['id']}"):
+        generation_jobs.cancel(job['id'])
+        st.rerun(scope="fragment")
+
+def show_generation_result(job):
+    """Outcome of a finished generation job"""
+    if job['status'] == 'cancelled':
+        st.warning("⛔ Génération annulée, aucun planning n'a été enregistré.")
+        return
+
+    if job['status'] == 'failed':
+        st.error(f"❌ Erreur lors de la génération: {job['error']}")
+        return
+
+    stats = job['stats']
+
+    # Show success message
+    st.success(f"✅ Planning généré avec succès en {stats['execution_time']} secondes!")
+
+    # Display statistics
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("Examens planifiés", stats['total_exams'])
+
+    with col2:
+        st.metric("Blocs créés", stats['total_blocs'])
+
+    with col3:
+        st.metric("Étudiants planifiés", stats['total_students'])
+
+    with col4:
+        status_color = "🟢" if stats['execution_time'] < config.MAX_SCHEDULE_GENERATION_TIME else "🟡"
+        st.metric(f"{status_color} Temps", f"{stats['execution_time']}s")
+
+    # Show conflicts if any
+    if stats['conflicts_detected'] > 0:
+        st.warning(f"⚠️ {stats['conflicts_detected']} conflit(s) détecté(s)")
+        st.info(
+            f"🔧 {stats['conflicts_resolved']} conflit(s) résolu(s) automatiquement "
+            f"en {stats.get('resolution_time', 0)}s"
+        )
+    else:
+        st.info("✅ Aucun conflit détecté")
+
+    # Room utilization
+    if stats.get('room_utilization'):
+        st.markdown("### 📍 Utilisation des Salles")
+        util_df = pd.DataFrame(stats['room_utilization'].values())
+        st.dataframe(util_df, use_container_width=True)
+
+    # Per-phase metrics
+    if stats.get('phase_metrics'):
+        st.markdown("### ⏱️ Détail par Étape")
+        st.dataframe(phase_metrics_frame(stats['phase_metrics']), use_container_width=True, hide_index=True)
+
+def phase_metrics_frame(phase_metrics):
+    """Per-phase generation metrics with French column names"""
+    # Memory is only recorded with GENERATION_TRACE_MEMORY
+    df = pd.DataFrame(phase_metrics).dropna(axis=1, how='all')
+    df['phase'] = df['phase'].map(lambda p: GENERATION_PHASES.get(p, p))
+    return df.rename(columns={
+        'phase': 'Étape',
+        'wall_time': 'Durée (s)',
+        'round_trips': 'Requêtes SQL',
+        'rows_written': 'Lignes écrites',
+        'peak_memory_mb': 'Mémoire max (Mo)',
+    })
+
+def show_generation_history():
+    """Phase durations of the latest generations, to spot regressions"""
+    history = get_generation_history()
+    if not history:
+        return
+
+    with st.expander("📈 Historique des générations (durée par étape)"):
+        rows = [
+            {
+                'Version': run['id'],
+                'Date': run['generation_date'],
+                'Étape': GENERATION_PHASES.get(phase['phase'], phase['phase']),
+                'Durée (s)': phase['wall_time'],
+            }
+            for run in history
+            for phase in run['phase_metrics']
+        ]
+        df = pd.DataFrame(rows)
+        fig = px.bar(
+            df, x='Version', y='Durée (s)', color='Étape',
+            title="Durée des étapes par génération"
+        )
+        fig.update_xaxes(type='category')
+        st.plotly_chart(fig, use_container_width=True)
+
+        totals = pd.DataFrame([
+            {
+                'Version': run['id'],
+                'Date': run['generation_date'],
+                'Statut': run['status'],
+                'Temps de calcul (s)': run['execution_time_seconds'],
+                'Requêtes SQL': sum(p['round_trips'] for p in run['phase_metrics']),
+                'Lignes écrites': sum(p['rows_written'] for p in run['phase_metrics']),
+            }
+            for run in history
+        ])
+        st.dataframe(totals, use_container_width=True, hide_index=True)
 
 def show_statistics_tab():
     """Statistics and KPIs tab"""
@@ -0,0 +1,71 @@
+# =============================================
+# ROOM OCCUPANCY INDEX TESTS
+# =============================================
+
+import random
+from datetime import datetime, timedelta
+from backend.room_occupancy import RoomOccupancy
+
+def naive_free_rooms(rooms, bookings, start, end, min_capacity=0):
+    """Reference answer: every room checked against every booking"""
+    busy = {room_id for room_id, s, e in bookings if s < end and start < e}
+    return [
+        r for r in sorted(rooms, key=lambda r: (r['capacite'], r['id']))
+        if r['capacite'] >= min_capacity and r['id'] not in busy
+    ]
+
+def test_long_booking_blocks_the_next_slot():
+    rooms = [{'id': 1, 'capacite': 30}, {'id': 2, 'capacite': 40}]
+    index = RoomOccupancy(rooms)
+    eight = datetime(2026, 1, 11, 8)
+    ten = datetime(2026, 1, 11, 10)
+
+    assert index.best_fit(25, ten, ten + timedelta(minutes=90))['id'] == 1
+    index.book(1, eight, eight + timedelta(minutes=180))
+    assert index.best_fit(25, ten, ten + timedelta(minutes=90))['id'] == 2
+
+    index.release(1, eight, eight + timedelta(minutes=180))
+    assert index.best_fit(25, ten, ten + timedelta(minutes=90))['id'] == 1
+
+def test_index_matches_a_full_scan():
+    rng = random.Random(7)
+    rooms = [{'id': i, 'capacite': rng.choice([20, 30, 40, 60, 120])} for i in range(40)]
+    index = RoomOccupancy(rooms)
+    day = datetime(2026, 1, 11)
+    slots = [
+        (day + timedelta(hours=h), day + timedelta(hours=h, minutes=d))
+        for h in (8, 10, 13, 15) for d in (90, 120, 180)
+    ]
+    bookings = []
+
+    for _ in range(500):
+        start, end = rng.choice(slots)
+        if bookings and rng.random() < 0.3:
+            booking = bookings.pop(rng.randrange(len(bookings)))
+            index.release(*booking)
+        else:
+            room = index.best_fit(rng.choice([0, 25, 50, 100]), start, end)
+            if room is not None:
+                index.book(room['id'], start, end)
+                bookings.append((room['id'], start, end))
+
+        start, end = rng.choice(slots)
+        min_capacity = rng.choice([0, 35, 100])
+        expected = naive_free_rooms(rooms, bookings, start, end, min_capacity)
+        assert list(index.free_rooms(start, end, min_capacity)) == expected
+        assert list(index.free_rooms(start, end, min_capacity, largest_first=True)) == expected[::-1]
+
+def test_rooms_booked_while_iterating_are_skipped():
+    rooms = [{'id': i, 'capacite': 10 * i} for i in range(1, 6)]
+    index = RoomOccupancy(rooms)
+    start = datetime(2026, 1, 11, 8)
+    end = start + timedelta(minutes=90)
+
+    seen = []
+    for room in index.free_rooms(start, end, largest_first=True):
+        seen.append(room['id'])
+        index.book(room['id'], start, end)
+        # Another placement takes the next largest room meanwhile
+        if room['id'] == 5:
+            index.book(4, start, end)
+    assert seen == [5, 3, 2, 1]
@@ -0,0 +1,90 @@
+# =============================================
+# SCHEDULER REPAIR TESTS
+# =============================================
+
+# In-memory repairs only: the scheduler state is built by hand, so these
+# tests need no database.
+#
+# Usage (from the project root):
+#     python -m pytest tests
+
+from datetime import datetime
+from backend.room_occupancy import RoomOccupancy
+from backend.scheduler import ExamScheduler
+
+def make_scheduler(rooms, exam, blocs):
+    """Scheduler holding one placed exam, its blocs and no professors"""
+    scheduler = ExamScheduler()
+    scheduler.rooms = rooms
+    scheduler.rooms_by_id = {r['id']: r for r in rooms}
+    scheduler.room_index = RoomOccupancy(rooms)
+    scheduler.amphi_index = RoomOccupancy([])
+    scheduler.exams = [exam]
+    scheduler.blocs = blocs
+    start, end = scheduler._exam_interval(exam)
+    for bloc in blocs:
+        scheduler.room_index.book(bloc['salle_id'], start, end)
+    scheduler._build_repair_index()
+    return scheduler
+
+def test_repair_capacity_keeps_unplaced_students_in_overfull_bloc():
+    rooms = [
+        {'id': 1, 'nom': 'S1', 'capacite': 20, 'type': 'classe'},
+        {'id': 2, 'nom': 'S2', 'capacite': 5, 'type': 'classe'},
+    ]
+    exam = {'module_id': 7, 'date_heure': datetime(2026, 1, 11, 8),
+            'duree_minutes': 90, 'dept_id': 1}
+    students = list(range(1, 31))
+    scheduler = make_scheduler(rooms, exam, [{
+        'module_id': 7, 'salle_id': 1, 'salle_type': 'classe',
+        'date_heure': exam['date_heure'], 'dept_id': 1, 'students': list(students),
+    }])
+
+    scheduler._repair_capacity(0)
+
+    overfull, moved = scheduler.blocs
+    assert moved['salle_id'] == 2
+    assert moved['students'] == list(range(21, 26))
+    assert overfull['students'] == list(range(1, 21)) + list(range(26, 31))
+    # Every student is seated exactly once, the remaining overflow stays visible
+    assert sorted(overfull['students'] + moved['students']) == students
+    assert len(scheduler._detect_conflicts()['room_capacity']) == 1
+
+def test_repair_capacity_moves_whole_overflow_when_rooms_are_free():
+    rooms = [
+        {'id': 1, 'nom': 'S1', 'capacite': 20, 'type': 'classe'},
+        {'id': 2, 'nom': 'S2', 'capacite': 15, 'type': 'classe'},
+    ]
+    exam = {'module_id': 7, 'date_heure': datetime(2026, 1, 11, 8),
+            'duree_minutes': 90, 'dept_id': 1}
+    scheduler = make_scheduler(rooms, exam, [{
+        'module_id': 7, 'salle_id': 1, 'salle_type': 'classe',
+        'date_heure': exam['date_heure'], 'dept_id': 1, 'students': list(range(1, 31)),
+    }])
+
+    scheduler._repair_capacity(0)
+
+    overfull, moved = scheduler.blocs
+    assert overfull['students'] == list(range(1, 21))
+    assert moved['students'] == list(range(21, 31))
+    assert scheduler._detect_conflicts()['room_capacity'] == []
+
+def test_unseated_students_are_a_conflict_and_get_repaired():
+    rooms = [
+        {'id': 1, 'nom': 'S1', 'capacite': 20, 'type': 'classe'},
+        {'id': 2, 'nom': 'S2', 'capacite': 20, 'type': 'classe'},
+    ]
+    exam = {'module_id': 7, 'date_heure': datetime(2026, 1, 11, 8),
+            'duree_minutes': 90, 'dept_id': 1}
+    scheduler = make_scheduler(rooms, exam, [{
+        'module_id': 7, 'salle_id': 1, 'salle_type': 'classe',
+        'date_heure': exam['date_heure'], 'dept_id': 1, 'students': list(range(1, 21)),
+    }])
+    scheduler.enrolments = {7: list(range(1, 31))}
+    scheduler.student_groups = {sid: 'G1' for sid in range(1, 31)}
+
+    conflicts = scheduler._detect_conflicts()
+    assert conflicts['student_no_seat'] == [{'module_id': 7, 'student_count': 10}]
+
+    assert scheduler._resolve_conflicts(conflicts) == 1
+    assert sorted(s for b in scheduler.blocs for s in b['students']) == list(range(1, 31))
@@ -0,0 +1,17 @@
+# =============================================
+# SLOT ASSIGNMENT TESTS
+# =============================================
+
+from backend.slot_assignment import assign_slots
+
+def test_long_exam_holds_the_following_slot():
+    # Room budget of one exam per slot, no shared students
+    kwargs = dict(
+        graph={}, demand={1: 100, 2: 100}, rooms_needed={1: 1, 2: 1},
+        slots_per_day=2, seats_per_slot=100, rooms_per_slot=1
+    )
+    assert assign_slots([1, 2], **kwargs) == {1: (0, 0), 2: (0, 1)}
+
+    # An exam starting in slot 0 still sits during slot 1
+    slots = assign_slots([1, 2], slot_spans=[[0, 1], [1]], **kwargs)
+    assert slots == {1: (0, 0), 2: (1, 0)}
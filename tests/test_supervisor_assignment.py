@@ -0,0 +1,41 @@
+# =============================================
+# SUPERVISOR ASSIGNMENT TESTS
+# =============================================
+
+from datetime import datetime
+from backend.scheduler import ExamScheduler
+
+def make_bloc(module_id, date_heure):
+    return {'module_id': module_id, 'salle_id': module_id, 'salle_type': 'classe',
+            'date_heure': date_heure, 'dept_id': 1, 'students': [1]}
+
+def test_long_exam_keeps_its_supervisor_busy_in_the_next_slot():
+    scheduler = ExamScheduler()
+    scheduler.professors = [{'id': 1, 'dept_id': 1}]
+    long_exam = datetime(2026, 1, 11, 8)
+    next_slot = datetime(2026, 1, 11, 10)
+    scheduler.exams = [
+        {'module_id': 1, 'date_heure': long_exam, 'duree_minutes': 180, 'dept_id': 1},
+        {'module_id': 2, 'date_heure': next_slot, 'duree_minutes': 90, 'dept_id': 1},
+    ]
+    scheduler.blocs = [make_bloc(1, long_exam), make_bloc(2, next_slot)]
+
+    scheduler._assign_supervisors()
+
+    # 08:00-11:00 overlaps 10:00: the only professor cannot take both
+    assert scheduler.surveillances == [(0, 1)]
+
+def test_supervisor_takes_back_to_back_exams():
+    scheduler = ExamScheduler()
+    scheduler.professors = [{'id': 1, 'dept_id': 1}]
+    first = datetime(2026, 1, 11, 8)
+    second = datetime(2026, 1, 11, 10)
+    scheduler.exams = [
+        {'module_id': 1, 'date_heure': first, 'duree_minutes': 120, 'dept_id': 1},
+        {'module_id': 2, 'date_heure': second, 'duree_minutes': 90, 'dept_id': 1},
+    ]
+    scheduler.blocs = [make_bloc(1, first), make_bloc(2, second)]
+
+    scheduler._assign_supervisors()
+
+    assert scheduler.surveillances == [(0, 1), (1, 1)]